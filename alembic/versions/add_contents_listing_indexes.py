@@ -0,0 +1,27 @@
+"""add contents listing indexes
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # コンテンツ一覧（ユーザーごと・新しい順）のキーセットページング用
+    op.create_index('ix_contents_user_id_created_at_id', 'contents', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_contents_user_id_status_created_at_id', 'contents', ['user_id', 'status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_contents_user_id_keyword_created_at_id', 'contents', ['user_id', 'keyword', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_contents_user_id_keyword_created_at_id', table_name='contents')
+    op.drop_index('ix_contents_user_id_status_created_at_id', table_name='contents')
+    op.drop_index('ix_contents_user_id_created_at_id', table_name='contents')
@@ -0,0 +1,37 @@
+"""add generation cache table
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3d4e5f6a7b8'
+down_revision = 'b2c3d4e5f6a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # generation_cache テーブル
+    op.create_table(
+        'generation_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('accessed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_generation_cache_expires_at'), 'generation_cache', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_generation_cache_accessed_at'), 'generation_cache', ['accessed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_generation_cache_accessed_at'), table_name='generation_cache')
+    op.drop_index(op.f('ix_generation_cache_expires_at'), table_name='generation_cache')
+    op.drop_table('generation_cache')
@@ -0,0 +1,30 @@
+"""add job leases
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 実行中のジョブの所有者と期限（ワーカーが異常終了したジョブを再取得するため）
+    op.add_column('jobs', sa.Column('locked_by', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('jobs', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_jobs_status_lease_expires_at', 'jobs', ['status', 'lease_expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_status_lease_expires_at', table_name='jobs')
+    op.drop_column('jobs', 'attempts')
+    op.drop_column('jobs', 'lease_expires_at')
+    op.drop_column('jobs', 'locked_by')
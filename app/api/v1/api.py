@@ -1,15 +1,44 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import scraping, content, auth
+from app.core.config import get_settings
+from app.core.security import password_hasher
+from app.core.user_cache import user_cache
+from app.db.query_stats import process_stats
+from app.db.session import pool_stats
+from app.api.v1.endpoints import scraping, content, auth, jobs, analysis, profiles
+
+settings = get_settings()
 
 api_router = APIRouter()
 
 # 各エンドポイントルーターの登録
 api_router.include_router(auth.router, prefix="/auth", tags=["認証"])
 api_router.include_router(scraping.router, prefix="/scraping", tags=["スクレイピング"])
-# analysis は未実装のため登録しません
+api_router.include_router(analysis.router, prefix="/analysis", tags=["分析"])
 api_router.include_router(content.router, prefix="/content", tags=["コンテンツ生成"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["ジョブ"])
+api_router.include_router(profiles.router, prefix="/profiles", tags=["プロファイル"])
 
 # ヘルスチェック用エンドポイントの追加
 @api_router.get("/health", tags=["Health"])
 async def health():
     return {"status": "ok"}
+
+@api_router.get("/health/db-pool", tags=["Health"])
+async def db_pool_health():
+    """データベースのコネクションプールの状態（使用中の接続数、再利用率など）"""
+    return pool_stats()
+
+@api_router.get("/health/db-queries", tags=["Health"])
+async def db_query_health():
+    """起動後のSQLクエリの件数・合計時間・遅いクエリの件数"""
+    return {**process_stats.to_dict(), "slow_threshold_ms": settings.DB_SLOW_QUERY_MS}
+
+@api_router.get("/health/auth-cache", tags=["Health"])
+async def auth_cache_health():
+    """認証ユーザーキャッシュの件数・ヒット率"""
+    return {**user_cache.stats(), "ttl": user_cache.ttl, "stale_ttl": user_cache.stale_ttl}
+
+@api_router.get("/health/password-hashing", tags=["Health"])
+async def password_hashing_health():
+    """パスワード処理スレッドプールの待ち件数・拒否件数"""
+    return password_hasher.stats()
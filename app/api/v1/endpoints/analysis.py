@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, List
+from pydantic import BaseModel
+from app.core.config import get_settings
+from app.services.keyword_analysis import analyze_pages
+import asyncio
+
+router = APIRouter()
+settings = get_settings()
+
+class KeywordAnalysisRequest(BaseModel):
+    keyword: str
+    pages: List[Dict[str, Any]]  # /scraping/search の results
+
+@router.post("/keywords", response_model=Dict[str, Any])
+async def analyze_keywords(request: KeywordAnalysisRequest):
+    """
+    スクレイピング結果の上位ページから、語句の出現数・TF-IDF・キーワード出現率・共起語を分析します
+    """
+    if len(request.pages) > settings.ANALYSIS_MAX_PAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に分析できるのは{settings.ANALYSIS_MAX_PAGES}ページまでです"
+        )
+    # 行列演算はCPU処理のため、イベントループを止めないようスレッドで実行
+    return await asyncio.to_thread(analyze_pages, request.keyword, request.pages)
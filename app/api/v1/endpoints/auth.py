@@ -2,10 +2,11 @@ from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from app.core.auth import get_current_user, oauth2_scheme
+from app.core.security import PasswordHasherBusy
 from app.crud import user as user_crud
 from app.db.session import AsyncSession
 from app.schemas.user import User, UserCreate
-from app.db.base import get_db
+from app.db.session import get_db
 from typing import Any, Dict, Optional
 from app.core.config import settings
 from jose import jwt
@@ -126,6 +127,12 @@ async def login(
                 "is_active": user.is_active
             }
         }
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         print(f"Login error: {str(e)}")
         if isinstance(e, HTTPException):
@@ -182,6 +189,12 @@ async def create_user(
             response.headers["Access-Control-Allow-Credentials"] = "true"
         
         return user
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many registration attempts in progress. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         print(f"Registration error: {str(e)}")
         if isinstance(e, HTTPException):
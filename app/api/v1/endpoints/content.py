@@ -1,43 +1,69 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.base import get_db
-from typing import Dict, Any, List
-import openai
+from app.db.session import get_db, AsyncSessionLocal
+from typing import Dict, Any, List, Optional
+from app.core.auth import get_current_user
 from app.core.config import get_settings
+from app.crud import content as content_crud
+from app.models.user import User
+from app.schemas.content import ContentDetail, ContentPage
+from app.services.content_generation import generate_article, stream_article
+from app.services.llm_scheduler import get_llm_scheduler
 from pydantic import BaseModel
+import asyncio
+import json
+import logging
 
 router = APIRouter()
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 class AnalysisRequest(BaseModel):
     analysis_results: Dict[str, Any]
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def get_contents(db: AsyncSession = Depends(get_db)):
+class BatchItem(BaseModel):
+    keyword: str
+    analysis_results: Dict[str, Any] = {}
+
+class BatchGenerateRequest(BaseModel):
+    items: List[BatchItem]
+    no_cache: bool = False
+
+@router.get("/", response_model=ContentPage)
+async def get_contents(
+    cursor: Optional[str] = Query(None, description="前のページの next_cursor"),
+    limit: int = Query(20, ge=1, le=100, description="1ページの件数"),
+    status: Optional[str] = Query(None, description="ステータスで絞り込み（draft, published, error）"),
+    keyword: Optional[str] = Query(None, description="キーワード（完全一致）で絞り込み"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
     """
-    生成済みコンテンツの一覧を取得します
+    生成済みコンテンツの一覧を新しい順に取得します。
+    本文は含まれません。next_cursor が null になるまで cursor に指定して次のページを取得します。
     """
-    try:
-        # ここではダミーデータを返します
-        # 実際のアプリケーションではデータベースからデータを取得する処理を実装します
-        return [
-            {
-                "id": 1,
-                "keyword": "SEO対策",
-                "title": "2023年最新のSEO対策ガイド",
-                "content": "# 2023年最新のSEO対策ガイド\n\n## はじめに\nSEO対策は常に変化しています...",
-                "created_at": "2023-01-01T00:00:00",
-                "user_id": 1,
-                "status": "draft"
-            }
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    after = None
+    if cursor:
+        try:
+            after = content_crud.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="cursor が不正です")
+    items, next_cursor = await content_crud.list_summaries(
+        db,
+        user_id=current_user.id,
+        limit=limit,
+        after=after,
+        status=status,
+        keyword=keyword.strip() if keyword else None,
+    )
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.post("/generate", response_model=Dict[str, Any])
 async def generate_content(
     keyword: str = Query(..., description="検索キーワード"),
     request: AnalysisRequest = None,
+    no_cache: bool = Query(False, description="生成結果のキャッシュを使わずに再生成する"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -50,67 +76,170 @@ async def generate_content(
             analysis_results = request.analysis_results
         
         # OpenAI APIを使用して記事を生成
-        completion = await openai.ChatCompletion.acreate(
-            model="gpt-40",
-            messages=[
-                {"role": "system", "content": """
-あなたはSEOと文章作成の専門家です。提供されたスクレイピング情報（5つの記事）を分析し、
-分析結果を元に同キーワードで上位表示（1位取得を目標）できるようSEOに最適化された記事を生成してください。
-
-分析すべきポイント：
-1. 1位・2位記事と3〜5位記事の違い
-2. タイトル・メタディスクリプション（文字数、含まれるキーワード、訴求内容）
-3. 見出しタグの構成、キーワード配置、情報の網羅性
-4. 本文の文字数やキーワード出現数
-5. E-E-A-T要素（筆者プロフィール、監修、引用元など）
-6. 検索意図への合致度合い
-7. 内部リンク・外部リンクの適切さ
-8. 画像のaltテキストやメディア最適化
-9. 上位表示のために特に重要と思われる要素
-10. タイトル・ディスクリプションのクリック率向上策
-11. 見出しタグの論理構成と段落整理
-12. ユーザビリティ（箇条書きや表、FAQなど）
-13. E-E-A-T補強策（専門性、権威性、信用性、経験の訴求）
-
-出力は必ずMarkdown形式で行い、以下のセクションを含めてください：
-
-# 比較分析結果
-## 1位・2位記事 vs 3〜5位記事の相違点
-- 主要な違い
-- 重要な考察
-
-# 上位表示のための施策とポイント
-## 必須コンテンツ要素
-- 検索意図を満たすために必要な情報
-- E-E-A-T強化のポイント
-- 技術的な最適化項目
-
-# 最適化された記事案
-## メタ情報
-- タイトル案（H1）
-- メタディスクリプション
-
-## 記事構成
-- 見出し構成（H2-H5）
-- 各セクションの本文
-- 画像配置案とalt属性
-- FAQ（必要な場合）
-- まとめ/結論
-- CTA（行動喚起）
-"""},
-                {"role": "user", "content": f"""
-以下のキーワードと分析結果を元に、上記のフォーマットで記事を生成してください：
-
-キーワード: {keyword}
-分析結果: {analysis_results}
-"""}
-            ]
-        )
+        generated_content = await generate_article(keyword, analysis_results, use_cache=not no_cache)
         
         return {
             "keyword": keyword,
-            "generated_content": completion.choices[0].message.content,
+            "generated_content": generated_content,
             "status": "success"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Server-Sent Events の1イベントを組み立てる"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_content_stream(
+    keyword: str = Query(..., description="検索キーワード"),
+    request: AnalysisRequest = None,
+    no_cache: bool = Query(False, description="生成結果のキャッシュを使わずに再生成する"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    分析結果を基にAIで記事を生成し、生成されたテキストを Server-Sent Events で逐次返します。
+
+    - token: 生成されたテキストの断片 {"text": ...}
+    - done: 生成完了。記事は下書きとして保存される {"content_id": ..., "keyword": ...}
+    - error: 生成中のエラー {"detail": ...}
+    """
+    analysis_results = {}
+    if request and hasattr(request, 'analysis_results'):
+        analysis_results = request.analysis_results
+    user_id = current_user.id
+
+    async def event_stream():
+        parts = []
+        try:
+            async for text in stream_article(keyword, analysis_results, use_cache=not no_cache):
+                parts.append(text)
+                yield _sse_event("token", {"text": text})
+        except Exception as e:
+            logger.error(f"Streaming generation failed for '{keyword}': {str(e)}")
+            yield _sse_event("error", {"detail": str(e)})
+            return
+
+        # レスポンスの送信中はリクエストのセッションが閉じられているため、別のセッションで保存する
+        try:
+            async with AsyncSessionLocal() as db:
+                content = await content_crud.create(
+                    db,
+                    user_id=user_id,
+                    keyword=keyword,
+                    content="".join(parts),
+                    analysis_results=analysis_results,
+                )
+        except Exception as e:
+            logger.error(f"Failed to save generated content for '{keyword}': {str(e)}")
+            yield _sse_event("error", {"detail": "記事の保存に失敗しました"})
+            return
+        yield _sse_event("done", {"content_id": content.id, "keyword": keyword})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/generate/batch")
+async def generate_content_batch(
+    batch: BatchGenerateRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    複数キーワードの記事をまとめて生成し、完了したものから Server-Sent Events で返します。
+    OpenAI API の呼び出しは同時実行数とレート制限（リクエスト数・トークン数）の範囲内で行われます。
+
+    - start: 受け付けた件数 {"total": ...}
+    - result: 1件の生成完了。記事は下書きとして保存される {"index", "keyword", "content_id", "generated_content"}
+    - error: 1件の生成失敗 {"index", "keyword", "detail"}
+    - done: すべて完了 {"succeeded": ..., "failed": ...}
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="キーワードが指定されていません")
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に生成できるのは{settings.BATCH_MAX_ITEMS}件までです"
+        )
+    user_id = current_user.id
+
+    async def generate_one(item: BatchItem):
+        generated_content = await generate_article(
+            item.keyword, item.analysis_results, use_cache=not batch.no_cache
+        )
+        async with AsyncSessionLocal() as db:
+            content = await content_crud.create(
+                db,
+                user_id=user_id,
+                keyword=item.keyword,
+                content=generated_content,
+                analysis_results=item.analysis_results,
+            )
+        return content.id, generated_content
+
+    async def event_stream():
+        tasks = {
+            asyncio.create_task(generate_one(item)): (index, item)
+            for index, item in enumerate(batch.items)
+        }
+        succeeded = failed = 0
+        yield _sse_event("start", {"total": len(tasks)})
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, item = tasks[task]
+                    if task.exception() is not None:
+                        failed += 1
+                        logger.error(f"Batch generation failed for '{item.keyword}': {str(task.exception())}")
+                        yield _sse_event("error", {
+                            "index": index,
+                            "keyword": item.keyword,
+                            "detail": str(task.exception()),
+                        })
+                    else:
+                        succeeded += 1
+                        content_id, generated_content = task.result()
+                        yield _sse_event("result", {
+                            "index": index,
+                            "keyword": item.keyword,
+                            "content_id": content_id,
+                            "generated_content": generated_content,
+                        })
+            yield _sse_event("done", {"succeeded": succeeded, "failed": failed})
+        finally:
+            # クライアントが切断した場合は残りの生成を中止する
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/llm-stats", response_model=Dict[str, Any])
+async def get_llm_stats():
+    """
+    OpenAI API 呼び出しのスケジューラー統計（実行中の件数、再試行・レート制限の回数など）を返します
+    """
+    return get_llm_scheduler().stats()
+
+# "/generate" や "/llm-stats" より後に登録する（パスの一致を優先させる）
+@router.get("/{content_id}", response_model=ContentDetail)
+async def get_content(
+    content_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    生成済みコンテンツを本文を含めて取得します
+    """
+    content = await content_crud.get_for_user(db, content_id=content_id, user_id=current_user.id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="コンテンツが見つかりません")
+    return content
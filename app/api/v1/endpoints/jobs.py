@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth import get_current_user
+from app.db.session import get_db
+from app.models.job import Job as JobModel
+from app.models.user import User
+from app.schemas.job import Job, JobCreate
+from app.services.jobs import cancel_job, submit_job
+
+router = APIRouter()
+
+
+async def _get_own_job(db: AsyncSession, job_id: int, current_user: User) -> JobModel:
+    job = await db.get(JobModel, job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
+
+
+@router.post("/", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_in: JobCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    スクレイピング・記事生成をバックグラウンドジョブとして投入します。
+    進捗は GET /jobs/{job_id} で確認できます。
+    """
+    params = job_in.model_dump(exclude={"job_type"}, exclude_none=True)
+    return await submit_job(db, current_user.id, job_in.job_type, params)
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """ジョブの状態と結果を取得します"""
+    return await _get_own_job(db, job_id, current_user)
+
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """待機中・実行中のジョブをキャンセルします"""
+    job = await _get_own_job(db, job_id, current_user)
+    return await cancel_job(db, job)
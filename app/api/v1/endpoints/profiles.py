@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from app.core.auth import get_current_user
+from app.core.profiling import PROFILE_ID_RE, request_profiler
+from app.models.user import User
+import os
+
+router = APIRouter()
+
+
+async def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="管理者のみ利用できます")
+    return current_user
+
+
+@router.get("/")
+async def list_profiles(current_user: User = Depends(get_current_superuser)):
+    """
+    保存済みのプロファイルの一覧（新しい順）と計測の状態を返します。
+    計測するリクエストは X-Profile-Token ヘッダー（PROFILE_ADMIN_TOKEN）または PROFILE_SAMPLE_RATE で選ばれます。
+    """
+    return {
+        "profiler": request_profiler.stats(),
+        "profiles": request_profiler.list_profiles(),
+    }
+
+
+@router.get("/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    kind: str = Query("cpu", pattern="^(cpu|wall|json)$"),
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    プロファイルをダウンロードします。
+    - cpu / wall: collapsed 形式（flamegraph.pl・speedscope などで読み込めます）
+    - json: 所要時間・タスクごとの開始/終了時刻と CPU 時間
+    """
+    if not PROFILE_ID_RE.match(profile_id):
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    path = request_profiler.path_for(profile_id, kind)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    media_type = "application/json" if kind == "json" else "text/plain; charset=utf-8"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
@@ -1,34 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.base import get_db
+from app.db.session import get_db
 from app.services.scraping import ScrapingService
-from typing import List, Dict, Any
+from app.services.http_client import get_http_client, http_client_stats
+from app.services.host_resilience import host_registry
+from app.services.dedup import get_dedup_index
+from app.core.config import get_settings
+from app.services.serp import SerpNotConfigured, get_serp_service
+from typing import List, Dict, Any, Optional
 
 router = APIRouter()
+settings = get_settings()
+
+def get_scraping_service() -> ScrapingService:
+    """共有HTTPクライアントを注入した ScrapingService を提供する依存関係"""
+    return ScrapingService(session=get_http_client())
 
 @router.post("/search", response_model=Dict[str, Any])
-async def search_and_scrape(keyword: str, db: AsyncSession = Depends(get_db)):
+async def search_and_scrape(
+    keyword: str,
+    locale: Optional[str] = Query(None, description="検索ロケール（例: ja-JP）"),
+    device: Optional[str] = Query(None, description="検索デバイス（desktop / mobile）"),
+    db: AsyncSession = Depends(get_db),
+    scraping_service: ScrapingService = Depends(get_scraping_service),
+):
     """
     指定されたキーワードでGoogle検索を行い、上位の結果をスクレイピングします
     """
     try:
-        async with ScrapingService() as scraping_service:
-            # 検索結果のURLを取得
-            urls = await scraping_service.get_search_results(keyword)
-            if not urls:
+        async with scraping_service:
+            # 検索結果の上位ページをスクレイピング
+            result = await scraping_service.scrape_keyword(keyword, locale=locale, device=device)
+            if result is None:
                 raise HTTPException(status_code=404, detail="検索結果が見つかりませんでした")
-            
-            # 各URLの内容をスクレイピング
-            results = []
-            for url in urls[:5]:  # 上位5件のみ処理
-                result = await scraping_service.scrape_page(url)
-                if result:
-                    results.append(result)
-            
-            return {
-                "keyword": keyword,
-                "results": results,
-                "total_results": len(results)
-            }
+            return result
+    except SerpNotConfigured as e:
+        raise HTTPException(status_code=503, detail=f"検索結果のプロバイダーが設定されていません: {e}")
     except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/http-stats", response_model=Dict[str, Any])
+async def get_http_stats():
+    """
+    共有HTTPクライアントの接続プール統計（接続の再利用率など）を返します
+    """
+    return http_client_stats()
+
+@router.get("/serp-stats", response_model=Dict[str, Any])
+async def get_serp_stats():
+    """
+    検索結果プロバイダーとキャッシュの統計を返します
+    """
+    try:
+        return get_serp_service().stats()
+    except SerpNotConfigured as e:
+        raise HTTPException(status_code=503, detail=f"検索結果のプロバイダーが設定されていません: {e}")
+
+@router.get("/hosts", response_model=Dict[str, Any])
+async def get_host_stats():
+    """
+    スクレイピング対象ホストごとのサーキットブレーカーの状態・リクエスト間隔・応答時間の分布を返します
+    """
+    return host_registry.stats()
+
+@router.get("/dedup-stats", response_model=Dict[str, Any])
+async def get_dedup_stats():
+    """
+    重複ページ検出の統計（比較したページ数・重複としてまとめたページ数）を返します
+    """
+    index = get_dedup_index()
+    if index is None:
+        return {"enabled": False}
+    return {"enabled": True, **index.stats()}
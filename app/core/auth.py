@@ -1,3 +1,4 @@
+import logging
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -5,10 +6,13 @@ from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from app.core.config import settings
+from app.core.user_cache import user_cache
 from app.crud import user as user_crud
-from app.db.base import get_db
+from app.db.session import get_db
 from app.models.user import User
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 async def get_current_user(
@@ -20,26 +24,26 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # 認証が必要なすべてのリクエストで通るため、成功時はログを出さない
     try:
-        # デバッグログを追加
-        print(f"Decoding token: {token[:10]}...")
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            print("No 'sub' claim in token")
+            logger.debug("No 'sub' claim in token")
             raise credentials_exception
-        print(f"Token contains email: {email}")
     except JWTError as e:
-        print(f"JWT decode error: {str(e)}")
+        logger.debug(f"JWT decode error: {str(e)}")
         raise credentials_exception
     
-    # メールアドレスでユーザーを検索
-    user = await user_crud.get_by_email(db, email=email)
+    # メールアドレスでユーザーを検索（短時間キャッシュする）
+    user = await user_cache.get_user(
+        db, email, lambda session: user_crud.get_by_email(session, email=email)
+    )
     if user is None:
-        print(f"User with email {email} not found")
+        logger.debug("User for token not found")
         raise credentials_exception
     if not user.is_active:
-        print(f"User {email} is inactive")
+        logger.debug("Token user is inactive")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
@@ -4,7 +4,7 @@ import os
 import logging
 from urllib.parse import urlparse
 import secrets
-from typing import Optional
+from typing import List, Literal, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -22,15 +22,118 @@ class Settings(BaseSettings):
     SECRET_KEY: str = _get_secret_key()
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    AUTH_USER_CACHE_TTL: float = 30.0  # 認証ユーザーのキャッシュ有効期限（秒、0 で無効）
+    AUTH_USER_CACHE_STALE_TTL: float = 0.0  # 期限切れ後も古い値を返しつつ読み直す期間（秒）
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10000
+    BCRYPT_ROUNDS: int = 12  # これより弱いハッシュはログイン時に作り直す
+    PASSWORD_HASH_WORKERS: int = 2  # パスワードのハッシュ計算・照合を行うスレッド数
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # 実行待ちの上限（超えたら 503）
     ENVIRONMENT: str = "production"
     DEBUG: bool = False
+    METRICS_ENABLED: bool = True  # /metrics の公開とリクエストの計測
+    METRICS_MAX_SERIES: int = 500  # メトリクスごとのラベルの組み合わせの上限（超えた分は other）
+    PROFILE_ADMIN_TOKEN: Optional[str] = None  # X-Profile-Token ヘッダーがこの値のリクエストを計測する
+    PROFILE_SAMPLE_RATE: float = 0.0  # PROFILE_SAMPLE_PATHS のリクエストを計測する確率（0 で無効）
+    PROFILE_SAMPLE_PATHS: List[str] = ["/api/v1/scraping/search", "/api/v1/content/generate"]  # 前方一致
+    PROFILE_INTERVAL_MS: float = 5.0  # スタックを読み取る間隔（ミリ秒）
+    PROFILE_MAX_CONCURRENT: int = 2  # 同時に計測するリクエスト数の上限（超えた分は計測しない）
+    PROFILE_MAX_FILES: int = 100  # 保存するプロファイル数の上限（古いものから削除）
+    PROFILE_DIR: str = ".cache/profiles"
     OPENAI_API_KEY: str
+    OPENAI_MODEL: str = "gpt-4o"
+    OPENAI_BASE_URL: Optional[str] = None  # 互換APIやローカルのモックサーバーを使う場合に指定
+    OPENAI_CONTEXT_WINDOW: int = 128000  # モデルのコンテキスト長（トークン）
+    OPENAI_MAX_OUTPUT_TOKENS: int = 16384  # 出力用に確保するトークン数（リクエストの max_tokens）
+    PROMPT_PAGE_TOKEN_BUDGET: int = 2000  # 1ページあたりの本文のトークン予算
+    LLM_CONCURRENCY: int = 4  # OpenAI API の同時リクエスト数
+    LLM_REQUESTS_PER_MINUTE: int = 500  # 0 の場合は制限しない
+    LLM_TOKENS_PER_MINUTE: int = 200000  # 0 の場合は制限しない
+    LLM_OUTPUT_TOKEN_ESTIMATE: int = 4000  # レート制限用の出力トークン数の見積もり
+    LLM_MAX_RETRIES: int = 5  # レート制限（429）・一時的なエラーの再試行回数
+    LLM_RETRY_BASE_DELAY: float = 1.0
+    LLM_RETRY_MAX_DELAY: float = 60.0
+    BATCH_MAX_ITEMS: int = 50  # 一括生成で受け付けるキーワード数の上限
+    ANALYSIS_TOKENIZER: str = "regex"  # regex（高速）または janome（形態素解析、要 janome）
+    ANALYSIS_TOP_TERMS: int = 50  # 分析結果に含める語句数
+    ANALYSIS_TOP_PAIRS: int = 30  # 共起語・関連語の件数
+    ANALYSIS_PAGE_TOP_TERMS: int = 10  # ページごとの特徴語（TF-IDF 上位）の件数
+    ANALYSIS_MAX_PAGES: int = 50  # /analysis で一度に分析できるページ数
+    GENERATION_CACHE_BACKEND: str = "disk"  # disk: ローカルのSQLite / database: アプリのDB / none: 無効
+    GENERATION_CACHE_PATH: str = ".cache/generation_cache.sqlite3"
+    GENERATION_CACHE_TTL: int = 60 * 60 * 24 * 7  # 生成結果のキャッシュ有効期限（秒）
+    GENERATION_CACHE_MAX_ENTRIES: int = 5000
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/railway")
+    DB_POOL_MODE: str = "queue"  # queue: アプリ内でプール / null: プールしない / pgbouncer: PgBouncer 経由
+    DB_POOL_SIZE: int = 5  # 常に保持する接続数
+    DB_MAX_OVERFLOW: int = 10  # DB_POOL_SIZE を超えて一時的に開ける接続数
+    DB_POOL_TIMEOUT: float = 30.0  # 接続の空き待ちの上限（秒）
+    DB_POOL_RECYCLE: int = 1800  # この秒数より古い接続は作り直す
+    DB_POOL_PRE_PING: bool = True  # 取得時に接続が生きているか確認する
+    DB_COMMAND_TIMEOUT: float = 60.0  # asyncpg のコマンドタイムアウト（秒）
+    DB_SLOW_QUERY_MS: float = 200.0  # この時間以上かかったクエリを警告ログに出力
+    DB_REQUEST_QUERY_WARN: int = 30  # 1リクエストのクエリ数がこれ以上なら警告（N+1 の検出）
     WP_API_URL: Optional[str] = None
     WP_USERNAME: Optional[str] = None
     WP_APP_PASSWORD: Optional[str] = None
-    MAX_SCRAPE_PAGES: int = 5
-    SCRAPE_DELAY: int = 5
+    MAX_SCRAPE_PAGES: int = 5  # 1回の検索でスクレイピングする上位ページ数
+    SCRAPE_DELAY: int = 5  # 同一ホストへの連続リクエストの最小間隔（秒）
+    SCRAPE_CONCURRENCY: int = 5  # 全体の同時フェッチ数の上限
+    SCRAPE_PER_HOST_CONCURRENCY: int = 1  # ホストごとの同時フェッチ数の上限
+    SCRAPE_TIMEOUT: float = 40.0  # 1URLあたりのタイムアウト（秒、再試行と再試行前の待ち時間を含む）
+    SCRAPE_ATTEMPT_TIMEOUT: float = 8.0  # 1回のリクエストのタイムアウト（秒、残り時間がこれより短い場合は残り時間）
+    SCRAPE_MAX_RETRIES: int = 2  # 接続エラー・タイムアウト・5xx・429 の再試行回数
+    SCRAPE_RETRY_BASE_DELAY: float = 0.5
+    SCRAPE_RETRY_MAX_DELAY: float = 10.0  # Retry-After がこれより長い場合は再試行しない
+    SCRAPE_MAX_DELAY: float = 60.0  # 429・503 を受けて広げるリクエスト間隔の上限（秒）
+    SCRAPE_HOST_BURST: int = 1  # ホストごとに間隔を空けずに送れるリクエスト数
+    SCRAPE_BREAKER_FAILURES: int = 3  # この回数続けて失敗したホストへのリクエストを止める
+    SCRAPE_BREAKER_COOLDOWN: float = 60.0  # リクエストを止める時間（秒）
+    SCRAPE_HEDGE_ENABLED: bool = False  # 応答がホストの p95 を超えたら2つ目のリクエストを送る
+    SCRAPE_HEDGE_MIN_SAMPLES: int = 20  # p95 の計算に必要な応答数
+    SCRAPE_HOST_STATE_MAX_ENTRIES: int = 5000
+    BLOCKED_DOMAINS: List[str] = []
+    SCRAPE_MAX_BYTES: int = 3 * 1024 * 1024  # 1ページあたりの読み込みバイト数の上限
+    SCRAPE_CHUNK_SIZE: int = 64 * 1024
+    SCRAPE_ALLOWED_CONTENT_TYPES: List[str] = ["text/html", "application/xhtml+xml"]
+    PARSE_POOL_SIZE: int = 2  # HTML解析用ワーカープロセス数（0でイベントループ上で解析）
+    PARSE_INLINE_MAX_CHARS: int = 100_000  # これ以下のHTMLはプールに送らずその場で解析
+    HTML_EXTRACTOR: Literal["streaming", "soup"] = "streaming"  # streaming（1パス抽出）または soup（BeautifulSoup）
+    ROBOTS_CACHE_TTL: int = 60 * 60 * 6  # robots.txtのキャッシュ有効期限（秒）
+    ROBOTS_CACHE_NEGATIVE_TTL: int = 60 * 30  # 404・取得エラー時のキャッシュ有効期限（秒）
+    ROBOTS_CACHE_MAX_ENTRIES: int = 5000
+    ROBOTS_FETCH_TIMEOUT: float = 10.0
+    HTTP_POOL_LIMIT: int = 100  # 共有HTTPクライアントの最大接続数
+    HTTP_POOL_LIMIT_PER_HOST: int = 4  # ホストごとの最大接続数
+    HTTP_DNS_CACHE_TTL: int = 300  # DNSキャッシュの有効期限（秒）
+    HTTP_KEEPALIVE_TIMEOUT: float = 30.0  # アイドル接続を保持する時間（秒）
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    SERP_PROVIDER: Optional[str] = None  # fixture（テスト・ローカル開発用）, serpapi, google_cse。未設定の場合は検索（/scraping/search・ジョブのワーカー）だけがエラーになる
+    SERP_FIXTURE_PATH: Optional[str] = None  # 未指定の場合は同梱のフィクスチャを使用
+    SERP_API_KEY: Optional[str] = None
+    GOOGLE_CSE_ID: Optional[str] = None
+    SERP_LOCALE: str = "ja-JP"
+    SERP_DEVICE: str = "desktop"
+    SERP_RESULTS: int = 10  # プロバイダーから取得する件数
+    SERP_TIMEOUT: float = 15.0
+    SERP_CACHE_TTL: int = 60 * 60 * 6  # 検索結果のキャッシュ有効期限（秒）
+    SERP_CACHE_NEGATIVE_TTL: int = 60 * 5  # 検索結果が空だった場合のキャッシュ有効期限（秒）
+    SERP_CACHE_MAX_ENTRIES: int = 2000
+    PAGE_CACHE_ENABLED: bool = True  # スクレイピングしたページをローカルにキャッシュ
+    PAGE_CACHE_PATH: str = ".cache/page_cache.sqlite3"
+    PAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 本文の合計サイズ上限
+    DEDUP_ENABLED: bool = True  # ほぼ同じ内容のページ（転載・コピー記事）をまとめる
+    DEDUP_INDEX_PATH: str = ".cache/dedup_index.sqlite3"  # 過去に見たページの署名の保存先
+    DEDUP_INDEX_MAX_ENTRIES: int = 100000
+    DEDUP_THRESHOLD: float = 0.8  # 重複とみなす推定 Jaccard 係数
+    DEDUP_SHINGLE_SIZE: int = 5  # シングル（文字 n-gram）の文字数
+    DEDUP_NUM_PERM: int = 128  # MinHash の署名の長さ
+    DEDUP_BANDS: int = 16  # LSH のバンド数（DEDUP_NUM_PERM の約数）
+    DEDUP_MIN_CHARS: int = 200  # これより短い本文は比較しない
+    JOB_WORKER_MODE: str = "inprocess"  # inprocess: APIサーバー内で実行 / external: python -m app.worker で実行
+    JOB_WORKER_CONCURRENCY: int = 2  # 同時に実行するジョブ数
+    JOB_POLL_INTERVAL: float = 2.0  # 待機中ジョブ・キャンセル要求の確認間隔（秒）
+    JOB_LEASE_SECONDS: float = 60.0  # 実行中のジョブの期限（ワーカーが 1/3 ごとに延長し、過ぎたら別のワーカーが再取得する）
+    JOB_MAX_ATTEMPTS: int = 3  # 期限切れによる再実行を含めた実行回数の上限（超えたら failed）
 
     @property
     def async_database_url(self) -> str:
@@ -58,6 +161,18 @@ def get_settings() -> Settings:
     else:
         logger.warning("DATABASE_URL not found in environment variables, using default Docker Compose configuration")
     logger.info(f"Database URL: {settings.DATABASE_URL}")
+    # 再試行をすべて行う場合の最悪の所要時間が SCRAPE_TIMEOUT に収まるか確認する
+    retries = settings.SCRAPE_MAX_RETRIES
+    backoff = sum(
+        min(settings.SCRAPE_RETRY_BASE_DELAY * 2 ** attempt, settings.SCRAPE_RETRY_MAX_DELAY)
+        for attempt in range(retries)
+    )
+    scrape_budget = (retries + 1) * settings.SCRAPE_ATTEMPT_TIMEOUT + retries * settings.SCRAPE_DELAY + backoff
+    if scrape_budget > settings.SCRAPE_TIMEOUT:
+        logger.warning(
+            f"SCRAPE_TIMEOUT ({settings.SCRAPE_TIMEOUT}s) is shorter than the worst case with retries "
+            f"({scrape_budget:.1f}s); later retries will be skipped"
+        )
     return settings
 
 # グローバル変数として設定を提供
@@ -0,0 +1,262 @@
+"""
+Prometheus のテキスト形式で公開するメトリクス。
+
+記録は頻繁に呼ばれる処理の中で行うため、できるだけ軽くしている。
+- カウンター・ヒストグラムの値はロックを使わずに更新する（記録はすべてイベントループのスレッドで行う）
+- ヒストグラムのバケットは作成時に確保し、記録は二分探索と加算だけ
+- ラベルの組み合わせはメトリクスごとに METRICS_MAX_SERIES 件までとし、超えた分は "other" にまとめる
+  （ホスト名のように種類が多いラベルでメモリが増え続けないようにする）
+既存の統計（キャッシュのヒット数・コネクションプールの状態など）は callback で登録し、
+/metrics の出力時にだけ読み取る。
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# 秒単位のバケット（上限値）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+OVERFLOW_LABEL = "other"
+
+CallbackValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最後は +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), max_series: Optional[int] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series or settings.METRICS_MAX_SERIES
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _new(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """ラベルの値に対応する系列（上限を超えた新しい組み合わせは "other" にまとめる）"""
+        series = self._series.get(values)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                values = (OVERFLOW_LABEL,) * len(self.labelnames)
+                series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = self._new()
+        return series
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        """ラベルのないカウンターを増やす"""
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, series in list(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(series.value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, max_series: Optional[int] = None):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """ラベルのないヒストグラムに記録する"""
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), list(series.counts)):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """出力時に関数を呼んで値を読み取るメトリクス（既存の統計の公開用）"""
+
+    def __init__(self, name: str, documentation: str, func: Callable[[], CallbackValue],
+                 labelnames: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        value = self.func()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        lines = self.header()
+        for values, sample in items:
+            if sample is not None:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, func: Callable[[], CallbackValue],
+                 labelnames: Sequence[str] = (), kind: str = "gauge") -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, func, labelnames, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def names(self) -> Iterable[str]:
+        return self._metrics.keys()
+
+
+registry = MetricsRegistry()
+
+# APIリクエスト（route はパスのテンプレート。ストリーミングのレスポンスも本文の送信が終わるまでの時間）
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+
+# スクレイピング
+scrape_fetch_duration = registry.histogram(
+    "scrape_fetch_duration_seconds", "Time to fetch one page (one attempt) by host", ("host",)
+)
+scrape_parse_duration = registry.histogram(
+    "scrape_parse_duration_seconds", "Time to extract page information by host", ("host",)
+)
+
+# データベース
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent getting a connection from the pool", ("pool",)
+)
+
+# 記事生成（stream の場合の所要時間は最後のトークンまで、トークン数は本文からの見積もり）
+llm_request_duration = registry.histogram(
+    "llm_request_duration_seconds", "LLM request latency including scheduling and retries", ("mode",),
+    buckets=LLM_BUCKETS,
+)
+llm_first_token = registry.histogram(
+    "llm_first_token_seconds", "Time to the first streamed token", buckets=LLM_BUCKETS
+)
+llm_requests = registry.counter("llm_requests_total", "LLM requests by outcome", ("mode", "outcome"))
+llm_tokens = registry.counter("llm_tokens_total", "LLM tokens by kind", ("mode", "kind"))
+
+# 認証
+password_verify_duration = registry.histogram(
+    "password_verify_duration_seconds", "bcrypt verification time in authenticate, including queueing",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class MetricsMiddleware:
+    """
+    ルートごとのリクエスト数・レイテンシーを記録する ASGI ミドルウェア。
+    ルートは内側のアプリが返った後に scope["route"] から読み取り、
+    パスの値ではなくテンプレート（/content/{content_id} など）で集計する。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            http_request_duration.labels(scope["method"], path).observe(time.perf_counter() - started)
+            http_requests.labels(scope["method"], path, str(status)).inc()
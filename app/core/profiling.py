@@ -0,0 +1,410 @@
+"""
+リクエスト単位のサンプリングプロファイラー。
+
+X-Profile-Token ヘッダー（PROFILE_ADMIN_TOKEN と一致する場合）または PROFILE_SAMPLE_RATE の確率で
+選ばれたリクエストだけを計測し、結果を PROFILE_DIR に保存する。
+- 計測中だけ別スレッドを動かし、PROFILE_INTERVAL_MS ごとにイベントループのスレッドのスタックを読み取る
+- リクエストの中で作成されたタスク（contextvars で判定）を記録し、サンプルはそのタスクが実行中の場合だけ数える
+  （同時に処理している他のリクエストの処理は含めない）
+- cpu: 実行中のスタック、wall: 実行中のスタックと await で待っている位置（タスクごと）
+  どちらも collapsed 形式（"frame;frame;... 回数"）で、flamegraph.pl や speedscope でそのまま読み込める
+- タスクごとの開始・終了時刻と実行中だったサンプル数を JSON に保存する
+計測対象でないリクエストはヘッダーの確認と乱数の比較だけで、タスクの記録やスタックの読み取りは行わない。
+スレッドプール・プロセスプールで実行した処理は、呼び出したタスクの await として wall に含まれる。
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_KINDS = ("cpu", "wall", "json")
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+
+_active_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+# イベントループごとの実行中のタスク（asyncio.current_task と同じもの。別スレッドから読み取る）
+_current_tasks: Dict[Any, asyncio.Task] = getattr(asyncio.tasks, "_current_tasks", {})
+_path_prefixes = (os.getcwd() + os.sep, *sorted({p + os.sep for p in sys.path if p}, key=len, reverse=True))
+
+
+def _short_filename(filename: str) -> str:
+    for prefix in _path_prefixes:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({_short_filename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _frame_stack(frame) -> List[str]:
+    """スレッドのスタック（外側から順に）。イベントループ自体のフレームは除く"""
+    labels: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        # asyncio.events.Handle._run より外側はイベントループの処理
+        if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        labels.append(_frame_label(code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _await_stack(task: asyncio.Task) -> List[str]:
+    """停止中のタスクが await している位置（コルーチンの呼び出し順）"""
+    labels: List[str] = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) \
+            or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            # Future などのコルーチン以外
+            labels.append(f"[await {type(awaitable).__name__}]")
+            break
+        labels.append(_frame_label(frame.f_code))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) \
+            or getattr(awaitable, "ag_await", None)
+    return labels
+
+
+def _collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+@dataclass
+class TaskTiming:
+    name: str
+    coro: str
+    started_ms: float
+    ended_ms: Optional[float] = None
+    on_cpu_samples: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} ({self.coro})"
+
+
+class RequestProfile:
+    """1リクエストの計測結果"""
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.status: Optional[int] = None
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        self.duration_ms = 0.0
+        self.loop_cpu_ms = 0.0
+        self.samples = 0
+        self.cpu_stacks: Counter = Counter()
+        self.wall_stacks: Counter = Counter()
+        self.tasks: Dict[asyncio.Task, TaskTiming] = {}
+        self.context_token: Optional[contextvars.Token] = None
+
+    def _offset_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def track(self, task: asyncio.Task) -> None:
+        """リクエストの処理を行うタスクとして記録（イベントループのスレッドから呼ぶ）"""
+        coro = task.get_coro()
+        self.tasks[task] = TaskTiming(
+            name=task.get_name(),
+            coro=getattr(coro, "__qualname__", type(coro).__name__),
+            started_ms=self._offset_ms(),
+        )
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        timing = self.tasks.get(task)
+        if timing is not None and timing.ended_ms is None:
+            timing.ended_ms = self._offset_ms()
+
+    def sample(self, frames: Dict[int, Any]) -> None:
+        """サンプラーのスレッドから呼ばれる"""
+        self.samples += 1
+        running = _current_tasks.get(self.loop)
+        for task, timing in list(self.tasks.items()):
+            if timing.ended_ms is not None or task.done():
+                continue
+            if task is running:
+                frame = frames.get(self.thread_id)
+                if frame is None:
+                    continue
+                stack = ";".join(_frame_stack(frame))
+                timing.on_cpu_samples += 1
+                self.cpu_stacks[stack] += 1
+                self.wall_stacks[f"{timing.label};{stack}"] += 1
+            else:
+                self.wall_stacks[";".join([timing.label, *_await_stack(task)])] += 1
+
+    def finish(self, status: int) -> None:
+        self.status = status
+        self.duration_ms = self._offset_ms()
+        self.loop_cpu_ms = round((time.thread_time() - self.cpu_started) * 1000, 2)
+        for task in self.tasks:
+            self._task_done(task)
+
+    def summary(self) -> Dict[str, Any]:
+        # 1サンプルあたりの時間は設定値ではなく実際の間隔（スリープの遅れを含む）で換算する
+        interval_ms = self.duration_ms / self.samples if self.samples else settings.PROFILE_INTERVAL_MS
+        tasks = sorted(self.tasks.values(), key=lambda timing: timing.started_ms)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "duration_ms": self.duration_ms,
+            # イベントループのスレッドの CPU 時間（同時に処理した他のリクエストの分を含む）
+            "loop_cpu_ms": self.loop_cpu_ms,
+            "interval_ms": round(interval_ms, 3),
+            "samples": self.samples,
+            "on_cpu_samples": sum(self.cpu_stacks.values()),
+            "on_cpu_ms": round(sum(self.cpu_stacks.values()) * interval_ms, 2),
+            "tasks": [
+                {**asdict(timing), "on_cpu_ms": round(timing.on_cpu_samples * interval_ms, 2)}
+                for timing in tasks
+            ],
+        }
+
+
+class _Sampler:
+    """計測中のリクエストがある間だけ動くサンプリング用のスレッド"""
+
+    def __init__(self):
+        self._profiles: List[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            if profile in self._profiles:
+                self._profiles.remove(profile)
+
+    def _run(self) -> None:
+        interval = settings.PROFILE_INTERVAL_MS / 1000
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in profiles:
+                try:
+                    profile.sample(frames)
+                except Exception as e:  # 計測の失敗でリクエストを止めない
+                    logger.debug(f"Profile sampling failed: {e}")
+            del frames
+            time.sleep(interval)
+
+
+class RequestProfiler:
+    """
+    計測対象のリクエストの判定・タスクの記録・結果の保存。
+    計測中のリクエストがある間だけイベントループのタスクファクトリーを差し替え、
+    リクエストのコンテキストで作成されたタスクを記録する。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._sampler = _Sampler()
+        self._active: List[RequestProfile] = []
+        self._previous_factories: Dict[Any, Any] = {}
+        self.captured = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.PROFILE_ADMIN_TOKEN) or settings.PROFILE_SAMPLE_RATE > 0
+
+    def select(self, scope: Dict[str, Any]) -> Optional[str]:
+        """計測する理由（header / sampled）。計測しない場合は None"""
+        token = settings.PROFILE_ADMIN_TOKEN
+        if token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    if secrets.compare_digest(value, token.encode()):
+                        return "header"
+                    break
+        rate = settings.PROFILE_SAMPLE_RATE
+        if rate > 0 and random.random() < rate and scope["path"].startswith(tuple(settings.PROFILE_SAMPLE_PATHS)):
+            return "sampled"
+        return None
+
+    def start(self, method: str, path: str, reason: str) -> Optional[RequestProfile]:
+        if len(self._active) >= settings.PROFILE_MAX_CONCURRENT:
+            self.skipped += 1
+            return None
+        profile = RequestProfile(method, path, reason)
+        loop = profile.loop
+        if not any(active.loop is loop for active in self._active):
+            self._previous_factories[loop] = loop.get_task_factory()
+            loop.set_task_factory(self._task_factory)
+        self._active.append(profile)
+        profile.context_token = _active_profile.set(profile)
+        profile.track(asyncio.current_task())
+        self._sampler.add(profile)
+        return profile
+
+    def _task_factory(self, loop, coro, **kwargs) -> asyncio.Task:
+        previous = self._previous_factories.get(loop)
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        profile = _active_profile.get()
+        if profile is not None and profile in self._active:
+            profile.track(task)
+        return task
+
+    async def finish(self, profile: RequestProfile, status: int) -> None:
+        self._sampler.remove(profile)
+        self._active.remove(profile)
+        _active_profile.reset(profile.context_token)
+        loop = profile.loop
+        if not any(active.loop is loop for active in self._active):
+            previous = self._previous_factories.pop(loop, None)
+            if loop.get_task_factory() == self._task_factory:
+                loop.set_task_factory(previous)
+        profile.finish(status)
+        summary = profile.summary()
+        try:
+            await asyncio.to_thread(self._save, profile, summary)
+            self.captured += 1
+        except OSError as e:
+            logger.warning(f"Failed to save profile {profile.id}: {e}")
+            return
+        logger.info(
+            f"Profiled {profile.method} {profile.path} ({profile.reason}): {summary['duration_ms']} ms, "
+            f"{summary['on_cpu_ms']} ms on CPU -> {profile.id}"
+        )
+
+    def _save(self, profile: RequestProfile, summary: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.id)
+        with open(f"{base}.cpu.collapsed", "w", encoding="utf-8") as f:
+            f.write(_collapsed(profile.cpu_stacks))
+        with open(f"{base}.wall.collapsed", "w", encoding="utf-8") as f:
+            f.write(_collapsed(profile.wall_stacks))
+        # メタデータは最後に書き込む（一覧には揃ったものだけ出す）
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self._prune()
+
+    def _prune(self) -> None:
+        """古いものから削除して PROFILE_MAX_FILES 件に収める"""
+        ids = self.list_ids()
+        for profile_id in ids[:max(0, len(ids) - settings.PROFILE_MAX_FILES)]:
+            for kind in PROFILE_KINDS:
+                try:
+                    os.remove(self.path_for(profile_id, kind))
+                except FileNotFoundError:
+                    pass
+
+    def list_ids(self) -> List[str]:
+        """保存済みのプロファイルの ID（古い順）"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and PROFILE_ID_RE.match(name[:-5]))
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """保存済みのプロファイルの概要（新しい順、タスクの内訳は除く）"""
+        profiles = []
+        for profile_id in reversed(self.list_ids()):
+            try:
+                with open(self.path_for(profile_id, "json"), encoding="utf-8") as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary.pop("tasks", None)
+            profiles.append(summary)
+        return profiles
+
+    def path_for(self, profile_id: str, kind: str) -> str:
+        if not PROFILE_ID_RE.match(profile_id) or kind not in PROFILE_KINDS:
+            raise ValueError(f"Invalid profile: {profile_id} ({kind})")
+        suffix = "json" if kind == "json" else f"{kind}.collapsed"
+        return os.path.join(self.directory, f"{profile_id}.{suffix}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": settings.PROFILE_SAMPLE_RATE,
+            "active": len(self._active),
+            "captured": self.captured,
+            "skipped": self.skipped,
+            "stored": len(self.list_ids()),
+        }
+
+
+class ProfilingMiddleware:
+    """
+    計測対象のリクエストをプロファイルする ASGI ミドルウェア。
+    ストリーミングのレスポンスも本文の送信が終わるまで計測する。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        reason = request_profiler.select(scope)
+        profile = request_profiler.start(scope["method"], scope["path"], reason) if reason else None
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await request_profiler.finish(profile, status)
+
+
+request_profiler = RequestProfiler(settings.PROFILE_DIR)
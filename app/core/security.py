@@ -1,15 +1,28 @@
+import asyncio
 import os
 import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union
 from jose import jwt
 from passlib.context import CryptContext
+from app.core.config import get_settings
+
+settings = get_settings()
+T = TypeVar("T")
 
 # 環境変数 "SECRET_KEY" が設定されていればその値を使用し、
 # 設定されていなければランダムなシークレットキーを生成
 SECRET_KEY = os.environ.get("SECRET_KEY", secrets.token_urlsafe(32))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# BCRYPT_ROUNDS より弱いハッシュは、ログイン成功時に作り直す（verify_and_update）
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
@@ -28,3 +41,87 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    """パスワード処理の待ちが上限に達している（503 で応答する）"""
+
+
+class PasswordHasher:
+    """
+    bcrypt の計算（1回あたり数百ミリ秒）をイベントループから切り離すスレッドプール。
+    bcrypt は計算中に GIL を解放するため、PASSWORD_HASH_WORKERS 件まで並列に処理できる。
+    実行中と待機中の合計が workers + max_queue に達したら、待たせずに PasswordHasherBusy を送出する。
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.busy_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    @staticmethod
+    def _timed(func: Callable[..., T], *args: Any) -> Tuple[T, float]:
+        started = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - started
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password hashing requests")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(self._get_executor(), self._timed, func, *args)
+            self.busy_seconds += elapsed
+            return result
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """照合結果と、ハッシュを作り直す必要がある場合は新しいハッシュを返す"""
+        verified, new_hash = await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+        if new_hash is not None:
+            self.rehashed += 1
+        return verified, new_hash
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "busy_seconds": round(self.busy_seconds, 2),
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
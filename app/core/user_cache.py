@@ -0,0 +1,133 @@
+"""
+認証済みユーザーのキャッシュ。
+
+get_current_user はリクエストごとにトークンの subject（メールアドレス）で
+users を検索するため、その結果をプロセス内に短時間キャッシュする。
+キャッシュするのは ORM オブジェクトではなく列の値で、ヒット時は
+session.merge(load=False) でリクエストのセッションに SELECT なしで結び付ける。
+
+- 有効期限は AUTH_USER_CACHE_TTL 秒（0 で無効）、件数の上限は AUTH_USER_CACHE_MAX_ENTRIES
+- crud.user.update で更新したユーザーはその場で無効化する
+  （別プロセスのキャッシュには TTL が切れるまで古い値が残る）
+- AUTH_USER_CACHE_STALE_TTL を指定すると、期限切れ後もその秒数までは古い値を返しつつ
+  バックグラウンドで読み直す（stale-while-revalidate）
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.utils.cache import AsyncTTLCache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+UserLoader = Callable[[AsyncSession], Awaitable[Optional[User]]]
+
+_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    return {key: getattr(user, key) for key in _COLUMNS}
+
+
+def _restore(snapshot: Dict[str, Any]) -> User:
+    """列の値から、データベース上に存在する（detached な）User を作る"""
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+class UserCache:
+    def __init__(self, ttl: float, stale_ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._cache = AsyncTTLCache(maxsize=maxsize, ttl=ttl + stale_ttl)
+        self._refreshing: Set[str] = set()
+        self._invalidated_while_refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get_user(self, db: AsyncSession, subject: str, loader: UserLoader) -> Optional[User]:
+        """キャッシュにあればそれを、なければ loader で読み込んで返す"""
+        if not self.enabled:
+            return await loader(db)
+
+        entry = self._cache.get(subject)
+        if entry is not None:
+            snapshot, fresh_until = entry
+            self.hits += 1
+            if time.monotonic() >= fresh_until:
+                self.stale_hits += 1
+                self._schedule_refresh(subject, loader)
+            return await db.merge(_restore(snapshot), load=False)
+
+        self.misses += 1
+        user = await loader(db)
+        if user is not None:
+            self._store(subject, user)
+        return user
+
+    def invalidate(self, subject: str) -> None:
+        self._cache.invalidate(subject)
+        if subject in self._refreshing:
+            self._invalidated_while_refreshing.add(subject)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def _store(self, subject: str, user: User) -> None:
+        self._cache.set(subject, (_snapshot(user), time.monotonic() + self.ttl))
+
+    def _schedule_refresh(self, subject: str, loader: UserLoader) -> None:
+        if subject in self._refreshing:
+            return
+        self._refreshing.add(subject)
+        task = asyncio.create_task(self._refresh(subject, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, subject: str, loader: UserLoader) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                user = await loader(session)
+            # 読み直しの間に更新された場合は、読み直した（古いかもしれない）値を保存しない
+            if subject in self._invalidated_while_refreshing:
+                return
+            if user is None:
+                self._cache.invalidate(subject)
+            else:
+                self._store(subject, user)
+        except Exception as e:
+            logger.error(f"Failed to refresh cached user: {str(e)}")
+        finally:
+            self._refreshing.discard(subject)
+            self._invalidated_while_refreshing.discard(subject)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+user_cache = UserCache(
+    ttl=settings.AUTH_USER_CACHE_TTL,
+    stale_ttl=settings.AUTH_USER_CACHE_STALE_TTL,
+    maxsize=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+)
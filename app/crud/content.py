@@ -0,0 +1,90 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Row, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.content import Content
+
+# 一覧で取得する列（content / analysis_results / scraping_results などの大きな列は読まない）
+SUMMARY_COLUMNS = (
+    Content.id,
+    Content.keyword,
+    Content.title,
+    Content.meta_description,
+    Content.status,
+    Content.wordpress_post_id,
+    Content.created_at,
+    Content.updated_at,
+)
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """encode_cursor の逆変換（不正な値は ValueError）"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(payload)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+async def list_summaries(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    status: Optional[str] = None,
+    keyword: Optional[str] = None,
+) -> Tuple[List[Row], Optional[str]]:
+    """
+    ユーザーのコンテンツを新しい順に limit 件取得し、次のページのカーソルとともに返す。
+    after には decode_cursor で復元した (created_at, id) を渡す。
+    OFFSET ではなく (created_at, id) の位置から読むため、ページが深くなっても遅くならない。
+    """
+    query = select(*SUMMARY_COLUMNS).where(Content.user_id == user_id)
+    if status:
+        query = query.where(Content.status == status)
+    if keyword:
+        query = query.where(Content.keyword == keyword)
+    if after:
+        created_at, last_id = after
+        query = query.where(tuple_(Content.created_at, Content.id) < (created_at, last_id))
+    query = query.order_by(Content.created_at.desc(), Content.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+async def get_for_user(db: AsyncSession, *, content_id: int, user_id: int) -> Optional[Content]:
+    query = select(Content).where(Content.id == content_id, Content.user_id == user_id)
+    return (await db.execute(query)).scalar_one_or_none()
+
+async def create(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    keyword: str,
+    content: str,
+    analysis_results: Optional[Dict[str, Any]] = None,
+    scraping_results: Optional[List[Dict[str, Any]]] = None,
+    status: str = "draft",
+) -> Content:
+    db_obj = Content(
+        user_id=user_id,
+        keyword=keyword,
+        content=content,
+        analysis_results=analysis_results,
+        scraping_results=scraping_results,
+        status=status,
+    )
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj
@@ -1,7 +1,10 @@
+import time
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.core.security import get_password_hash, verify_password
+from app.core import metrics
+from app.core.security import password_hasher
+from app.core.user_cache import user_cache
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
@@ -17,14 +20,22 @@ async def authenticate(db: AsyncSession, email: str, password: str) -> Optional[
     user = await get_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    started = time.perf_counter()
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    metrics.password_verify_duration.observe(time.perf_counter() - started)
+    if not verified:
         return None
+    if new_hash is not None:
+        # 古い設定のハッシュを現在の設定で作り直す
+        user.hashed_password = new_hash
+        await db.commit()
+        user_cache.invalidate(user.email)
     return user
 
 async def create(db: AsyncSession, obj_in: UserCreate) -> User:
     db_obj = User(
         email=obj_in.email,
-        hashed_password=get_password_hash(obj_in.password),
+        hashed_password=await password_hasher.hash(obj_in.password),
         company_name=obj_in.company_name,
         phone_number=obj_in.phone_number,
         is_active=obj_in.is_active,
@@ -39,9 +50,10 @@ async def create(db: AsyncSession, obj_in: UserCreate) -> User:
 async def update(
     db: AsyncSession, db_obj: User, obj_in: UserUpdate
 ) -> User:
+    old_email = db_obj.email
     update_data = obj_in.model_dump(exclude_unset=True)
     if update_data.get("password"):
-        hashed_password = get_password_hash(update_data["password"])
+        hashed_password = await password_hasher.hash(update_data["password"])
         del update_data["password"]
         update_data["hashed_password"] = hashed_password
     
@@ -50,4 +62,7 @@ async def update(
     
     await db.commit()
     await db.refresh(db_obj)
+    # 認証のキャッシュから古い値を削除（メールアドレスの変更にも対応）
+    user_cache.invalidate(old_email)
+    user_cache.invalidate(db_obj.email)
     return db_obj
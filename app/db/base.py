@@ -1,29 +1,6 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
-from app.core.config import get_settings
-
-settings = get_settings()
-
-# SQLAlchemy async engine
-engine = create_async_engine(
-    settings.async_database_url,  # 変更：非同期用URLを使用
-    echo=settings.DEBUG,
-)
-
-# AsyncSession factory
-AsyncSessionLocal = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+from sqlalchemy.orm import declarative_base
+# エンジン・セッションは app.db.session に一本化している（既存のインポート互換のため再エクスポート）
+from app.db.session import engine, AsyncSessionLocal, get_db  # noqa: F401
 
 # SQLAlchemy declarative base
 Base = declarative_base()
-
-# Dependency to get DB session
-async def get_db() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
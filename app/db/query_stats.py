@@ -0,0 +1,86 @@
+"""
+SQLクエリの計測。
+
+エンジンの before/after_cursor_execute イベントで各クエリの実行時間を測り、
+- DB_SLOW_QUERY_MS 以上かかったクエリを警告ログに出力
+- プロセス全体の累計（件数・合計時間・遅いクエリの件数）を集計
+- リクエスト単位の件数・合計時間を集計（N+1 の検出用）
+を行う。リクエスト単位の集計は track_request_queries() で開始し、
+コンテキスト変数で伝播するため、リクエスト内で作成したタスクのクエリも含まれる。
+"""
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_STATEMENT_CHARS = 500
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    slow: int = 0
+
+    def record(self, elapsed_ms: float, slow: bool) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if slow:
+            self.slow += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats["total_ms"] = round(self.total_ms, 2)
+        stats["avg_ms"] = round(self.total_ms / self.count, 2) if self.count else 0.0
+        return stats
+
+
+process_stats = QueryStats()
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def track_request_queries() -> QueryStats:
+    """現在のリクエスト（コンテキスト）のクエリ集計を開始し、集計オブジェクトを返す"""
+    stats = QueryStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def current_request_stats() -> Optional[QueryStats]:
+    return _request_stats.get()
+
+
+def instrument_queries(db_engine: AsyncEngine) -> None:
+    """エンジンにクエリ計測のイベントを登録"""
+
+    @event.listens_for(db_engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(db_engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        slow = elapsed_ms >= settings.DB_SLOW_QUERY_MS
+        process_stats.record(elapsed_ms, slow)
+        request_stats = _request_stats.get()
+        if request_stats is not None:
+            request_stats.record(elapsed_ms, slow)
+        if slow:
+            # パラメーターには個人情報が含まれることがあるため、SQL文のみを出力する
+            logger.warning(
+                f"Slow query ({elapsed_ms:.1f} ms): {' '.join(statement.split())[:MAX_LOGGED_STATEMENT_CHARS]}"
+            )
+
+    @event.listens_for(db_engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # 失敗したクエリの開始時刻を取り除く
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
@@ -1,38 +1,170 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from typing import Any, Dict, Optional
+from uuid import uuid4
 import logging
+import time
+import weakref
+from app.core import metrics
 from app.core.config import get_settings
+from app.db.query_stats import instrument_queries
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+POOL_MODES = ("queue", "null", "pgbouncer")
+
+# エンジンごとのプール統計用カウンター
+_pool_counters: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """接続の取得にかかった時間（空き待ち・新規接続を含む）を記録するプール"""
+    metrics_label = "queue"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_wait.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+class TimedNullPool(NullPool):
+    """接続の取得（毎回の新規接続）にかかった時間を記録するプール"""
+    metrics_label = "null"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_wait.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+def _connect_args(url: str, mode: str) -> Dict[str, Any]:
+    """ドライバーごとの接続オプション（asyncpg 以外には渡さない）"""
+    if not url.startswith("postgresql+asyncpg://"):
+        return {}
+    connect_args: Dict[str, Any] = {
+        "server_settings": {
+            "application_name": "seo_content_generator",
+        },
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+    }
+    if mode == "pgbouncer":
+        # PgBouncer（transaction モード）では接続ごとのプリペアドステートメントを共有できないため、
+        # キャッシュを無効にし、名前が衝突しないようにする
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return connect_args
+
+
+def create_db_engine(url: Optional[str] = None, mode: Optional[str] = None) -> AsyncEngine:
+    """
+    DB_POOL_MODE に応じた非同期エンジンを作成する。
+    - queue: アプリ内でコネクションプールを持つ（DB_POOL_SIZE など）
+    - null: プールせず、セッションごとに接続を開閉する
+    - pgbouncer: 接続のプールは PgBouncer に任せ、アプリ側はプールしない
+    """
+    url = url or settings.async_database_url
+    mode = mode or settings.DB_POOL_MODE
+    if mode not in POOL_MODES:
+        raise ValueError(f"Unknown DB_POOL_MODE: {mode}")
+
+    options: Dict[str, Any] = {
+        "connect_args": _connect_args(url, mode),
+        "echo": settings.DEBUG,  # SQLログを出力（デバッグモード時のみ）
+    }
+    if mode == "queue":
+        options.update(
+            # SQLite（aiosqlite）は既定で NullPool になるため明示する
+            poolclass=TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    else:
+        options["poolclass"] = TimedNullPool
+
+    db_engine = create_async_engine(url, **options)
+    _instrument_pool(db_engine, mode)
+    instrument_queries(db_engine)
+    return db_engine
+
+
+def _instrument_pool(db_engine: AsyncEngine, mode: str) -> None:
+    """プールの統計用カウンターをエンジンに登録"""
+    counters = {"mode": mode, "connects": 0, "checkouts": 0, "invalidations": 0}
+    _pool_counters[db_engine.sync_engine] = counters
+
+    @event.listens_for(db_engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        counters["connects"] += 1
+
+    @event.listens_for(db_engine.sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+    @event.listens_for(db_engine.sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        counters["invalidations"] += 1
+
+
+def pool_stats(db_engine: Optional[AsyncEngine] = None) -> Dict[str, Any]:
+    """コネクションプールの状態と累計の接続数・取得数"""
+    db_engine = db_engine or engine
+    counters = dict(_pool_counters.get(db_engine.sync_engine, {}))
+    pool = db_engine.pool
+    stats: Dict[str, Any] = {**counters, "pool": type(pool).__name__}
+    if counters.get("mode") == "queue":
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+        )
+    checkouts = counters.get("checkouts", 0)
+    # 取得した接続のうち、新たに接続せず再利用できた割合
+    stats["reuse_ratio"] = round(1 - counters.get("connects", 0) / checkouts, 3) if checkouts else 0.0
+    return stats
+
+
 # 非同期エンジンの作成
 try:
-    logger.info("Creating database engine...")
-    engine = create_async_engine(
-        settings.async_database_url,
-        poolclass=NullPool,  # コネクションプールを無効化
-        connect_args={
-            "server_settings": {
-                "application_name": "seo_content_generator",
-            },
-            "command_timeout": 60,  # コマンドタイムアウトを60秒に設定
-        },
-        echo=settings.DEBUG,  # SQLログを出力（デバッグモード時のみ）
-    )
+    logger.info(f"Creating database engine (pool mode: {settings.DB_POOL_MODE})...")
+    engine = create_db_engine()
     logger.info("Database engine created successfully")
 except Exception as e:
     logger.error(f"Failed to create database engine: {str(e)}")
     raise
 
+metrics.registry.callback(
+    "db_pool_connections", "Connections held by the application pool",
+    lambda: {
+        (state,): value for state, value in pool_stats().items() if state in ("checked_in", "checked_out")
+    },
+    labelnames=("state",),
+)
+metrics.registry.callback(
+    "db_pool_connects_total", "New database connections opened", lambda: pool_stats()["connects"], kind="counter"
+)
+metrics.registry.callback(
+    "db_pool_checkouts_total", "Connections checked out from the pool", lambda: pool_stats()["checkouts"], kind="counter"
+)
+
 # 非同期セッションの設定
 AsyncSessionLocal = sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
     autocommit=False,
-    autoflush=False,
 )
 
 async def get_db() -> AsyncSession:
@@ -5,9 +5,21 @@ from app.api.v1.api import api_router
 import logging
 from contextlib import asynccontextmanager
 from app.db.session import AsyncSessionLocal
+from app.db.query_stats import track_request_queries
+from app.core import metrics
+from app.core.profiling import ProfilingMiddleware, request_profiler
+from app.core.security import password_hasher
+from app.services.parse_pool import shutdown_parse_pool
+from app.services.http_client import start_http_client, close_http_client
+from app.services.page_cache import get_page_cache
+from app.services.dedup import get_dedup_index
+from app.services.jobs import worker_pool
+from app.services.generation_cache import get_generation_cache
 from sqlalchemy import text
 from fastapi import Response
 from fastapi import Request
+from fastapi.responses import PlainTextResponse
+import time
 
 # ロギングの設定
 logging.basicConfig(level=logging.INFO)
@@ -31,9 +43,27 @@ async def lifespan(app: FastAPI):
         logger.error(f"Database connection failed: {str(e)}")
         raise
 
+    await start_http_client()
+    if settings.JOB_WORKER_MODE == "inprocess":
+        await worker_pool.start()
+
     yield
 
     logger.info("Shutting down application...")
+    if settings.JOB_WORKER_MODE == "inprocess":
+        await worker_pool.stop()
+    await close_http_client()
+    page_cache = get_page_cache()
+    if page_cache:
+        page_cache.close()
+    generation_cache = get_generation_cache()
+    if generation_cache:
+        generation_cache.close()
+    dedup_index = get_dedup_index()
+    if dedup_index:
+        dedup_index.close()
+    shutdown_parse_pool()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -81,6 +111,34 @@ async def options_middleware(request: Request, call_next):
     
     return response
 
+# リクエストごとのSQLクエリ数・合計時間を計測
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    stats = track_request_queries()
+    response = await call_next(request)
+    # ストリーミングのレスポンスでは、本文の送信中に実行されたクエリは含まれない
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Query-Time-Ms"] = f"{stats.total_ms:.1f}"
+    if stats.count >= settings.DB_REQUEST_QUERY_WARN:
+        logger.warning(
+            f"{request.method} {request.url.path} executed {stats.count} queries "
+            f"({stats.total_ms:.1f} ms); possible N+1"
+        )
+    return response
+
+# ルートごとのリクエスト数・レイテンシーを記録
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        """Prometheus のテキスト形式でメトリクスを返す"""
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+# 指定・抽出されたリクエストのプロファイルを取る（最後に追加して最も外側で計測する）
+if request_profiler.enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 # ルートエンドポイントの設定
 @app.get("/")
 async def root():
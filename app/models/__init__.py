@@ -1,3 +1,5 @@
 from .user import User
 from .content import Content
 from .wordpress_config import WordPressConfig
+from .job import Job
+from .generation_cache import GenerationCacheEntry
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -21,5 +21,12 @@ class Content(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # 一覧（新しい順のキーセットページング）と、ステータス・キーワードでの絞り込み用
+        Index("ix_contents_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_contents_user_id_status_created_at_id", "user_id", "status", "created_at", "id"),
+        Index("ix_contents_user_id_keyword_created_at_id", "user_id", "keyword", "created_at", "id"),
+    )
+
     # リレーションシップ
     user = relationship("User", back_populates="contents")
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+
+    key = Column(String(64), primary_key=True)  # モデル・プロンプト版・入力のSHA-256
+    model = Column(String, nullable=False)
+    content = Column(Text, nullable=False)  # 生成された記事（Markdown）
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
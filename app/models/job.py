@@ -0,0 +1,37 @@
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    job_type = Column(String, nullable=False)  # scrape, generate, scrape_and_generate
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed, cancelled
+    params = Column(JSON)  # ジョブの入力（キーワード、分析結果など）
+    result = Column(JSON)  # ジョブの出力
+    error = Column(Text)
+    content_id = Column(Integer, ForeignKey("contents.id"))  # 生成した記事のID
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    locked_by = Column(String)  # 実行中のワーカー（ホスト名:PID:ID）
+    lease_expires_at = Column(DateTime(timezone=True))  # 実行中のワーカーが更新する期限（過ぎたら再取得される）
+    attempts = Column(Integer, default=0, nullable=False)  # 実行を開始した回数
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # ワーカーが待機中のジョブを古い順に取得するためのインデックス
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        # 期限切れの実行中ジョブの再取得用
+        Index("ix_jobs_status_lease_expires_at", "status", "lease_expires_at"),
+        Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+    )
+
+    # リレーションシップ
+    user = relationship("User", back_populates="jobs")
+    content = relationship("Content")
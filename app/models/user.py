@@ -23,3 +23,4 @@ class User(Base):
     # リレーションシップ
     contents = relationship("Content", back_populates="user")
     wordpress_configs = relationship("WordPressConfig", back_populates="user")
+    jobs = relationship("Job", back_populates="user")
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class ContentSummary(BaseModel):
+    """一覧表示用（本文やスクレイピング結果などの大きな列は含まない）"""
+    id: int
+    keyword: str
+    title: Optional[str] = None
+    meta_description: Optional[str] = None
+    status: Optional[str] = None
+    wordpress_post_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ContentDetail(ContentSummary):
+    """1件の取得用（本文を含む）"""
+    content: Optional[str] = None
+
+class ContentPage(BaseModel):
+    items: List[ContentSummary]
+    next_cursor: Optional[str] = None  # 次のページを取得するときに cursor に指定する
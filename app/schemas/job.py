@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional
+from datetime import datetime
+
+JobType = Literal["scrape", "generate", "scrape_and_generate"]
+
+class JobCreate(BaseModel):
+    job_type: JobType
+    keyword: str
+    analysis_results: Optional[Dict[str, Any]] = None  # generate の場合に使用
+    locale: Optional[str] = None  # scrape / scrape_and_generate の場合に使用
+    device: Optional[str] = None
+    no_cache: bool = False  # 生成結果のキャッシュを使わずに再生成する
+
+class Job(BaseModel):
+    id: int
+    job_type: str
+    status: str
+    params: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    content_id: Optional[int] = None
+    cancel_requested: bool = False
+    attempts: int = 0
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,224 @@
+"""
+OpenAI API を使った記事生成。
+
+/content/generate とバックグラウンドジョブの両方から利用する。
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from openai import AsyncOpenAI
+from app.core.config import get_settings
+from app.core import metrics
+from app.services.generation_cache import get_generation_cache, make_cache_key
+from app.services.keyword_analysis import with_keyword_analysis
+from app.services.llm_scheduler import get_llm_scheduler
+from app.services.prompt_compaction import compact_analysis, estimate_tokens, prompt_token_budget
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# SYSTEM_PROMPT やメッセージの組み立てを変更したら上げる（生成キャッシュのキーに含まれる）
+PROMPT_VERSION = 3
+
+SYSTEM_PROMPT = """
+あなたはSEOと文章作成の専門家です。提供されたスクレイピング情報（5つの記事）を分析し、
+分析結果を元に同キーワードで上位表示（1位取得を目標）できるようSEOに最適化された記事を生成してください。
+
+分析すべきポイント：
+1. 1位・2位記事と3〜5位記事の違い
+2. タイトル・メタディスクリプション（文字数、含まれるキーワード、訴求内容）
+3. 見出しタグの構成、キーワード配置、情報の網羅性
+4. 本文の文字数やキーワード出現数（分析結果の keyword_analysis に上位ページの語句の統計があります）
+5. E-E-A-T要素（筆者プロフィール、監修、引用元など）
+6. 検索意図への合致度合い
+7. 内部リンク・外部リンクの適切さ
+8. 画像のaltテキストやメディア最適化
+9. 上位表示のために特に重要と思われる要素
+10. タイトル・ディスクリプションのクリック率向上策
+11. 見出しタグの論理構成と段落整理
+12. ユーザビリティ（箇条書きや表、FAQなど）
+13. E-E-A-T補強策（専門性、権威性、信用性、経験の訴求）
+
+出力は必ずMarkdown形式で行い、以下のセクションを含めてください：
+
+# 比較分析結果
+## 1位・2位記事 vs 3〜5位記事の相違点
+- 主要な違い
+- 重要な考察
+
+# 上位表示のための施策とポイント
+## 必須コンテンツ要素
+- 検索意図を満たすために必要な情報
+- E-E-A-T強化のポイント
+- 技術的な最適化項目
+
+# 最適化された記事案
+## メタ情報
+- タイトル案（H1）
+- メタディスクリプション
+
+## 記事構成
+- 見出し構成（H2-H5）
+- 各セクションの本文
+- 画像配置案とalt属性
+- FAQ（必要な場合）
+- まとめ/結論
+- CTA（行動喚起）
+"""
+
+USER_PROMPT_TEMPLATE = """
+以下のキーワードと分析結果を元に、上記のフォーマットで記事を生成してください：
+
+キーワード: {keyword}
+分析結果: {analysis}
+"""
+
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """OpenAI クライアントを取得（プロセス内で共有）"""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            # 再試行は LLMScheduler がレート制限と合わせて行う
+            max_retries=0,
+        )
+    return _client
+
+
+def prompt_analysis(keyword: str, analysis_results: Dict[str, Any]) -> str:
+    """
+    プロンプトに含める分析結果（JSON 文字列）。
+    スクレイピング結果からキーワード分析を追加し、コンテキスト長に収まるよう圧縮する。
+    """
+    reserved = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(USER_PROMPT_TEMPLATE.format(keyword=keyword, analysis=""))
+    analysis_results = with_keyword_analysis(keyword, analysis_results)
+    return compact_analysis(analysis_results, prompt_token_budget(reserved))
+
+
+def build_messages(keyword: str, analysis: str) -> List[Dict[str, str]]:
+    """記事生成用のメッセージを組み立てる（analysis は prompt_analysis の結果）"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": USER_PROMPT_TEMPLATE.format(keyword=keyword, analysis=analysis)},
+    ]
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]]) -> int:
+    """レート制限用に、リクエストが消費するトークン数（入力＋出力）を見積もる"""
+    return sum(estimate_tokens(m["content"]) for m in messages) + settings.LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+def generation_cache_key(keyword: str, analysis_results: Dict[str, Any]) -> str:
+    return make_cache_key(settings.OPENAI_MODEL, PROMPT_VERSION, keyword, analysis_results)
+
+
+async def generate_article(
+    keyword: str,
+    analysis_results: Dict[str, Any],
+    use_cache: bool = True,
+) -> str:
+    """
+    分析結果を基に記事（Markdown）を生成。
+    use_cache が True の場合、同じ入力で生成済みの記事があればそれを返す。
+    """
+    cache = get_generation_cache() if use_cache else None
+    if cache:
+        # キーは元の分析結果から計算し、ヒットした場合はキーワード分析・圧縮を行わない
+        key = await asyncio.to_thread(generation_cache_key, keyword, analysis_results)
+        cached = await cache.get(key)
+        if cached is not None:
+            logger.info(f"Generation cache hit: {keyword}")
+            return cached
+
+    # 分析結果の圧縮は大きな入力では時間がかかるためスレッドで実行
+    analysis = await asyncio.to_thread(prompt_analysis, keyword, analysis_results)
+    messages = build_messages(keyword, analysis)
+    started = time.perf_counter()
+    try:
+        completion = await get_llm_scheduler().call(
+            lambda: get_openai_client().chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=messages,
+                max_tokens=settings.OPENAI_MAX_OUTPUT_TOKENS,
+            ),
+            tokens=estimate_request_tokens(messages),
+        )
+    except Exception:
+        metrics.llm_requests.labels("complete", "error").inc()
+        raise
+    metrics.llm_request_duration.labels("complete").observe(time.perf_counter() - started)
+    metrics.llm_requests.labels("complete", "ok").inc()
+    if completion.usage:
+        metrics.llm_tokens.labels("complete", "prompt").inc(completion.usage.prompt_tokens)
+        metrics.llm_tokens.labels("complete", "completion").inc(completion.usage.completion_tokens)
+    content = completion.choices[0].message.content
+
+    if cache and content:
+        await cache.set(key, settings.OPENAI_MODEL, content)
+    return content
+
+
+async def stream_article(
+    keyword: str,
+    analysis_results: Dict[str, Any],
+    use_cache: bool = True,
+) -> AsyncIterator[str]:
+    """
+    記事を生成し、モデルが出力したテキストを届いた順に返す。
+    キャッシュにある場合は保存済みの記事をまとめて返す。
+    """
+    cache = get_generation_cache() if use_cache else None
+    if cache:
+        key = await asyncio.to_thread(generation_cache_key, keyword, analysis_results)
+        cached = await cache.get(key)
+        if cached is not None:
+            logger.info(f"Generation cache hit: {keyword}")
+            yield cached
+            return
+
+    analysis = await asyncio.to_thread(prompt_analysis, keyword, analysis_results)
+    messages = build_messages(keyword, analysis)
+    parts = []
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        async with get_llm_scheduler().stream(
+            lambda: get_openai_client().chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=messages,
+                max_tokens=settings.OPENAI_MAX_OUTPUT_TOKENS,
+                stream=True,
+            ),
+            tokens=estimate_request_tokens(messages),
+        ) as stream:
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not parts:
+                            metrics.llm_first_token.observe(time.perf_counter() - started)
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            finally:
+                # クライアントが途中で切断した場合もAPIへの接続を閉じる
+                await stream.close()
+        outcome = "ok"
+    except (GeneratorExit, asyncio.CancelledError):
+        outcome = "cancelled"
+        raise
+    finally:
+        metrics.llm_requests.labels("stream", outcome).inc()
+
+    # ストリーミングでは usage が返らないため、トークン数は見積もり
+    metrics.llm_request_duration.labels("stream").observe(time.perf_counter() - started)
+    metrics.llm_tokens.labels("stream", "prompt").inc(sum(estimate_tokens(m["content"]) for m in messages))
+    metrics.llm_tokens.labels("stream", "completion").inc(estimate_tokens("".join(parts)))
+
+    # 最後まで生成できた場合だけキャッシュする
+    if cache and parts:
+        await cache.set(key, settings.OPENAI_MODEL, "".join(parts))
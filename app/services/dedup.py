@@ -0,0 +1,265 @@
+"""
+スクレイピングしたページの重複（転載・コピー記事）の検出。
+
+本文を正規化して文字 DEDUP_SHINGLE_SIZE-gram に分け、MinHash の署名（DEDUP_NUM_PERM 個の最小値）を計算する。
+署名は LSH（DEDUP_BANDS 個のバンド）のインデックスとともに SQLite に保存し、
+過去のスクレイピングで見たページとも比較する。推定 Jaccard 係数が DEDUP_THRESHOLD 以上のページは
+同じクラスター（最初に見たページのURL）に属するとみなし、1回の検索結果の中では
+クラスターごとに最も順位の高いページだけを残して、ほかは本文を除いた重複として返す。
+
+署名は固定のシードから作るため、プロセスやサーバーをまたいで比較できる。
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    url TEXT PRIMARY KEY,
+    cluster TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_signatures_seen_at ON signatures (seen_at);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    key INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (band, key, url)
+);
+CREATE INDEX IF NOT EXISTS ix_bands_url ON bands (url);
+"""
+
+_SHINGLE_BASE = np.uint64(1_000_003)
+_MINHASH_SEED = 20240601
+_CHUNK = 4096
+
+
+def normalize_content(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def shingle_hashes(text: str, size: int) -> np.ndarray:
+    """文字 size-gram のハッシュ値（重複なし、uint64）"""
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    count = len(codepoints) - size + 1
+    if count <= 0:
+        return np.array([], dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(size):
+            hashes = hashes * _SHINGLE_BASE + codepoints[offset:offset + count]
+        # 下位ビットの偏りをならす（splitmix64 の最終段）
+        hashes ^= hashes >> np.uint64(31)
+        hashes *= np.uint64(0xBF58476D1CE4E5B9)
+        hashes ^= hashes >> np.uint64(29)
+    return np.unique(hashes)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int, bands: int, seed: int = _MINHASH_SEED):
+        if num_perm % bands:
+            raise ValueError("DEDUP_NUM_PERM must be a multiple of DEDUP_BANDS")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # h(x) = (a * x + b) mod 2^64 の上位32ビット（a は奇数）
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for start in range(0, len(hashes), _CHUNK):
+                block = hashes[start:start + _CHUNK]
+                values = (np.outer(self._a, block) + self._b[:, None]) >> np.uint64(32)
+                signature = np.minimum(signature, values.min(axis=1))
+        return signature.astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """LSH のバンドごとのキー（SQLite の INTEGER に収まる符号付き64ビット）"""
+        return [
+            int.from_bytes(
+                hashlib.blake2b(signature[i * self.rows:(i + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                "little",
+                signed=True,
+            )
+            for i in range(self.bands)
+        ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """2つの署名から推定した Jaccard 係数"""
+    return float(np.mean(a == b))
+
+
+class DedupIndex:
+    def __init__(self, path: str, hasher: MinHasher, threshold: float, max_entries: int):
+        self.path = path
+        self.hasher = hasher
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.duplicates = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _assign_one(self, conn: sqlite3.Connection, url: str, signature: np.ndarray) -> Tuple[str, float]:
+        """署名をインデックスに登録し、(クラスター, 最も近いページとの類似度) を返す"""
+        keys = self.hasher.band_keys(signature)
+        candidates: Dict[str, Tuple[str, bytes]] = {}
+        for band, key in enumerate(keys):
+            for other_url, cluster, blob in conn.execute(
+                "SELECT s.url, s.cluster, s.signature FROM bands b JOIN signatures s ON s.url = b.url "
+                "WHERE b.band = ? AND b.key = ?",
+                (band, key),
+            ):
+                if other_url != url:
+                    candidates[other_url] = (cluster, blob)
+
+        cluster, best = url, 0.0
+        for other_cluster, blob in candidates.values():
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= self.threshold and score > best:
+                cluster, best = other_cluster, score
+
+        conn.execute("DELETE FROM bands WHERE url = ?", (url,))
+        conn.execute(
+            "INSERT OR REPLACE INTO signatures (url, cluster, signature, seen_at) VALUES (?, ?, ?, ?)",
+            (url, cluster, signature.tobytes(), time.time()),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO bands (band, key, url) VALUES (?, ?, ?)",
+            [(band, key, url) for band, key in enumerate(keys)],
+        )
+        return cluster, best
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """件数が上限を超えたら、最も長く見ていないページから削除"""
+        count = conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        stale = [row[0] for row in conn.execute(
+            "SELECT url FROM signatures ORDER BY seen_at LIMIT ?", (count - self.max_entries,)
+        )]
+        conn.executemany("DELETE FROM bands WHERE url = ?", [(url,) for url in stale])
+        conn.executemany("DELETE FROM signatures WHERE url = ?", [(url,) for url in stale])
+
+    def _assign_sync(self, items: Sequence[Tuple[str, np.ndarray]]) -> List[Tuple[str, float]]:
+        with self._lock:
+            conn = self._connect()
+            assigned = [self._assign_one(conn, url, signature) for url, signature in items]
+            self._evict(conn)
+            conn.commit()
+        return assigned
+
+    async def assign(self, items: Sequence[Tuple[str, np.ndarray]]) -> List[Tuple[str, float]]:
+        """ページを順に登録し、それぞれのクラスターと類似度を返す（先に登録したページが基準になる）"""
+        return await asyncio.to_thread(self._assign_sync, items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "pages": self.pages, "duplicates": self.duplicates}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_dedup_index: Optional[DedupIndex] = None
+
+
+def get_dedup_index() -> Optional[DedupIndex]:
+    """重複検出のインデックスを取得（DEDUP_ENABLED が False の場合は None）"""
+    global _dedup_index
+    if not settings.DEDUP_ENABLED:
+        return None
+    if _dedup_index is None:
+        _dedup_index = DedupIndex(
+            settings.DEDUP_INDEX_PATH,
+            MinHasher(settings.DEDUP_NUM_PERM, settings.DEDUP_BANDS),
+            threshold=settings.DEDUP_THRESHOLD,
+            max_entries=settings.DEDUP_INDEX_MAX_ENTRIES,
+        )
+    return _dedup_index
+
+
+def _signatures(hasher: MinHasher, contents: List[str]) -> List[np.ndarray]:
+    return [
+        hasher.signature(shingle_hashes(normalize_content(content), settings.DEDUP_SHINGLE_SIZE))
+        for content in contents
+    ]
+
+
+async def collapse_duplicates(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    検索結果（順位順）のうち、上位のページとほぼ同じ内容のページを
+    {"url", "title", "duplicate_of", "similarity"} に置き換える（similarity は duplicate_of のページとの類似度）。
+    過去に見た転載元と一致したページには near_duplicate_of と、そのクラスターで最も近いページとの
+    類似度 similarity を付ける（本文は残す）。
+    """
+    index = get_dedup_index()
+    if index is None:
+        return pages
+
+    targets = [
+        i for i, page in enumerate(pages)
+        if not page.get("blocked") and len(page.get("content") or "") >= settings.DEDUP_MIN_CHARS
+    ]
+    if not targets:
+        return pages
+    try:
+        signatures = await asyncio.to_thread(
+            _signatures, index.hasher, [pages[i]["content"] for i in targets]
+        )
+        assigned = await index.assign([(pages[i]["url"], sig) for i, sig in zip(targets, signatures)])
+    except Exception as e:
+        # 重複検出に失敗してもスクレイピング結果はそのまま返す
+        logger.error(f"Near-duplicate detection failed: {str(e)}")
+        return pages
+
+    results = list(pages)
+    # クラスターごとに残したページの (URL, 署名)
+    kept: Dict[str, Tuple[str, np.ndarray]] = {}
+    for i, signature, (cluster, score) in zip(targets, signatures, assigned):
+        page = pages[i]
+        index.pages += 1
+        if cluster in kept:
+            index.duplicates += 1
+            kept_url, kept_signature = kept[cluster]
+            results[i] = {
+                "url": page["url"],
+                "title": page.get("title"),
+                "duplicate_of": kept_url,
+                "similarity": round(similarity(signature, kept_signature), 3),
+                "blocked": False,
+            }
+            continue
+        kept[cluster] = (page["url"], signature)
+        if cluster != page["url"]:
+            results[i] = {**page, "near_duplicate_of": cluster, "similarity": round(score, 3)}
+    return results
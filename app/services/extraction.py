@@ -0,0 +1,85 @@
+"""
+HTMLからページ情報を抽出する純粋関数群。
+
+イベントループ上のインライン実行とプロセスプール上での実行の両方から
+呼び出されるため、設定やセッションなどのグローバル状態には依存しない。
+"""
+from typing import Any, Dict, List
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from app.services.streaming_extraction import extract_page_streaming
+
+# 抽出結果の形式や内容が変わったら上げる（ページキャッシュの抽出結果を無効化する）
+EXTRACTION_VERSION = 1
+
+
+def extract_title(soup: BeautifulSoup) -> str:
+    """タイトルタグの抽出"""
+    title = soup.title
+    return title.string.strip() if title and title.string else ""
+
+
+def extract_meta_description(soup: BeautifulSoup) -> str:
+    """メタディスクリプションの抽出"""
+    meta = soup.find("meta", attrs={"name": "description"})
+    return meta.get("content", "").strip() if meta else ""
+
+
+def extract_headings(soup: BeautifulSoup) -> Dict[str, List[str]]:
+    """見出し構造の抽出"""
+    headings = {}
+    for i in range(1, 7):
+        tag = f"h{i}"
+        headings[tag] = [h.get_text().strip() for h in soup.find_all(tag)]
+    return headings
+
+
+def extract_content(soup: BeautifulSoup) -> str:
+    """本文コンテンツの抽出（不要な要素をツリーから削除する）"""
+    # 不要な要素を削除
+    for tag in soup(["script", "style", "nav", "header", "footer"]):
+        tag.decompose()
+
+    # 本文を抽出
+    content = soup.find("main") or soup.find("article") or soup.find("body")
+    return content.get_text(" ", strip=True) if content else ""
+
+
+def extract_images(soup: BeautifulSoup, base_url: str) -> List[Dict[str, str]]:
+    """画像情報の抽出"""
+    images = []
+    for img in soup.find_all("img"):
+        src = img.get("src", "")
+        if src:
+            images.append({
+                "src": urljoin(base_url, src),
+                "alt": img.get("alt", "")
+            })
+    return images
+
+
+def extract_page_soup(html: str, url: str) -> Dict[str, Any]:
+    """
+    BeautifulSoup でツリーを構築し、タイトル・メタ情報・見出し・本文・画像を
+    まとめた辞書を返す（ストリーミング抽出の基準となる実装）。
+    extract_content がツリーを変更するため、抽出の順序は変更しないこと。
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    return {
+        "title": extract_title(soup),
+        "meta_description": extract_meta_description(soup),
+        "headings": extract_headings(soup),
+        "content": extract_content(soup),
+        "images": extract_images(soup, url),
+    }
+
+
+EXTRACTORS = {
+    "streaming": extract_page_streaming,
+    "soup": extract_page_soup,
+}
+
+
+def extract_page(html: str, url: str, engine: str = "streaming") -> Dict[str, Any]:
+    """指定したエンジンでページ情報を抽出する"""
+    return EXTRACTORS[engine](html, url)
@@ -0,0 +1,120 @@
+"""
+レスポンス本文のストリーミング読み込み。
+
+response.text() は本文全体をバッファしてから（場合によっては文字コード推定のために
+全体を走査して）デコードするため、巨大なファイルや終わらないレスポンスで
+ワーカーのメモリを圧迫する。ここではチャンク単位で読み込み、
+- Content-Type が許可リストにない場合は本文を読まない
+- 読み込みバイト数の上限を超えたら打ち切る
+- </html> を受信したら残りを読まずに終了する（</html> の後に続く不要なデータや
+  終わらないレスポンスを読まないためで、抽出に必要な部分だけで止めるわけではない。
+  </html> より前は見出し・画像などの抽出に使うため、上限までは最後まで読み込む）
+- 文字コードはヘッダーと先頭チャンクだけから判定する
+"""
+import codecs
+import re
+import sys
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, Optional
+import aiohttp
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.I)
+_HTML_END_RE = re.compile(rb'</html\s*>', re.I)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_SNIFF_BYTES = 4096
+
+
+class ContentNotAllowed(Exception):
+    """読み込み対象外のレスポンス（Content-Type やサイズ）"""
+
+
+@dataclass
+class FetchedBody:
+    text: str
+    charset: str
+    bytes_read: int
+    peak_bytes_estimate: int  # 本文のバイト列とデコード後の文字列の合計（実測値ではない）
+    truncated: bool
+    stopped_at_html_end: bool  # </html> の後に未読のデータを残して終了した
+
+    def stats(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        del stats["text"]
+        return stats
+
+
+def _valid_charset(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def sniff_charset(head: bytes) -> Optional[str]:
+    """先頭のバイト列（BOM・meta タグ）から文字コードを判定"""
+    for bom, charset in _BOMS:
+        if head.startswith(bom):
+            return charset
+    match = _META_CHARSET_RE.search(head[:_SNIFF_BYTES])
+    if match:
+        return _valid_charset(match.group(1).decode("ascii", "ignore"))
+    return None
+
+
+def check_content_type(response: aiohttp.ClientResponse, allowed: Iterable[str]) -> None:
+    """Content-Type が許可リストに含まれているか確認"""
+    content_type = response.content_type.lower()
+    if content_type not in allowed:
+        raise ContentNotAllowed(f"対応していないコンテンツタイプです: {content_type}")
+
+
+async def read_limited_body(
+    response: aiohttp.ClientResponse,
+    max_bytes: int,
+    chunk_size: int = 64 * 1024,
+) -> FetchedBody:
+    """
+    本文を最大 max_bytes まで読み込んでデコードする。
+    上限を超えた場合は読み込んだ分だけを返す（truncated=True）。
+    """
+    buffer = bytearray()
+    truncated = False
+    stopped_at_html_end = False
+    charset = _valid_charset(response.charset)
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        remaining = max_bytes - len(buffer)
+        if len(chunk) > remaining:
+            buffer += chunk[:remaining]
+            truncated = True
+            break
+        # 直前のチャンクとの境界をまたぐ </html> も検出できるよう少し重ねて検索
+        search_from = max(len(buffer) - 8, 0)
+        buffer += chunk
+        if charset is None and len(buffer) >= min(_SNIFF_BYTES, max_bytes):
+            charset = sniff_charset(bytes(buffer[:_SNIFF_BYTES])) or "utf-8"
+        if _HTML_END_RE.search(buffer, search_from):
+            stopped_at_html_end = not response.content.at_eof()
+            break
+
+    if charset is None:
+        charset = sniff_charset(bytes(buffer[:_SNIFF_BYTES])) or "utf-8"
+
+    text = buffer.decode(charset, errors="replace")
+    # デコード直後はバイト列と文字列の両方を保持しているため、その合計をピークの目安とする
+    # （aiohttp 内部のバッファやデコード中の一時オブジェクトは含まない）
+    peak_bytes_estimate = len(buffer) + sys.getsizeof(text)
+    return FetchedBody(
+        text=text,
+        charset=charset,
+        bytes_read=len(buffer),
+        peak_bytes_estimate=peak_bytes_estimate,
+        truncated=truncated,
+        stopped_at_html_end=stopped_at_html_end,
+    )
@@ -0,0 +1,269 @@
+"""
+記事生成結果のキャッシュ。
+
+同じモデル・同じプロンプト・同じ入力での再生成は、OpenAI API を呼ばずに
+保存済みの記事を返す。キャッシュキーは次の値を正規化した JSON の SHA-256:
+- モデル名
+- プロンプトのバージョン（プロンプトを変更したら上げる）
+- キーワード（NFKC正規化・空白の統一）
+- analysis_results（キーをソートした JSON。取得の統計や類似度などの診断用の値は除く）
+
+キーは分析結果の圧縮やキーワード分析の前に計算するため、ヒットした場合はそれらを行わない。
+
+保存先は GENERATION_CACHE_BACKEND で切り替える。
+- disk: ローカルの SQLite ファイル（プロセス・ワーカー間で共有）
+- database: アプリのデータベースの generation_cache テーブル（複数サーバーで共有）
+- none: キャッシュしない
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import delete, func, select
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.generation_cache import GenerationCacheEntry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def canonical_json(value: Any) -> str:
+    """キーの順序や空白に左右されない JSON 文字列"""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", keyword).split())
+
+
+# 取得ごとに変わる診断用の値（プロンプトには含めないため、キーからも除く）
+VOLATILE_PAGE_FIELDS = frozenset({"fetch_stats", "similarity", "near_duplicate_of"})
+
+
+def strip_volatile_fields(analysis_results: Dict[str, Any]) -> Dict[str, Any]:
+    """scraping_results の各ページから VOLATILE_PAGE_FIELDS を除いた分析結果"""
+    pages = analysis_results.get("scraping_results")
+    if not isinstance(pages, list):
+        return analysis_results
+    return {
+        **analysis_results,
+        "scraping_results": [
+            {key: value for key, value in page.items() if key not in VOLATILE_PAGE_FIELDS}
+            if isinstance(page, dict) else page
+            for page in pages
+        ],
+    }
+
+
+def make_cache_key(model: str, prompt_version: int, keyword: str, analysis_results: Dict[str, Any]) -> str:
+    payload = canonical_json({
+        "model": model,
+        "prompt_version": prompt_version,
+        "keyword": normalize_keyword(keyword),
+        "analysis_results": strip_volatile_fields(analysis_results or {}),
+    })
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache(ABC):
+    name: str
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def _set(self, key: str, model: str, content: str) -> None:
+        ...
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            content = await self._get(key)
+        except Exception as e:
+            # キャッシュの障害で記事生成を止めない
+            logger.error(f"Generation cache lookup failed: {str(e)}")
+            content = None
+        if content is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return content
+
+    async def set(self, key: str, model: str, content: str) -> None:
+        try:
+            await self._set(key, model, content)
+        except Exception as e:
+            logger.error(f"Generation cache store failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        pass
+
+
+class DiskGenerationCache(GenerationCache):
+    """ローカルの SQLite ファイルに保存するキャッシュ"""
+    name = "disk"
+
+    def __init__(self, path: str, ttl: int, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at);"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT content, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return row[0]
+
+    def _set_sync(self, key: str, model: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, model, content, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now + self.ttl, now),
+            )
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            # 件数が上限を超えたら参照の古いものから削除
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, model: str, content: str) -> None:
+        await asyncio.to_thread(self._set_sync, key, model, content)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class DatabaseGenerationCache(GenerationCache):
+    """アプリのデータベース（generation_cache テーブル）に保存するキャッシュ"""
+    name = "database"
+
+    async def _get(self, key: str) -> Optional[str]:
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as session:
+            entry = await session.get(GenerationCacheEntry, key)
+            if entry is None:
+                return None
+            expires_at = entry.expires_at
+            if expires_at.tzinfo is None:  # SQLite はタイムゾーンを保存しない
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at <= now:
+                await session.delete(entry)
+                await session.commit()
+                return None
+            entry.accessed_at = now
+            await session.commit()
+            return entry.content
+
+    async def _set(self, key: str, model: str, content: str) -> None:
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as session:
+            await session.merge(GenerationCacheEntry(
+                key=key,
+                model=model,
+                content=content,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl),
+                accessed_at=now,
+            ))
+            await session.execute(
+                delete(GenerationCacheEntry).where(GenerationCacheEntry.expires_at <= now)
+            )
+            count = await session.scalar(select(func.count()).select_from(GenerationCacheEntry))
+            if count > self.max_entries:
+                oldest = select(GenerationCacheEntry.key).order_by(
+                    GenerationCacheEntry.accessed_at
+                ).limit(count - self.max_entries)
+                await session.execute(
+                    delete(GenerationCacheEntry).where(GenerationCacheEntry.key.in_(oldest))
+                )
+            await session.commit()
+
+
+_generation_cache: Optional[GenerationCache] = None
+
+
+def get_generation_cache() -> Optional[GenerationCache]:
+    """設定された記事生成キャッシュを取得（GENERATION_CACHE_BACKEND が none の場合は None）"""
+    global _generation_cache
+    backend = settings.GENERATION_CACHE_BACKEND
+    if backend == "none":
+        return None
+    if _generation_cache is None:
+        if backend == "disk":
+            _generation_cache = DiskGenerationCache(
+                settings.GENERATION_CACHE_PATH,
+                ttl=settings.GENERATION_CACHE_TTL,
+                max_entries=settings.GENERATION_CACHE_MAX_ENTRIES,
+            )
+        elif backend == "database":
+            _generation_cache = DatabaseGenerationCache(
+                ttl=settings.GENERATION_CACHE_TTL,
+                max_entries=settings.GENERATION_CACHE_MAX_ENTRIES,
+            )
+        else:
+            raise ValueError(f"Unknown generation cache backend: {backend}")
+    return _generation_cache
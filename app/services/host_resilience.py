@@ -0,0 +1,281 @@
+"""
+スクレイピング対象ホストごとの流量制御と障害対策。
+
+プロセス全体でホストごとに次の状態を持ち、ScrapingService のインスタンスをまたいで共有する。
+- レート制限: 容量 SCRAPE_HOST_BURST、SCRAPE_DELAY 秒ごとに補充されるトークンバケット。
+  429・503 を受けたら Retry-After の間は送信を止め、補充間隔を倍にする（上限 SCRAPE_MAX_DELAY）。
+  成功するたびに間隔を SCRAPE_DELAY まで少しずつ戻す。
+- サーキットブレーカー: 接続エラー・タイムアウト・5xx が SCRAPE_BREAKER_FAILURES 回続いたら、
+  SCRAPE_BREAKER_COOLDOWN 秒間そのホストへのリクエストを送らない。その後1件だけ試し、
+  成功すれば再開、失敗すれば再び止める。
+- レイテンシー: 応答時間のヒストグラムと直近の値（ヘッジリクエストの判断に使う p95）。
+- 同時実行数: ホストごとに SCRAPE_PER_HOST_CONCURRENCY 件、プロセス全体で
+  SCRAPE_CONCURRENCY 件（scrape_slots）まで。検索・ジョブが同時に走っても合計で制限する。
+"""
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional
+from app.core.config import get_settings
+
+settings = get_settings()
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# レート制限として扱うステータス（503 はホストの障害としても数える）
+THROTTLE_STATUSES = (429, 503)
+
+# ヒストグラムのバケット（ミリ秒、上限値）
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000)
+RECENT_LATENCY_SAMPLES = 100
+
+
+class HostUnavailable(Exception):
+    """サーキットブレーカーが開いているためリクエストを送らなかった"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After ヘッダー（秒数または HTTP 日付）を秒数に変換"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_delay(attempt: int) -> float:
+    """再試行までの待ち時間（指数バックオフ、フルジッター）"""
+    return random.uniform(0, min(settings.SCRAPE_RETRY_MAX_DELAY, settings.SCRAPE_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class AdaptiveRateLimiter:
+    """
+    ホストごとのトークンバケット。
+    取得のたびに送信時刻を予約するため、同時に待っている取得も到着順に間隔を空けて送信される。
+    """
+
+    def __init__(self, interval: float, burst: int, max_interval: float):
+        self.base_interval = interval
+        self.interval = interval
+        self.max_interval = max_interval
+        self.burst = max(1, burst)
+        self._next_at = 0.0  # バケットが満タンのときに送信できる最も早い時刻の基準
+        self._blocked_until = 0.0
+        self.throttled = 0
+
+    def _reserve(self, now: float) -> float:
+        start = max(now, self._next_at - (self.burst - 1) * self.interval, self._blocked_until)
+        self._next_at = max(self._next_at, start) + self.interval
+        return start
+
+    async def acquire(self) -> float:
+        """送信できるまで待ち、待った秒数を返す"""
+        now = time.monotonic()
+        wait = self._reserve(now) - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return max(wait, 0.0)
+
+    async def acquire_within(self, max_wait: float) -> bool:
+        """max_wait 秒以内に送信できる場合だけ待ってトークンを取得する（できない場合は予約しない）"""
+        now = time.monotonic()
+        start = max(now, self._next_at - (self.burst - 1) * self.interval, self._blocked_until)
+        if start - now > max_wait:
+            return False
+        await self.acquire()
+        return True
+
+    def try_acquire(self) -> bool:
+        """待たずに送信できる場合だけトークンを取得する（ヘッジリクエスト用）"""
+        now = time.monotonic()
+        if max(self._next_at - (self.burst - 1) * self.interval, self._blocked_until) > now:
+            return False
+        self._reserve(now)
+        return True
+
+    def on_throttled(self, retry_after: Optional[float]) -> None:
+        """429・503 を受けたら間隔を広げ、Retry-After（なければ新しい間隔）の間は送信しない"""
+        self.throttled += 1
+        self.interval = min(max(self.interval * 2, 1.0), self.max_interval)
+        pause = retry_after if retry_after is not None else self.interval
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + min(pause, self.max_interval))
+        self._next_at = max(self._next_at, self._blocked_until)
+
+    def on_success(self) -> None:
+        if self.interval > self.base_interval:
+            self.interval = max(self.base_interval, self.interval * 0.8)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """リクエストを送ってよいか（止めている間は False、再開の試行は1件だけ許可）"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def abandon(self) -> None:
+        """再開の試行が結果を出さずに終わった（キャンセルなど）場合に、次の試行を許可する"""
+        self._trial_in_flight = False
+
+    def retry_in(self) -> float:
+        """再開を試すまでの秒数"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self._recent: Deque[float] = deque(maxlen=RECENT_LATENCY_SAMPLES)
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self._recent.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """直近の応答時間のパーセンタイル（秒）"""
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    @property
+    def samples(self) -> int:
+        return len(self._recent)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["le_inf"]
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum_ms / self.count, 1) if self.count else None,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class HostState:
+    def __init__(self, host: str):
+        self.host = host
+        self.slots = asyncio.Semaphore(settings.SCRAPE_PER_HOST_CONCURRENCY)
+        self.limiter = AdaptiveRateLimiter(
+            interval=settings.SCRAPE_DELAY,
+            burst=settings.SCRAPE_HOST_BURST,
+            max_interval=settings.SCRAPE_MAX_DELAY,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.SCRAPE_BREAKER_FAILURES,
+            cooldown=settings.SCRAPE_BREAKER_COOLDOWN,
+        )
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+
+    def hedge_after(self) -> Optional[float]:
+        """ヘッジリクエストを送るまでの秒数（無効・サンプル不足の場合は None）"""
+        if not settings.SCRAPE_HEDGE_ENABLED or self.latency.samples < settings.SCRAPE_HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.percentile(95)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "breaker_opened": self.breaker.opened,
+            "retry_in": round(self.breaker.retry_in(), 1),
+            "interval": round(self.limiter.interval, 2),
+            "throttled": self.limiter.throttled,
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "skipped": self.skipped,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "latency": self.latency.to_dict(),
+        }
+
+
+class HostRegistry:
+    """ホストごとの状態（件数が上限を超えたら使われていないものから削除）"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._hosts: "OrderedDict[str, HostState]" = OrderedDict()
+
+    def get(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(host)
+            while len(self._hosts) > self.max_entries:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return state
+
+    def clear(self) -> None:
+        self._hosts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": len(self._hosts),
+            "open_breakers": sum(1 for s in self._hosts.values() if s.breaker.state != CLOSED),
+            "by_host": {host: state.stats() for host, state in self._hosts.items()},
+        }
+
+
+host_registry = HostRegistry(max_entries=settings.SCRAPE_HOST_STATE_MAX_ENTRIES)
+# プロセス全体の同時フェッチ数（ScrapingService のインスタンスをまたいで共有する）
+scrape_slots = asyncio.Semaphore(settings.SCRAPE_CONCURRENCY)
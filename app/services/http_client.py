@@ -0,0 +1,115 @@
+"""
+アプリケーション全体で共有する aiohttp クライアント。
+
+リクエストごとに ClientSession を作るとDNS解決・TCP/TLS接続を毎回やり直すため、
+lifespan で1つのセッションを作成し、keep-alive 接続とDNSキャッシュを再利用する。
+"""
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+import aiohttp
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_session: Optional[aiohttp.ClientSession] = None
+_stats = {
+    "requests": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+    "dns_cache_hits": 0,
+    "dns_cache_misses": 0,
+}
+
+
+async def _on_request_start(session, context, params: aiohttp.TraceRequestStartParams):
+    _stats["requests"] += 1
+
+
+async def _on_connection_create_end(session, context, params):
+    _stats["connections_created"] += 1
+
+
+async def _on_connection_reuseconn(session, context, params):
+    _stats["connections_reused"] += 1
+
+
+async def _on_dns_cache_hit(session, context, params):
+    _stats["dns_cache_hits"] += 1
+
+
+async def _on_dns_cache_miss(session, context, params):
+    _stats["dns_cache_misses"] += 1
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=SimpleNamespace)
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_dns_cache_hit.append(_on_dns_cache_hit)
+    trace_config.on_dns_cache_miss.append(_on_dns_cache_miss)
+    return trace_config
+
+
+def create_http_client(**connector_kwargs: Any) -> aiohttp.ClientSession:
+    """設定に基づいて接続プール付きのクライアントを作成"""
+    options = dict(
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+    )
+    options.update(connector_kwargs)
+    connector = aiohttp.TCPConnector(**options)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(
+            total=None, sock_connect=settings.HTTP_CONNECT_TIMEOUT
+        ),
+        trace_configs=[_trace_config()],
+    )
+
+
+async def start_http_client() -> aiohttp.ClientSession:
+    """共有クライアントを作成（lifespan の起動時に呼び出す）"""
+    global _session
+    if _session is None or _session.closed:
+        logger.info("Creating shared HTTP client")
+        _session = create_http_client()
+    return _session
+
+
+async def close_http_client() -> None:
+    """共有クライアントを閉じる（lifespan の終了時に呼び出す）"""
+    global _session
+    if _session is not None:
+        logger.info("Closing shared HTTP client")
+        await _session.close()
+        _session = None
+
+
+def get_http_client() -> aiohttp.ClientSession:
+    """
+    共有クライアントを取得する。
+    lifespan の外（スクリプトやワーカーなど）から呼ばれた場合はその場で作成する。
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = create_http_client()
+    return _session
+
+
+def http_client_stats() -> Dict[str, Any]:
+    """接続プールの統計情報（接続の再利用率など）"""
+    stats: Dict[str, Any] = dict(_stats)
+    connections = stats["connections_created"] + stats["connections_reused"]
+    stats["connection_reuse_ratio"] = (
+        stats["connections_reused"] / connections if connections else 0.0
+    )
+    stats["limit"] = settings.HTTP_POOL_LIMIT
+    stats["limit_per_host"] = settings.HTTP_POOL_LIMIT_PER_HOST
+    stats["open"] = _session is not None and not _session.closed
+    return stats
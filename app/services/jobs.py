@@ -0,0 +1,348 @@
+"""
+スクレイピング・記事生成パイプラインのバックグラウンドジョブ。
+
+ジョブとその状態は jobs テーブルに保存し、ワーカーはテーブルから待機中の
+ジョブを取得して実行する。ジョブの取得は「status が queued のままなら
+running に更新する」条件付き UPDATE で行うため、同じプロセス内の複数の
+ワーカーでも、別プロセスのワーカー（python -m app.worker）でも
+同じジョブが二重に実行されることはない。
+
+実行中のジョブには実行しているワーカーと期限（JOB_LEASE_SECONDS）を記録し、
+ワーカーは実行中に期限を延長する。プロセスが異常終了して期限が切れたジョブは、
+別のワーカーが待機中のジョブと同じように取得して再実行する（JOB_MAX_ATTEMPTS 回まで）。
+期限が切れたワーカーは延長に失敗した時点でジョブを中断し、結果を書き込まない。
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.crud import content as content_crud
+from app.models.job import Job
+from app.services.content_generation import generate_article
+from app.services.http_client import get_http_client
+from app.services.scraping import ScrapingService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobError(Exception):
+    """ジョブの実行に失敗した（エラー内容はジョブに記録される）"""
+
+
+def _lease_deadline() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+# --- ジョブの処理内容 ---
+
+async def _save_content(
+    user_id: int,
+    keyword: str,
+    content: str,
+    analysis_results: Dict[str, Any],
+    scraping_results: Optional[List[Dict[str, Any]]] = None,
+) -> int:
+    """生成した記事を下書きとして保存"""
+    async with AsyncSessionLocal() as session:
+        db_obj = await content_crud.create(
+            session,
+            user_id=user_id,
+            keyword=keyword,
+            content=content,
+            analysis_results=analysis_results,
+            scraping_results=scraping_results,
+        )
+        return db_obj.id
+
+
+async def run_scrape(user_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    async with ScrapingService(session=get_http_client()) as scraping_service:
+        result = await scraping_service.scrape_keyword(
+            params["keyword"], locale=params.get("locale"), device=params.get("device")
+        )
+    if result is None:
+        raise JobError("検索結果が見つかりませんでした")
+    return result
+
+
+async def run_generate(user_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    keyword = params["keyword"]
+    analysis_results = params.get("analysis_results") or {}
+    generated_content = await generate_article(
+        keyword, analysis_results, use_cache=not params.get("no_cache", False)
+    )
+    content_id = await _save_content(user_id, keyword, generated_content, analysis_results)
+    return {
+        "keyword": keyword,
+        "content_id": content_id,
+        "generated_content": generated_content,
+    }
+
+
+async def run_scrape_and_generate(user_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    keyword = params["keyword"]
+    scraped = await run_scrape(user_id, params)
+    analysis_results = {"scraping_results": scraped["results"]}
+    generated_content = await generate_article(
+        keyword, analysis_results, use_cache=not params.get("no_cache", False)
+    )
+    content_id = await _save_content(
+        user_id,
+        keyword,
+        generated_content,
+        analysis_results,
+        scraping_results=[
+            {
+                "url": page["url"],
+                "title": page.get("title"),
+                "blocked": page.get("blocked"),
+                "duplicate_of": page.get("duplicate_of"),
+            }
+            for page in scraped["results"]
+        ],
+    )
+    return {
+        "keyword": keyword,
+        "content_id": content_id,
+        "total_results": scraped["total_results"],
+        "generated_content": generated_content,
+    }
+
+
+JOB_HANDLERS: Dict[str, Callable[[int, Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "scrape": run_scrape,
+    "generate": run_generate,
+    "scrape_and_generate": run_scrape_and_generate,
+}
+
+
+# --- ワーカー ---
+
+class JobWorkerPool:
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[int, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        # ジョブの所有者として記録する ID（プロセスごとに異なる）
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def start(self) -> None:
+        logger.info(f"Starting {self.concurrency} job workers")
+        for i in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self) -> None:
+        """ワーカーを停止（実行中のジョブは待機状態に戻す）"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def notify(self) -> None:
+        """新しいジョブが投入されたことをワーカーに知らせる"""
+        self._wakeup.set()
+
+    def cancel_local(self, job_id: int) -> None:
+        """このプロセスで実行中のジョブを即座にキャンセル"""
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                job = await self._claim_next()
+            except Exception as e:
+                logger.error(f"Job worker {index} failed to claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._run(job)
+
+    async def _claim_next(self) -> Optional[Job]:
+        """待機中または期限切れで実行中のジョブを古い順に1つ取得し、running に更新する"""
+        now = datetime.now(timezone.utc)
+        # 期限が未設定の実行中ジョブ（期限の導入前に開始されたもの）も再取得の対象にする
+        expired = or_(Job.lease_expires_at.is_(None), Job.lease_expires_at < now)
+        claimable = or_(Job.status == QUEUED, and_(Job.status == RUNNING, expired))
+        async with AsyncSessionLocal() as session:
+            candidates = (await session.execute(
+                select(Job.id, Job.status, Job.attempts, Job.cancel_requested)
+                .where(claimable)
+                .order_by(Job.created_at, Job.id)
+                .limit(self.concurrency)
+            )).all()
+            for job_id, status, attempts, cancel_requested in candidates:
+                # 読み取った時点から状態が変わっていない場合だけ更新する（他のワーカーとの競合を防ぐ）
+                unchanged = and_(Job.id == job_id, claimable, Job.status == status, Job.attempts == attempts)
+                if status == RUNNING and (cancel_requested or attempts >= settings.JOB_MAX_ATTEMPTS):
+                    final_status = CANCELLED if cancel_requested else FAILED
+                    logger.warning(f"Job {job_id} lease expired; marking as {final_status}")
+                    await session.execute(
+                        update(Job).where(unchanged).values(
+                            status=final_status,
+                            lease_expires_at=None,
+                            finished_at=func.now(),
+                            error=None if cancel_requested else "ワーカーが応答しなくなったため中断しました",
+                        )
+                    )
+                    await session.commit()
+                    continue
+                if status == RUNNING:
+                    logger.warning(f"Job {job_id} lease expired; reclaiming (attempt {attempts + 1})")
+                values: Dict[str, Any] = {
+                    "status": RUNNING,
+                    "locked_by": self.worker_id,
+                    "lease_expires_at": _lease_deadline(),
+                    "attempts": Job.attempts + 1,
+                }
+                if status == QUEUED:
+                    values["started_at"] = func.now()
+                result = await session.execute(update(Job).where(unchanged).values(**values))
+                await session.commit()
+                if result.rowcount == 1:
+                    return await session.get(Job, job_id)
+        return None
+
+    async def _run(self, job: Job) -> None:
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler is None:
+            await self._finish(job.id, FAILED, error=f"Unknown job type: {job.job_type}")
+            return
+
+        logger.info(f"Running job {job.id} ({job.job_type})")
+        task = asyncio.create_task(handler(job.user_id, job.params or {}))
+        self._running[job.id] = task
+        renew_interval = settings.JOB_LEASE_SECONDS / 3
+        renewed = time.monotonic()
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=min(self.poll_interval, renew_interval))
+                if task.done():
+                    break
+                # 期限の延長と、別プロセスからのキャンセル要求の確認はデータベース経由で行う
+                renew = time.monotonic() - renewed >= renew_interval
+                owned, cancel_requested = await self._heartbeat(job.id, renew)
+                if renew and owned:
+                    renewed = time.monotonic()
+                if not owned:
+                    # 期限が切れて別のワーカーが再取得した（結果は書き込まない）
+                    logger.warning(f"Job {job.id} lease lost; abandoning")
+                    task.cancel()
+                    await asyncio.wait({task})
+                    return
+                if cancel_requested:
+                    task.cancel()
+                    await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # ワーカーの停止時は実行中のジョブを待機状態に戻し、次回の起動時に再実行する
+            task.cancel()
+            await self._finish(
+                job.id, QUEUED, started_at=None, locked_by=None, attempts=Job.attempts - 1
+            )
+            raise
+        finally:
+            self._running.pop(job.id, None)
+
+        if task.cancelled():
+            logger.info(f"Job {job.id} cancelled")
+            await self._finish(job.id, CANCELLED)
+        elif task.exception() is not None:
+            logger.error(f"Job {job.id} failed: {str(task.exception())}")
+            await self._finish(job.id, FAILED, error=str(task.exception()))
+        else:
+            result = task.result()
+            logger.info(f"Job {job.id} succeeded")
+            await self._finish(job.id, SUCCEEDED, result=result, content_id=result.get("content_id"))
+
+    async def _heartbeat(self, job_id: int, renew: bool) -> Tuple[bool, bool]:
+        """(このワーカーが所有しているか, キャンセルが要求されているか)。renew の場合は期限を延長する"""
+        owned = and_(Job.id == job_id, Job.status == RUNNING, Job.locked_by == self.worker_id)
+        async with AsyncSessionLocal() as session:
+            if renew:
+                await session.execute(update(Job).where(owned).values(lease_expires_at=_lease_deadline()))
+                await session.commit()
+            row = (await session.execute(
+                select(Job.status, Job.locked_by, Job.cancel_requested).where(Job.id == job_id)
+            )).first()
+        if row is None or row.status != RUNNING or row.locked_by != self.worker_id:
+            return False, False
+        return True, bool(row.cancel_requested)
+
+    async def _finish(self, job_id: int, status: str, **values: Any) -> None:
+        """このワーカーが所有している場合だけジョブの状態を更新する"""
+        if status != QUEUED:
+            values["finished_at"] = func.now()
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == RUNNING, Job.locked_by == self.worker_id)
+                .values(status=status, lease_expires_at=None, **values)
+            )
+            await session.commit()
+
+
+worker_pool = JobWorkerPool(
+    concurrency=settings.JOB_WORKER_CONCURRENCY,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+)
+
+
+# --- 投入・キャンセル ---
+
+async def submit_job(db: AsyncSession, user_id: int, job_type: str, params: Dict[str, Any]) -> Job:
+    """ジョブを投入し、ワーカーに通知する"""
+    job = Job(user_id=user_id, job_type=job_type, status=QUEUED, params=params)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    worker_pool.notify()
+    return job
+
+
+async def cancel_job(db: AsyncSession, job: Job) -> Job:
+    """
+    待機中のジョブはその場でキャンセルし、実行中のジョブにはキャンセルを要求する。
+    実行中のジョブは、実行しているワーカーが要求を検出した時点で cancelled になる。
+    読み取った時点の状態ではなく、更新時のデータベースの状態で判断する
+    （ワーカーが直前に取得した場合も、キャンセルの要求は必ず記録される）。
+    """
+    await db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status.in_((QUEUED, RUNNING)))
+        .values(
+            cancel_requested=True,
+            status=case((Job.status == QUEUED, CANCELLED), else_=Job.status),
+            finished_at=case((Job.status == QUEUED, func.now()), else_=Job.finished_at),
+        )
+    )
+    await db.commit()
+    await db.refresh(job)
+    if job.status == RUNNING:
+        worker_pool.cancel_local(job.id)
+    return job
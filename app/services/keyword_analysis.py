@@ -0,0 +1,331 @@
+"""
+上位ページのキーワード分析。
+
+スクレイピング結果（scrape_page の出力）から、
+- 語句の出現数・出現率（密度）・出現ページ数
+- ページごとの TF-IDF 上位の語句（そのページに特徴的な語句）
+- 対象キーワードの出現率（ページごと）
+- 同じ文に現れる語句の組（共起）と、対象キーワードと共起する語句
+を計算する。
+
+ページをタイトル・メタディスクリプション・見出し・本文の文（コンテキスト）に分け、
+コンテキスト×語句の疎行列を1回作り、以降の集計はすべて行列演算で行う。
+語句への分割は ANALYSIS_TOKENIZER で切り替え、トークナイザーはプロセスごとに1回だけ作成する。
+- regex: 漢字・カタカナ・英数字の連続を1語とする（既定。高速）
+- janome: 形態素解析で名詞を抽出する（精度は高いが遅い。janome のインストールが必要）
+"""
+import logging
+import re
+import threading
+import unicodedata
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from scipy import sparse
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 結果の形式や計算方法が変わったら上げる
+ANALYSIS_VERSION = 1
+
+# ひらがなは助詞・活用語尾が大半のため語句に含めない
+_TERM_RE = re.compile(
+    r"[一-鿿々〆ヶ]{2,}"  # 漢字の連続
+    r"|[ァ-ヴ][ァ-ヴー]+"  # カタカナの連続
+    r"|[a-z][a-z0-9]*(?:[-'][a-z0-9]+)*"  # 英単語
+)
+_SENTENCE_RE = re.compile(r"[。！？!?\n]+|(?<=\.)\s+")
+
+STOPWORDS = frozenset({
+    # 英語
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "with", "you", "your",
+    "com", "www", "http", "https", "html",
+    # 日本語（漢字・カタカナの連続のうち内容を表さないもの）
+    "場合", "以下", "以上", "今回", "一覧", "方法", "必要", "可能", "利用", "使用",
+    "記事", "ページ", "サイト", "コメント", "ホーム", "トップ", "メニュー", "カテゴリー",
+})
+
+# コンテキストの種類
+TITLE, META_DESCRIPTION, HEADING, BODY = range(4)
+
+
+def normalize_text(text: str) -> str:
+    """全角英数字・半角カナなどを統一し、英字を小文字にする"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+class RegexTokenizer:
+    name = "regex"
+
+    def tokenize(self, text: str) -> List[str]:
+        return [term for term in _TERM_RE.findall(normalize_text(text)) if term not in STOPWORDS]
+
+
+class JanomeTokenizer:
+    name = "janome"
+    EXCLUDED_NOUN_TYPES = {"非自立", "代名詞", "数", "接尾"}
+
+    def __init__(self):
+        try:
+            from janome.tokenizer import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("ANALYSIS_TOKENIZER=janome requires the janome package") from e
+        # 辞書の読み込みに時間がかかるため、インスタンスを使い回す
+        self._tokenizer = Tokenizer()
+
+    def tokenize(self, text: str) -> List[str]:
+        terms = []
+        for token in self._tokenizer.tokenize(normalize_text(text)):
+            pos = token.part_of_speech.split(",")
+            if pos[0] != "名詞" or pos[1] in self.EXCLUDED_NOUN_TYPES:
+                continue
+            term = token.surface
+            if len(term) >= 2 and term not in STOPWORDS:
+                terms.append(term)
+        return terms
+
+
+TOKENIZERS = {
+    "regex": RegexTokenizer,
+    "janome": JanomeTokenizer,
+}
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """プロセス内で共有するトークナイザーを取得（分析はスレッドから呼ばれるためロックする）"""
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            name = settings.ANALYSIS_TOKENIZER
+            if name not in TOKENIZERS:
+                raise ValueError(f"Unknown ANALYSIS_TOKENIZER: {name}")
+            _tokenizer = TOKENIZERS[name]()
+        return _tokenizer
+
+
+def _page_contexts(page: Dict[str, Any]) -> List[tuple]:
+    """ページを (種類, テキスト) のコンテキストに分割"""
+    contexts = [(TITLE, page.get("title") or ""), (META_DESCRIPTION, page.get("meta_description") or "")]
+    headings = page.get("headings")
+    if isinstance(headings, dict):
+        contexts.extend((HEADING, text) for texts in headings.values() for text in texts or [])
+    contexts.extend((BODY, sentence) for sentence in _SENTENCE_RE.split(page.get("content") or ""))
+    return [(kind, text) for kind, text in contexts if text and text.strip()]
+
+
+def _keyword_density(keyword: str, content: str) -> Dict[str, Any]:
+    """本文の文字数に対するキーワードの文字数の割合（空白は除いて数える）"""
+    needle = "".join(normalize_text(keyword).split())
+    text = "".join(normalize_text(content).split())
+    occurrences = text.count(needle) if needle else 0
+    density = occurrences * len(needle) / len(text) * 100 if text else 0.0
+    return {"occurrences": occurrences, "density": round(density, 2)}
+
+
+def _indicator(rows: np.ndarray, cols: np.ndarray, shape: tuple) -> sparse.csr_matrix:
+    """(rows[i], cols[i]) の位置を数える疎行列（重複は合算される）"""
+    return sparse.csr_matrix((np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=shape)
+
+
+def _top(scores: np.ndarray, n: int) -> np.ndarray:
+    """スコアの大きい順に最大 n 件のインデックス（0 以下は除く）"""
+    n = min(n, int(np.count_nonzero(scores > 0)))
+    if n <= 0:
+        return np.array([], dtype=np.int64)
+    candidates = np.argpartition(-scores, n - 1)[:n]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _empty_result(keyword: str) -> Dict[str, Any]:
+    return {
+        "version": ANALYSIS_VERSION,
+        "keyword": keyword,
+        "page_count": 0,
+        "total_terms": 0,
+        "keyword_density": {"average": 0.0, "pages": []},
+        "terms": [],
+        "pages": [],
+        "cooccurrence": [],
+        "related_terms": [],
+    }
+
+
+def analyze_pages(
+    keyword: str,
+    pages: Sequence[Dict[str, Any]],
+    top_terms: Optional[int] = None,
+    top_pairs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    上位ページのキーワード分析（CPU処理のため、イベントループからは asyncio.to_thread で呼ぶ）。
+    ブロックされたページ・取得に失敗したページ・重複として除いたページは除外する。
+    """
+    top_terms = top_terms or settings.ANALYSIS_TOP_TERMS
+    top_pairs = top_pairs or settings.ANALYSIS_TOP_PAIRS
+    pages = [
+        page for page in pages
+        if isinstance(page, dict) and not page.get("blocked") and not page.get("error") and not page.get("duplicate_of")
+    ]
+    if not pages:
+        return _empty_result(keyword)
+
+    tokenizer = get_tokenizer()
+    page_contexts = [_page_contexts(page) for page in pages]
+    contexts = list(chain.from_iterable(page_contexts))
+    tokens = [tokenizer.tokenize(text) for _, text in contexts]
+    flat = list(chain.from_iterable(tokens))
+    if not flat:
+        return {**_empty_result(keyword), "page_count": len(pages)}
+
+    n_pages, n_contexts = len(pages), len(contexts)
+    # 語彙（ソート済み）と、各トークンの語彙番号
+    vocab, term_ids = np.unique(np.array(flat), return_inverse=True)
+    n_terms = len(vocab)
+    context_ids = np.repeat(np.arange(n_contexts), [len(t) for t in tokens])
+    context_pages = np.repeat(np.arange(n_pages), [len(c) for c in page_contexts])
+    context_kinds = np.array([kind for kind, _ in contexts])
+
+    # コンテキスト×語句の出現数と、ページ×コンテキストの対応
+    X = _indicator(context_ids, term_ids, (n_contexts, n_terms))
+    P = _indicator(context_pages, np.arange(n_contexts), (n_pages, n_contexts))
+    present = (X > 0).astype(np.float64)
+
+    # ページ×語句の出現数、TF、IDF、TF-IDF（行ごとに L2 正規化）
+    counts = P @ X
+    page_lengths = np.asarray(counts.sum(axis=1)).ravel()
+    tf = sparse.diags(1.0 / np.maximum(page_lengths, 1)) @ counts
+    df = np.bincount(counts.indices, minlength=n_terms)
+    idf = np.log((1 + n_pages) / (1 + df)) + 1
+    tfidf = sparse.csr_matrix(tf @ sparse.diags(idf))
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    tfidf = sparse.csr_matrix(sparse.diags(1.0 / np.maximum(norms, 1e-12)) @ tfidf)
+    mean_tfidf = np.asarray(tfidf.mean(axis=0)).ravel()
+
+    total_counts = np.asarray(counts.sum(axis=0)).ravel()
+    total = float(total_counts.sum())
+
+    def pages_with(kind: int) -> np.ndarray:
+        """種類 kind のコンテキストに語句が現れるページ数"""
+        mask = context_kinds == kind
+        return np.bincount((P[:, mask] @ present[mask]).indices, minlength=n_terms)
+
+    in_titles = pages_with(TITLE)
+    in_headings = pages_with(HEADING)
+
+    # 多くのページで使われている語句を優先し、同数なら出現数の多い順
+    ranking = df * (total + 1) + total_counts
+    top = _top(ranking.astype(np.float64), top_terms)
+    terms = [
+        {
+            "term": str(vocab[i]),
+            "count": int(total_counts[i]),
+            "pages": int(df[i]),
+            "density": round(total_counts[i] / total * 100, 3),
+            "tf_idf": round(float(mean_tfidf[i]), 4),
+            "in_titles": int(in_titles[i]),
+            "in_headings": int(in_headings[i]),
+        }
+        for i in top
+    ]
+
+    densities = [_keyword_density(keyword, page.get("content") or "") for page in pages]
+    page_results = []
+    for row, (page, density) in enumerate(zip(pages, densities)):
+        start, end = tfidf.indptr[row], tfidf.indptr[row + 1]
+        scores, columns = tfidf.data[start:end], tfidf.indices[start:end]
+        page_results.append({
+            "url": page.get("url"),
+            "terms": int(page_lengths[row]),
+            "top_terms": [str(vocab[columns[i]]) for i in _top(scores, settings.ANALYSIS_PAGE_TOP_TERMS)],
+        })
+
+    # 上位語句どうしの共起（同じコンテキストに現れた回数）と lift（語句が2つ以上ある場合のみ）
+    cooccurrence = []
+    if len(top) >= 2:
+        top_present = sparse.csc_matrix(present)[:, top]
+        co = (top_present.T @ top_present).toarray()
+        context_freq = np.diag(co).copy()
+        rows, cols = np.triu_indices(len(top), k=1)
+        pair_counts = co[rows, cols]
+        pair_lift = pair_counts * n_contexts / np.maximum(context_freq[rows] * context_freq[cols], 1)
+        # 共起回数の多い順、同数なら lift の大きい順（1回だけの共起は除く）
+        pair_order = _top(np.where(pair_counts >= 2, pair_counts + pair_lift / (pair_lift.max() + 1), 0), top_pairs)
+        cooccurrence = [
+            {
+                "terms": [str(vocab[top[rows[i]]]), str(vocab[top[cols[i]]])],
+                "contexts": int(pair_counts[i]),
+                "lift": round(float(pair_lift[i]), 2),
+            }
+            for i in pair_order
+        ]
+
+    # 対象キーワードの語句を含むコンテキストに現れる語句
+    keyword_ids = np.array([], dtype=np.int64)
+    keyword_terms = sorted(set(tokenizer.tokenize(keyword)))
+    if keyword_terms:
+        positions = np.minimum(np.searchsorted(vocab, keyword_terms), n_terms - 1)
+        keyword_ids = positions[vocab[positions] == np.array(keyword_terms)]
+    related_terms = []
+    if len(keyword_ids):
+        keyword_contexts = np.asarray(present[:, keyword_ids].sum(axis=1)).ravel() > 0
+        n_keyword_contexts = int(keyword_contexts.sum())
+        related = np.asarray(present[keyword_contexts].sum(axis=0)).ravel()
+        related[keyword_ids] = 0
+        all_freq = np.asarray(present.sum(axis=0)).ravel()
+        lift = related * n_contexts / np.maximum(all_freq * n_keyword_contexts, 1)
+        related_terms = [
+            {"term": str(vocab[i]), "contexts": int(related[i]), "lift": round(float(lift[i]), 2)}
+            for i in _top(np.where(related >= 2, related, 0).astype(np.float64), top_pairs)
+        ]
+
+    return {
+        "version": ANALYSIS_VERSION,
+        "keyword": keyword,
+        "page_count": n_pages,
+        "total_terms": int(total),
+        "keyword_density": {
+            "average": round(float(np.mean([d["density"] for d in densities])), 2),
+            "pages": [{"url": page.get("url"), **density} for page, density in zip(pages, densities)],
+        },
+        "terms": terms,
+        "pages": page_results,
+        "cooccurrence": cooccurrence,
+        "related_terms": related_terms,
+    }
+
+
+def prompt_summary(analysis: Dict[str, Any], max_terms: int = 30, max_related: int = 15) -> Dict[str, Any]:
+    """記事生成のプロンプトに含める要約（語句の一覧を短くしたもの）"""
+    return {
+        "keyword_density": {
+            "average": analysis["keyword_density"]["average"],
+            "pages": [page["density"] for page in analysis["keyword_density"]["pages"]],
+        },
+        "terms": [
+            {key: term[key] for key in ("term", "pages", "count", "in_titles", "in_headings")}
+            for term in analysis["terms"][:max_terms]
+        ],
+        "related_terms": [term["term"] for term in analysis["related_terms"][:max_related]],
+        "page_top_terms": [page["top_terms"][:5] for page in analysis["pages"]],
+    }
+
+
+def with_keyword_analysis(keyword: str, analysis_results: Dict[str, Any]) -> Dict[str, Any]:
+    """analysis_results にスクレイピング結果があれば、キーワード分析の要約を追加する"""
+    analysis_results = analysis_results or {}
+    pages = analysis_results.get("scraping_results")
+    if not isinstance(pages, list) or "keyword_analysis" in analysis_results:
+        return analysis_results
+    try:
+        analysis = analyze_pages(keyword, pages)
+    except Exception as e:
+        # 分析に失敗しても記事生成は続ける
+        logger.error(f"Keyword analysis failed: {str(e)}")
+        return analysis_results
+    return {**analysis_results, "keyword_analysis": prompt_summary(analysis)}
@@ -0,0 +1,186 @@
+"""
+OpenAI API 呼び出しのスケジューリング。
+
+すべての記事生成リクエストはこのスケジューラーを通して送信し、
+- 同時実行数（LLM_CONCURRENCY）
+- 1分あたりのリクエスト数（LLM_REQUESTS_PER_MINUTE）
+- 1分あたりのトークン数（LLM_TOKENS_PER_MINUTE）
+を超えないように待ち合わせる。レート制限（429）や一時的なエラーは
+Retry-After ヘッダー、なければ指数バックオフ（ジッター付き）で再試行する。
+
+制限はプロセスごとに管理するため、APIサーバーとワーカーを複数起動する場合は
+プロセス数で割った値を設定すること。
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+import openai
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class TokenBucket:
+    """
+    1分あたり rate_per_minute の速度で補充されるトークンバケット。
+    待機中の取得は到着順に処理する。rate_per_minute が 0 以下の場合は制限しない。
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """amount 分のトークンを取得し、待機した秒数を返す"""
+        if self.capacity <= 0:
+            return 0.0
+        # 容量を超える要求は満タンになるまで待って取得する
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= amount
+        return waited
+
+    def penalize(self) -> None:
+        """レート制限を受けたときにバケットを空にする"""
+        if self.capacity > 0:
+            self._refill()
+            self.tokens = 0.0
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """エラーレスポンスの Retry-After（秒）を取得"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                continue
+    return None
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+    ):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.completed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+
+    async def _call_with_retry(self, make_request: Callable[[], Awaitable[T]], tokens: int) -> T:
+        attempt = 0
+        while True:
+            self.throttled_seconds += await self._requests.acquire(1)
+            self.throttled_seconds += await self._tokens.acquire(tokens)
+            try:
+                return await make_request()
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.rate_limited += 1
+                    self._requests.penalize()
+                if attempt >= self.max_retries:
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt)
+                    delay *= random.uniform(0.5, 1.0)
+                attempt += 1
+                self.retries += 1
+                logger.warning(
+                    f"OpenAI request failed ({type(e).__name__}); "
+                    f"retrying in {delay:.1f}s ({attempt}/{self.max_retries})"
+                )
+                await asyncio.sleep(delay)
+
+    async def call(self, make_request: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """
+        同時実行数・レート制限の範囲内でリクエストを実行する。
+        tokens はリクエストで消費する見積もりトークン数（入力＋出力）。
+        """
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await self._call_with_retry(make_request, tokens)
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    @asynccontextmanager
+    async def stream(self, make_request: Callable[[], Awaitable[T]], tokens: int) -> AsyncIterator[T]:
+        """ストリーミングのリクエストを開始し、読み終わるまで実行枠を確保する"""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                yield await self._call_with_retry(make_request, tokens)
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+        }
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """プロセス内で共有するスケジューラーを取得"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            concurrency=settings.LLM_CONCURRENCY,
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            max_retries=settings.LLM_MAX_RETRIES,
+            retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+            retry_max_delay=settings.LLM_RETRY_MAX_DELAY,
+        )
+    return _scheduler
@@ -0,0 +1,228 @@
+"""
+スクレイピングしたページのローカルキャッシュ（SQLite）。
+
+- 本文は内容のハッシュ（SHA-256）をキーに保存し、同一内容のページは1つにまとめる
+- ETag / Last-Modified を保存し、再取得時に条件付きリクエストを送る
+- 304 が返った場合はキャッシュの本文を使い、抽出結果も再利用する
+- 本文の合計サイズが上限を超えると、最も長く参照されていないものから削除する
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    body_hash TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    final_url TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_pages_body_hash ON pages (body_hash);
+CREATE TABLE IF NOT EXISTS bodies (
+    hash TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_bodies_accessed_at ON bodies (accessed_at);
+CREATE TABLE IF NOT EXISTS extracted (
+    url TEXT NOT NULL,
+    body_hash TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (url, body_hash, engine)
+);
+"""
+
+
+@dataclass
+class CachedPage:
+    url: str
+    body: str
+    body_hash: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    final_url: Optional[str]
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """再取得時に送る条件付きリクエストヘッダー"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM bodies"
+            ).fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    # --- 同期処理（スレッドで実行） ---
+
+    def _get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT p.body_hash, p.etag, p.last_modified, p.final_url, b.body "
+                "FROM pages p JOIN bodies b ON b.hash = p.body_hash WHERE p.url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE bodies SET accessed_at = ? WHERE hash = ?", (time.time(), row[0])
+            )
+            conn.commit()
+        body_hash, etag, last_modified, final_url, body = row
+        return CachedPage(
+            url=url,
+            body=body.decode("utf-8"),
+            body_hash=body_hash,
+            etag=etag,
+            last_modified=last_modified,
+            final_url=final_url,
+        )
+
+    def _put(
+        self,
+        url: str,
+        body: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        final_url: Optional[str],
+    ) -> str:
+        data = body.encode("utf-8")
+        body_hash = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO bodies (hash, body, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (body_hash, data, len(data), now),
+            ).rowcount
+            if inserted:
+                self._total_bytes += len(data)
+            else:
+                conn.execute(
+                    "UPDATE bodies SET accessed_at = ? WHERE hash = ?", (now, body_hash)
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, body_hash, etag, last_modified, final_url, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, body_hash, etag, last_modified, final_url, now),
+            )
+            self._evict(conn)
+            conn.commit()
+        return body_hash
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """合計サイズが上限を下回るまで、参照の古い本文から削除する"""
+        while self._total_bytes > self.max_bytes:
+            rows = conn.execute(
+                "SELECT hash, size FROM bodies ORDER BY accessed_at LIMIT 50"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for body_hash, size in rows:
+                conn.execute("DELETE FROM bodies WHERE hash = ?", (body_hash,))
+                conn.execute("DELETE FROM pages WHERE body_hash = ?", (body_hash,))
+                conn.execute("DELETE FROM extracted WHERE body_hash = ?", (body_hash,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def _get_extracted(self, url: str, body_hash: str, engine: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT result FROM extracted WHERE url = ? AND body_hash = ? AND engine = ?",
+                (url, body_hash, engine),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put_extracted(self, url: str, body_hash: str, engine: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO extracted (url, body_hash, engine, result) VALUES (?, ?, ?, ?)",
+                (url, body_hash, engine, json.dumps(result, ensure_ascii=False)),
+            )
+            conn.commit()
+
+    # --- 非同期API ---
+
+    async def get(self, url: str) -> Optional[CachedPage]:
+        return await asyncio.to_thread(self._get, url)
+
+    async def put(
+        self,
+        url: str,
+        body: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        final_url: Optional[str] = None,
+    ) -> str:
+        """本文を保存し、内容のハッシュを返す"""
+        return await asyncio.to_thread(self._put, url, body, etag, last_modified, final_url)
+
+    async def get_extracted(self, url: str, body_hash: str, engine: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get_extracted, url, body_hash, engine)
+
+    async def put_extracted(self, url: str, body_hash: str, engine: str, result: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._put_extracted, url, body_hash, engine, result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "total_bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """ページキャッシュを取得（PAGE_CACHE_ENABLED が False の場合は None）"""
+    global _page_cache
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    if _page_cache is None:
+        _page_cache = PageCache(settings.PAGE_CACHE_PATH, settings.PAGE_CACHE_MAX_BYTES)
+    return _page_cache
@@ -0,0 +1,64 @@
+"""
+HTML解析をイベントループから切り離すためのプロセスプール。
+
+大きなページの解析は数百ミリ秒イベントループを占有するため、
+PARSE_INLINE_MAX_CHARS を超えるHTMLはワーカープロセスに送り、
+抽出済みのコンパクトな辞書だけを受け取る。
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+from app.core.config import get_settings
+from app.services.extraction import extract_page
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """プロセスプールを取得（PARSE_POOL_SIZE が0の場合は None）"""
+    global _pool
+    if settings.PARSE_POOL_SIZE <= 0:
+        return None
+    if _pool is None:
+        logger.info(f"Starting HTML parse pool with {settings.PARSE_POOL_SIZE} workers")
+        # uvicorn のスレッドやイベントループを fork で複製しないよう spawn を使用
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PARSE_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_parse_pool() -> None:
+    """プロセスプールを終了"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def parse_html(html: str, url: str) -> Dict[str, Any]:
+    """
+    HTMLからページ情報を抽出する。
+    小さなページはプロセス間通信のコストの方が大きいため、その場で解析する。
+    """
+    pool = get_parse_pool()
+    if pool is None or len(html) <= settings.PARSE_INLINE_MAX_CHARS:
+        return extract_page(html, url, settings.HTML_EXTRACTOR)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            pool, extract_page, html, url, settings.HTML_EXTRACTOR
+        )
+    except BrokenProcessPool:
+        # ワーカーが異常終了した場合はプールを作り直し、今回はその場で解析する
+        logger.error("HTML parse pool is broken, recreating it")
+        shutdown_parse_pool()
+        return extract_page(html, url, settings.HTML_EXTRACTOR)
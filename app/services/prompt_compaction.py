@@ -0,0 +1,188 @@
+"""
+記事生成プロンプトに渡す分析結果の圧縮。
+
+スクレイピング結果には各ページの本文全体が含まれるため、そのまま渡すと
+トークン数（＝遅延とコスト）が膨らみ、コンテキスト長を超えることもある。
+ここでは生成に必要な情報を残したまま次の処理を行う。
+- 定型文（ナビゲーション、フッター、CTA など）の除去。同じサイトの複数ページに現れる断片と、
+  過半数（3ページ以上）のページに現れる断片を定型文とみなす。別々のサイトの2〜3ページが
+  共有する断片は、引用された定義や統計など生成に必要な内容であることが多いため残す
+- ページごとの本文をトークン予算内に切り詰め（元の文字数は残す）
+- 見出し構造を階層ごとの件数と代表的な見出しに要約
+- 画像は件数・alt 設定数・代表的な alt に要約
+- 空白のない JSON で出力
+
+トークン数は tiktoken を使わずに文字種から見積もる（日本語は1文字1トークン程度、
+それ以外は4文字1トークン程度）。見積もりは多めに出るようにしている。
+"""
+import json
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 全角記号・かな・CJK統合漢字・互換漢字・全角英数・ハングル
+_CJK_CLASS = r"\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef\uac00-\ud7af"
+_CJK_RE = re.compile(f"[{_CJK_CLASS}]")
+_SEGMENT_RE = re.compile(rf"(?<=[。！？!?])\s*|(?<=[{_CJK_CLASS}])\s+|\s+(?=[{_CJK_CLASS}])")
+
+HEADING_LIMITS = {"h1": 3, "h2": 20, "h3": 30, "h4": 20}
+MAX_HEADING_CHARS = 80
+MAX_IMAGE_ALTS = 5
+MIN_PAGE_TOKEN_BUDGET = 100
+MIN_BOILERPLATE_PAGES = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """テキストのトークン数を見積もる"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """見積もりトークン数が max_tokens 以下になるよう末尾を切り詰める"""
+    # 1文字は少なくとも 1/4 トークンなので、それより後ろは予算に入らない
+    text = text[:max_tokens * 4 + 4]
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def split_segments(text: str) -> List[str]:
+    """本文を文・テキストノード単位の断片に分割"""
+    return [segment.strip() for segment in _SEGMENT_RE.split(text or "") if segment and segment.strip()]
+
+
+def find_boilerplate(pages: List[List[str]], hosts: Optional[List[str]] = None) -> set:
+    """
+    定型文とみなす断片を返す。
+    - 過半数かつ MIN_BOILERPLATE_PAGES 以上のページに現れる断片
+    - 同じホスト（hosts で指定）の2ページ以上に現れる断片
+    """
+    if len(pages) < 2:
+        return set()
+    hosts = hosts or [None] * len(pages)
+    seen_in: Dict[str, int] = {}
+    seen_on_host: Dict[tuple, int] = {}
+    for segments, host in zip(pages, hosts):
+        for segment in set(segments):
+            seen_in[segment] = seen_in.get(segment, 0) + 1
+            if host:
+                seen_on_host[(host, segment)] = seen_on_host.get((host, segment), 0) + 1
+    min_pages = max(MIN_BOILERPLATE_PAGES, math.ceil(len(pages) / 2))
+    boilerplate = {segment for segment, count in seen_in.items() if count >= min_pages}
+    boilerplate.update(segment for (_, segment), count in seen_on_host.items() if count >= 2)
+    return boilerplate
+
+
+def summarize_headings(headings: Optional[Dict[str, List[str]]]) -> Dict[str, Any]:
+    """見出し構造を件数と代表的な見出しに要約"""
+    headings = headings or {}
+    summary: Dict[str, Any] = {
+        "counts": {level: len(items) for level, items in headings.items() if items},
+    }
+    for level, limit in HEADING_LIMITS.items():
+        unique = list(dict.fromkeys(h[:MAX_HEADING_CHARS] for h in headings.get(level, []) if h))
+        if unique:
+            summary[level] = unique[:limit]
+    return summary
+
+
+def summarize_images(images: Optional[List[Dict[str, str]]]) -> Dict[str, Any]:
+    images = images or []
+    alts = [image.get("alt", "").strip() for image in images]
+    return {
+        "count": len(images),
+        "with_alt": sum(1 for alt in alts if alt),
+        "alts": list(dict.fromkeys(alt for alt in alts if alt))[:MAX_IMAGE_ALTS],
+    }
+
+
+def compact_page(rank: int, page: Dict[str, Any], segments: List[str], boilerplate: set, page_budget: int) -> Dict[str, Any]:
+    if page.get("blocked") or page.get("error"):
+        return {"rank": rank, "url": page.get("url"), "error": page.get("error")}
+    if page.get("duplicate_of"):
+        # 上位のページとほぼ同じ内容のため本文は送らない
+        return {"rank": rank, "url": page.get("url"), "duplicate_of": page["duplicate_of"]}
+
+    content = page.get("content") or ""
+    body_segments = list(dict.fromkeys(s for s in segments if s not in boilerplate))
+    full_body = " ".join(body_segments)
+    body = clip_to_tokens(full_body, page_budget)
+    title = page.get("title") or ""
+    meta_description = page.get("meta_description") or ""
+    return {
+        "rank": rank,
+        "url": page.get("url"),
+        "title": title,
+        "title_length": len(title),
+        "meta_description": meta_description,
+        "meta_description_length": len(meta_description),
+        "headings": summarize_headings(page.get("headings")),
+        "content_length": len(content),  # 元の本文の文字数
+        "content": body,
+        "content_truncated": len(body) < len(full_body),
+        "images": summarize_images(page.get("images")),
+    }
+
+
+def _compact(analysis_results: Dict[str, Any], page_budget: int) -> Dict[str, Any]:
+    compacted = {key: value for key, value in analysis_results.items() if key != "scraping_results"}
+    pages = analysis_results.get("scraping_results")
+    if isinstance(pages, list):
+        page_segments = [split_segments(page.get("content", "")) if isinstance(page, dict) else [] for page in pages]
+        hosts = [urlparse(page.get("url") or "").netloc.lower() if isinstance(page, dict) else None for page in pages]
+        boilerplate = find_boilerplate(page_segments, hosts)
+        compacted["scraping_results"] = [
+            compact_page(rank, page, segments, boilerplate, page_budget)
+            for rank, (page, segments) in enumerate(zip(pages, page_segments), start=1)
+            if isinstance(page, dict)
+        ]
+    return compacted
+
+
+def prompt_token_budget(reserved_tokens: int = 0) -> int:
+    """分析結果に使えるトークン数（コンテキスト長から出力分と固定部分を除く）"""
+    available = settings.OPENAI_CONTEXT_WINDOW - settings.OPENAI_MAX_OUTPUT_TOKENS - reserved_tokens
+    return max(int(available * 0.95), 0)  # 見積もり誤差の余裕
+
+
+def compact_analysis(analysis_results: Dict[str, Any], token_budget: int) -> str:
+    """
+    分析結果を圧縮し、token_budget 以内の JSON 文字列を返す。
+    収まらない場合はページごとの本文の予算を半分ずつ減らし、
+    それでも収まらなければ JSON 文字列自体を切り詰める。
+    """
+    analysis_results = analysis_results or {}
+    page_budget = settings.PROMPT_PAGE_TOKEN_BUDGET
+    while True:
+        result = compact_json(_compact(analysis_results, page_budget))
+        tokens = estimate_tokens(result)
+        if tokens <= token_budget or page_budget <= MIN_PAGE_TOKEN_BUDGET:
+            break
+        page_budget //= 2
+
+    if tokens > token_budget:
+        logger.warning(f"Compacted analysis still exceeds the token budget ({tokens} > {token_budget}); truncating")
+        result = clip_to_tokens(result, token_budget)
+
+    logger.info(f"Compacted analysis results to {estimate_tokens(result)} tokens (page budget {page_budget})")
+    return result
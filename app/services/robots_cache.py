@@ -0,0 +1,90 @@
+"""
+プロセス全体で共有する robots.txt キャッシュ。
+
+ホストごとに個別のパーサーを保持し、ScrapingService のインスタンスを
+またいで再利用する。robots.txt が存在しない場合や取得に失敗した場合も
+「制限なし」として短めの有効期限でキャッシュする。
+"""
+import logging
+from typing import Mapping, Optional
+from urllib.parse import urlparse
+import aiohttp
+from robotexclusionrulesparser import RobotExclusionRulesParser
+from app.core import metrics
+from app.core.config import get_settings
+from app.utils.cache import AsyncTTLCache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class RobotsCache:
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = AsyncTTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def is_allowed(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        user_agent: str = "*",
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> bool:
+        """URLへのアクセスが robots.txt で許可されているか確認"""
+        parsed_url = urlparse(url)
+        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        parser = await self._cache.get_or_load(
+            base_url,
+            lambda: self._fetch(session, base_url, headers),
+            ttl_for=lambda p: self.ttl if p is not None else self.negative_ttl,
+        )
+        if parser is None:
+            # robots.txtがない・取得できない場合は許可とみなす
+            return True
+        return parser.is_allowed(user_agent, url)
+
+    async def _fetch(
+        self,
+        session: aiohttp.ClientSession,
+        base_url: str,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Optional[RobotExclusionRulesParser]:
+        """robots.txtを取得して解析（存在しない・エラーの場合は None）"""
+        robots_url = f"{base_url}/robots.txt"
+        try:
+            timeout = aiohttp.ClientTimeout(total=settings.ROBOTS_FETCH_TIMEOUT)
+            async with session.get(robots_url, headers=headers, timeout=timeout) as response:
+                if response.status != 200:
+                    return None
+                robots_content = await response.text()
+            parser = RobotExclusionRulesParser()
+            parser.parse(robots_content)
+            return parser
+        except Exception as e:
+            logger.error(f"Error fetching robots.txt from {robots_url}: {e}")
+            return None
+
+    def invalidate(self, url: str) -> None:
+        parsed_url = urlparse(url)
+        self._cache.invalidate(f"{parsed_url.scheme}://{parsed_url.netloc}")
+
+    def stats(self):
+        return self._cache.stats()
+
+
+robots_cache = RobotsCache(
+    maxsize=settings.ROBOTS_CACHE_MAX_ENTRIES,
+    ttl=settings.ROBOTS_CACHE_TTL,
+    negative_ttl=settings.ROBOTS_CACHE_NEGATIVE_TTL,
+)
+
+metrics.registry.callback(
+    "robots_cache_hits_total", "robots.txt cache hits", lambda: robots_cache.stats()["hits"], kind="counter"
+)
+metrics.registry.callback(
+    "robots_cache_misses_total", "robots.txt cache misses", lambda: robots_cache.stats()["misses"], kind="counter"
+)
+metrics.registry.callback(
+    "robots_cache_hit_ratio", "robots.txt cache hit ratio since start", lambda: robots_cache.stats()["hit_ratio"]
+)
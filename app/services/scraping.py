@@ -1,32 +1,63 @@
 import aiohttp
 import asyncio
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Tuple
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
 from app.core.config import get_settings
-from urllib.parse import urljoin, urlparse
+from app.core import metrics
+from app.services import extraction
+from app.services.dedup import collapse_duplicates
+from app.services.host_resilience import (
+    THROTTLE_STATUSES, HostState, HostUnavailable, host_registry, parse_retry_after, retry_delay, scrape_slots,
+)
+from app.services.parse_pool import parse_html
+from app.services.robots_cache import robots_cache
+from app.services.page_cache import get_page_cache
+from app.services.serp import get_serp_service
+from app.services.fetch import ContentNotAllowed, FetchedBody, check_content_type, read_limited_body
+from urllib.parse import urlparse
 import logging
-from robotexclusionrulesparser import RobotExclusionRulesParser
 import re
+import time
 
 settings = get_settings()
 
+# 再試行するために残っている必要がある最低限の時間（秒）
+MIN_ATTEMPT_TIMEOUT = 1.0
+
+@dataclass
+class FetchResult:
+    """1回のリクエストの結果（レスポンスは閉じた後の値だけを保持する）"""
+    status: int
+    final_url: str
+    body: Optional[FetchedBody] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    retry_after: Optional[float] = None
+    error: Optional[str] = None  # 本文を読まなかった理由（Content-Type など）
+
 class ScrapingService:
-    def __init__(self):
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        """
+        session を渡した場合は共有クライアントとして利用し、終了時に閉じない。
+        渡さない場合は従来どおり async with の間だけ専用のセッションを作成する。
+        """
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        self.session = None
+        self.session = session
+        self._owns_session = session is None
         self.blocked_domains = settings.BLOCKED_DOMAINS
-        self.robots_cache = {}  # robots.txtのキャッシュ
-        self.rerp = RobotExclusionRulesParser()
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers=self.headers)
+        if self.session is None:
+            self.session = aiohttp.ClientSession(headers=self.headers)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
+            self.session = None
 
     def _is_blocked_domain(self, url: str) -> bool:
         """URLが禁止ドメインに含まれているかチェック"""
@@ -35,39 +66,219 @@ class ScrapingService:
 
     async def _check_robots_txt(self, url: str) -> bool:
         """robots.txtをチェックしてスクレイピングが許可されているか確認"""
+        # プロセス共有のキャッシュを使用（404・エラーは許可としてキャッシュされる）
+        return await robots_cache.is_allowed(self.session, url, headers=self.headers)
+
+    async def get_search_results(
+        self, keyword: str, locale: Optional[str] = None, device: Optional[str] = None
+    ) -> List[str]:
+        """検索結果から上位URLを取得（プロバイダーは SERP_PROVIDER で切り替え）"""
+        return await get_serp_service().search(keyword, locale=locale, device=device)
+
+    async def scrape_keyword(
+        self, keyword: str, locale: Optional[str] = None, device: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        キーワードの検索結果上位 MAX_SCRAPE_PAGES 件をスクレイピングする。
+        検索結果が見つからない場合は None を返す。
+        """
+        urls = await self.get_search_results(keyword, locale=locale, device=device)
+        if not urls:
+            return None
+
+        # 上位 MAX_SCRAPE_PAGES 件を並行してスクレイピング（結果は検索順位順）
+        pages = await self.scrape_pages(urls[:settings.MAX_SCRAPE_PAGES])
+        # 上位のページとほぼ同じ内容のページは本文を除き、分析・生成の対象から外す
+        results = await collapse_duplicates([result for result in pages if result])
+        return {
+            "keyword": keyword,
+            "results": results,
+            "total_results": len(results),
+            "duplicates": sum(1 for result in results if result.get("duplicate_of"))
+        }
+
+    async def scrape_pages(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        複数URLを並行してスクレイピングし、入力（SERP）と同じ順序で結果を返す。
+        プロセス全体の同時実行数は SCRAPE_CONCURRENCY、ホストごとの同時実行数は
+        SCRAPE_PER_HOST_CONCURRENCY で制限する（ほかの検索・ジョブと合わせた件数）。同一ホストへのリクエスト間隔は
+        ホストごとのレート制限（host_resilience）で SCRAPE_DELAY 秒以上空ける。
+        """
+        return await asyncio.gather(*(self._scrape_with_limits(url) for url in urls))
+
+    async def _scrape_with_limits(self, url: str) -> Dict[str, Any]:
+        """同時実行数・ホスト間隔・タイムアウトの制御付きでページをスクレイピング"""
+        host_state = host_registry.get(urlparse(url).netloc.lower())
+        # ホスト単位の待機中はグローバルな枠を消費しない
+        async with host_state.slots:
+            await host_state.limiter.acquire()
+            async with scrape_slots:
+                # 再試行は期限内に収まる場合だけ行う（期限を過ぎた場合は wait_for で打ち切る）
+                deadline = time.monotonic() + settings.SCRAPE_TIMEOUT
+                try:
+                    return await asyncio.wait_for(
+                        self.scrape_page(url, deadline=deadline), timeout=settings.SCRAPE_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    logging.error(f"Timeout scraping {url} after {settings.SCRAPE_TIMEOUT}s")
+                    return {
+                        "url": url,
+                        "error": f"タイムアウトしました（{settings.SCRAPE_TIMEOUT}秒）",
+                        "blocked": True
+                    }
+
+    async def _fetch_once(
+        self, url: str, headers: Dict[str, str], host_state: HostState, timeout: float
+    ) -> FetchResult:
+        """1回リクエストし、200 の場合は上限サイズまで本文を読み込む"""
+        timeout = aiohttp.ClientTimeout(total=timeout)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with self.session.get(url, headers=headers, timeout=timeout) as response:
+            result = FetchResult(
+                status=response.status,
+                final_url=str(response.url),
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+            if response.status == 200:
+                try:
+                    check_content_type(response, settings.SCRAPE_ALLOWED_CONTENT_TYPES)
+                except ContentNotAllowed as e:
+                    result.error = str(e)
+                    return result
+                # 上限サイズまでチャンク単位で読み込む
+                result.body = await read_limited_body(
+                    response,
+                    max_bytes=settings.SCRAPE_MAX_BYTES,
+                    chunk_size=settings.SCRAPE_CHUNK_SIZE,
+                )
+                result.etag = response.headers.get("ETag")
+                result.last_modified = response.headers.get("Last-Modified")
+        elapsed = loop.time() - started
+        host_state.latency.observe(elapsed)
+        metrics.scrape_fetch_duration.labels(host_state.host).observe(elapsed)
+        return result
+
+    async def _fetch_hedged(
+        self, url: str, headers: Dict[str, str], host_state: HostState, timeout: float
+    ) -> FetchResult:
+        """
+        ホストの p95 を過ぎても応答がなければ2つ目のリクエストを送り、先に完了した方を使う
+        （SCRAPE_HEDGE_ENABLED が有効で、レート制限のトークンをすぐに取得できる場合のみ）。
+        """
+        hedge_after = host_state.hedge_after()
+        if hedge_after is None:
+            return await self._fetch_once(url, headers, host_state, timeout)
+
+        primary = asyncio.create_task(self._fetch_once(url, headers, host_state, timeout))
+        tasks = {primary}
         try:
-            parsed_url = urlparse(url)
-            base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-            robots_url = urljoin(base_url, "/robots.txt")
-
-            # キャッシュをチェック
-            if robots_url in self.robots_cache:
-                return self.robots_cache[robots_url].is_allowed("*", url)
-
-            # robots.txtを取得して解析
-            async with self.session.get(robots_url) as response:
-                if response.status == 200:
-                    robots_content = await response.text()
-                    self.rerp.parse(robots_content)
-                    self.robots_cache[robots_url] = self.rerp
-                    return self.rerp.is_allowed("*", url)
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if done or not host_state.limiter.try_acquire():
+                return await primary
+            host_state.hedged += 1
+            hedge = asyncio.create_task(
+                self._fetch_once(url, headers, host_state, max(timeout - hedge_after, MIN_ATTEMPT_TIMEOUT))
+            )
+            tasks.add(hedge)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            host_state.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _fetch_with_resilience(
+        self, url: str, headers: Dict[str, str], deadline: Optional[float] = None
+    ) -> FetchResult:
+        """
+        ホストのサーキットブレーカー・レート制限を適用してリクエストする。
+        接続エラー・タイムアウト・5xx・429 は SCRAPE_MAX_RETRIES 回まで再試行する。
+        deadline（time.monotonic の時刻）を指定した場合、各回のタイムアウトは残り時間以内とし、
+        待ち時間と最低限の試行時間が残り時間に収まらなければ再試行せずに直前の結果を返す。
+        """
+        host = urlparse(url).netloc.lower()
+        state = host_registry.get(host)
+        attempt = 0
+        last_result: Optional[FetchResult] = None
+        last_error: Optional[BaseException] = None
+
+        def remaining() -> float:
+            return deadline - time.monotonic() if deadline is not None else float("inf")
+
+        def give_up() -> FetchResult:
+            logging.warning(f"Not retrying {url}: not enough time left before the deadline")
+            if last_result is not None:
+                return last_result
+            raise last_error
+
+        while True:
+            if not state.breaker.allow():
+                state.skipped += 1
+                raise HostUnavailable(host)
+            if attempt > 0:
+                if not await state.limiter.acquire_within(remaining() - MIN_ATTEMPT_TIMEOUT):
+                    return give_up()
+            state.requests += 1
+            delay = 0.0
+            try:
+                result = await self._fetch_hedged(
+                    url, headers, state, min(settings.SCRAPE_ATTEMPT_TIMEOUT, remaining())
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                state.failures += 1
+                state.breaker.record_failure()
+                if attempt >= settings.SCRAPE_MAX_RETRIES:
+                    raise
+                last_result, last_error = None, e
+                delay = retry_delay(attempt)
+                logging.warning(f"Fetch failed for {url} ({type(e).__name__}); retrying")
+            except BaseException:
+                state.breaker.abandon()
+                raise
+            else:
+                if result.status in THROTTLE_STATUSES:
+                    # 待ち時間はレート制限に反映し、次の acquire で待つ
+                    state.limiter.on_throttled(result.retry_after)
+                    if result.status == 503:
+                        state.failures += 1
+                        state.breaker.record_failure()
+                    else:
+                        state.breaker.record_success()
+                    too_long = (result.retry_after or 0) > settings.SCRAPE_RETRY_MAX_DELAY
+                    if attempt >= settings.SCRAPE_MAX_RETRIES or too_long:
+                        return result
+                    logging.warning(f"Throttled by {host} ({result.status}); retrying")
+                elif result.status >= 500:
+                    state.failures += 1
+                    state.breaker.record_failure()
+                    if attempt >= settings.SCRAPE_MAX_RETRIES:
+                        return result
+                    delay = retry_delay(attempt)
+                    logging.warning(f"Fetch failed for {url} ({result.status}); retrying")
                 else:
-                    # robots.txtが見つからない場合は許可とみなす
-                    return True
+                    state.breaker.record_success()
+                    state.limiter.on_success()
+                    return result
+                last_result, last_error = result, None
+            if delay + MIN_ATTEMPT_TIMEOUT > remaining():
+                return give_up()
+            attempt += 1
+            state.retries += 1
+            if delay:
+                await asyncio.sleep(delay)
 
-        except Exception as e:
-            logging.error(f"Error checking robots.txt for {url}: {e}")
-            # エラーの場合は安全のため許可とみなす
-            return True
-
-    async def get_search_results(self, keyword: str) -> List[str]:
-        """Google検索結果から上位URLを取得"""
-        # 注: 実際の実装ではGoogle検索APIまたは適切なスクレイピング方法を使用する必要があります
-        # このサンプルコードは概念実装です
-        pass
-
-    async def scrape_page(self, url: str) -> Dict[str, Any]:
-        """指定URLのページをスクレイピング"""
+    async def scrape_page(self, url: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """指定URLのページをスクレイピング（deadline は再試行を打ち切る time.monotonic の時刻）"""
         try:
             # 禁止ドメインのチェック
             if self._is_blocked_domain(url):
@@ -87,38 +298,82 @@ class ScrapingService:
                     "blocked": True
                 }
 
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-
-                    # ログイン要求のチェック
-                    login_required, reason = await self._check_login_required(html, str(response.url))
-                    if login_required:
-                        logging.warning(f"Login required: {url} - {reason}")
-                        return {
-                            "url": url,
-                            "error": reason,
-                            "blocked": True
-                        }
-
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    return {
-                        "url": url,
-                        "title": self._extract_title(soup),
-                        "meta_description": self._extract_meta_description(soup),
-                        "headings": self._extract_headings(soup),
-                        "content": self._extract_content(soup),
-                        "images": self._extract_images(soup, url),
-                        "blocked": False
-                    }
-                else:
-                    logging.error(f"Failed to fetch {url}: {response.status}")
+            # キャッシュ済みのページがあれば条件付きリクエストで再検証する
+            page_cache = get_page_cache()
+            cached = await page_cache.get(url) if page_cache else None
+            request_headers = dict(self.headers)
+            if cached:
+                request_headers.update(cached.conditional_headers())
+
+            try:
+                fetched = await self._fetch_with_resilience(url, request_headers, deadline)
+            except HostUnavailable:
+                logging.warning(f"Skipped {url}: circuit breaker is open")
+                return {
+                    "url": url,
+                    "error": "失敗が続いているため、このホストへのアクセスを一時的に停止しています",
+                    "blocked": True
+                }
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.error(f"Failed to fetch {url} after retries: {type(e).__name__} {e}")
+                return {
+                    "url": url,
+                    "error": f"接続に失敗しました（{type(e).__name__}）",
+                    "blocked": True
+                }
+            final_url = fetched.final_url
+            not_modified = fetched.status == 304 and cached is not None
+            if fetched.status == 200:
+                if fetched.error:
+                    logging.warning(f"Skipped {url}: {fetched.error}")
                     return {
                         "url": url,
-                        "error": f"ステータスコード {response.status} でアクセスできません",
+                        "error": fetched.error,
                         "blocked": True
                     }
+                body = fetched.body
+                html = body.text
+                fetch_stats = body.stats()
+                etag = fetched.etag
+                last_modified = fetched.last_modified
+            elif not not_modified:
+                logging.error(f"Failed to fetch {url}: {fetched.status}")
+                return {
+                    "url": url,
+                    "error": f"ステータスコード {fetched.status} でアクセスできません",
+                    "blocked": True
+                }
+
+            body_hash = None
+            if not_modified:
+                # 更新されていないためキャッシュの本文を使用
+                html = cached.body
+                body_hash = cached.body_hash
+                fetch_stats = {"not_modified": True, "bytes_read": 0}
+            elif page_cache and not body.truncated:
+                body_hash = await page_cache.put(
+                    url, html, etag=etag, last_modified=last_modified, final_url=final_url
+                )
+
+            # ログイン要求のチェック
+            login_required, reason = await self._check_login_required(html, final_url)
+            if login_required:
+                logging.warning(f"Login required: {url} - {reason}")
+                return {
+                    "url": url,
+                    "error": reason,
+                    "blocked": True
+                }
+
+            extracted = await self._extract(html, url, body_hash)
+            logging.debug(f"Fetched {url}: {fetch_stats}")
+
+            return {
+                "url": url,
+                **extracted,
+                "fetch_stats": fetch_stats,
+                "blocked": False
+            }
         except Exception as e:
             logging.error(f"Error scraping {url}: {str(e)}")
             return {
@@ -127,45 +382,42 @@ class ScrapingService:
                 "blocked": True
             }
 
+    async def _extract(self, html: str, url: str, body_hash: Optional[str]) -> Dict[str, Any]:
+        """ページ情報を抽出（本文が変わっていなければキャッシュ済みの抽出結果を再利用）"""
+        page_cache = get_page_cache()
+        engine = f"{settings.HTML_EXTRACTOR}:{extraction.EXTRACTION_VERSION}"
+        if page_cache and body_hash:
+            extracted = await page_cache.get_extracted(url, body_hash, engine)
+            if extracted is not None:
+                return extracted
+
+        # 解析はサイズに応じてプロセスプールで実行
+        started = time.perf_counter()
+        extracted = await parse_html(html, url)
+        metrics.scrape_parse_duration.labels(urlparse(url).netloc.lower()).observe(time.perf_counter() - started)
+        if page_cache and body_hash:
+            await page_cache.put_extracted(url, body_hash, engine, extracted)
+        return extracted
+
     def _extract_title(self, soup: BeautifulSoup) -> str:
         """タイトルタグの抽出"""
-        title = soup.title
-        return title.string.strip() if title else ""
+        return extraction.extract_title(soup)
 
     def _extract_meta_description(self, soup: BeautifulSoup) -> str:
         """メタディスクリプションの抽出"""
-        meta = soup.find("meta", attrs={"name": "description"})
-        return meta.get("content", "").strip() if meta else ""
+        return extraction.extract_meta_description(soup)
 
     def _extract_headings(self, soup: BeautifulSoup) -> Dict[str, List[str]]:
         """見出し構造の抽出"""
-        headings = {}
-        for i in range(1, 7):
-            tag = f"h{i}"
-            headings[tag] = [h.get_text().strip() for h in soup.find_all(tag)]
-        return headings
+        return extraction.extract_headings(soup)
 
     def _extract_content(self, soup: BeautifulSoup) -> str:
         """本文コンテンツの抽出"""
-        # 不要な要素を削除
-        for tag in soup(["script", "style", "nav", "header", "footer"]):
-            tag.decompose()
-        
-        # 本文を抽出
-        content = soup.find("main") or soup.find("article") or soup.find("body")
-        return content.get_text(" ", strip=True) if content else ""
+        return extraction.extract_content(soup)
 
     def _extract_images(self, soup: BeautifulSoup, base_url: str) -> List[Dict[str, str]]:
         """画像情報の抽出"""
-        images = []
-        for img in soup.find_all("img"):
-            src = img.get("src", "")
-            if src:
-                images.append({
-                    "src": urljoin(base_url, src),
-                    "alt": img.get("alt", "")
-                })
-        return images
+        return extraction.extract_images(soup, base_url)
 
     async def _check_login_required(self, html: str, url: str) -> Tuple[bool, str]:
         """ログインが必要かどうかを確認"""
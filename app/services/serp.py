@@ -0,0 +1,185 @@
+"""
+検索結果（SERP）の取得。
+
+SerpProvider を実装したプロバイダーを SERP_PROVIDER で切り替える。
+- fixture: JSONファイルに保存した検索結果を返す（テスト・ローカル開発用）
+- serpapi: SerpApi (https://serpapi.com) の Google 検索API
+- google_cse: Google Custom Search JSON API
+
+プロバイダーの呼び出しは遅く課金も発生するため、結果は
+（キーワード, ロケール, デバイス）ごとに TTL 付きでキャッシュし、
+同じキーワードへの同時リクエストは1回の呼び出しにまとめる。
+"""
+import json
+import logging
+import os
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import aiohttp
+from app.core.config import get_settings
+from app.services.http_client import get_http_client
+from app.utils.cache import AsyncTTLCache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "serp_results.json")
+
+
+class SerpNotConfigured(Exception):
+    """検索結果のプロバイダーが未設定・不明、または必要なキーが設定されていない"""
+
+
+def _split_locale(locale: str) -> Tuple[str, str]:
+    """'ja-JP' を言語 'ja' と国 'jp' に分割"""
+    language, _, country = locale.partition("-")
+    return language.lower(), (country or language).lower()
+
+
+class SerpProvider(ABC):
+    name: str
+
+    @abstractmethod
+    async def search(self, keyword: str, locale: str, device: str, num: int) -> List[str]:
+        """検索順位順のURLリストを返す"""
+
+
+class FixtureSerpProvider(SerpProvider):
+    """
+    JSONファイルの検索結果を返すプロバイダー。
+    キーは "キーワード" または "キーワード|ロケール|デバイス" で、値はURLのリスト。
+    """
+    name = "fixture"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or DEFAULT_FIXTURE_PATH
+        with open(self.path, encoding="utf-8") as f:
+            self.results: Dict[str, List[str]] = json.load(f)
+
+    async def search(self, keyword: str, locale: str, device: str, num: int) -> List[str]:
+        urls = self.results.get(f"{keyword}|{locale}|{device}") or self.results.get(keyword, [])
+        return urls[:num]
+
+
+class SerpApiProvider(SerpProvider):
+    """SerpApi の Google 検索API"""
+    name = "serpapi"
+    endpoint = "https://serpapi.com/search.json"
+
+    def __init__(self):
+        if not settings.SERP_API_KEY:
+            raise SerpNotConfigured("SERP_PROVIDER=serpapi requires SERP_API_KEY")
+
+    async def search(self, keyword: str, locale: str, device: str, num: int) -> List[str]:
+        language, country = _split_locale(locale)
+        params = {
+            "engine": "google",
+            "q": keyword,
+            "hl": language,
+            "gl": country,
+            "device": device,
+            "num": num,
+            "api_key": settings.SERP_API_KEY,
+        }
+        timeout = aiohttp.ClientTimeout(total=settings.SERP_TIMEOUT)
+        async with get_http_client().get(self.endpoint, params=params, timeout=timeout) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return [result["link"] for result in data.get("organic_results", []) if result.get("link")][:num]
+
+
+class GoogleCustomSearchProvider(SerpProvider):
+    """Google Custom Search JSON API（デバイスの指定には対応していない）"""
+    name = "google_cse"
+    endpoint = "https://www.googleapis.com/customsearch/v1"
+
+    def __init__(self):
+        if not settings.SERP_API_KEY or not settings.GOOGLE_CSE_ID:
+            raise SerpNotConfigured("SERP_PROVIDER=google_cse requires SERP_API_KEY and GOOGLE_CSE_ID")
+
+    async def search(self, keyword: str, locale: str, device: str, num: int) -> List[str]:
+        language, country = _split_locale(locale)
+        params = {
+            "key": settings.SERP_API_KEY,
+            "cx": settings.GOOGLE_CSE_ID,
+            "q": keyword,
+            "hl": language,
+            "gl": country,
+            "num": min(num, 10),  # APIの上限は10件
+        }
+        timeout = aiohttp.ClientTimeout(total=settings.SERP_TIMEOUT)
+        async with get_http_client().get(self.endpoint, params=params, timeout=timeout) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return [item["link"] for item in data.get("items", []) if item.get("link")][:num]
+
+
+PROVIDERS = {
+    FixtureSerpProvider.name: FixtureSerpProvider,
+    SerpApiProvider.name: SerpApiProvider,
+    GoogleCustomSearchProvider.name: GoogleCustomSearchProvider,
+}
+
+
+class SerpService:
+    def __init__(self, provider: SerpProvider, cache: AsyncTTLCache):
+        self.provider = provider
+        self.cache = cache
+
+    async def search(
+        self,
+        keyword: str,
+        locale: Optional[str] = None,
+        device: Optional[str] = None,
+        num: Optional[int] = None,
+    ) -> List[str]:
+        """検索結果のURLリストを取得（キャッシュ・同時リクエストの集約あり）"""
+        keyword = unicodedata.normalize("NFKC", keyword).strip()
+        locale = locale or settings.SERP_LOCALE
+        device = device or settings.SERP_DEVICE
+        num = num or settings.SERP_RESULTS
+        key = (keyword.lower(), locale, device, num)
+
+        async def load() -> List[str]:
+            logger.info(f"Fetching SERP from {self.provider.name}: {keyword} ({locale}, {device})")
+            return await self.provider.search(keyword, locale, device, num)
+
+        urls = await self.cache.get_or_load(
+            key,
+            load,
+            # 結果が空の場合は短い期間だけキャッシュする
+            ttl_for=lambda urls: settings.SERP_CACHE_TTL if urls else settings.SERP_CACHE_NEGATIVE_TTL,
+        )
+        return list(urls)
+
+    def stats(self):
+        return {"provider": self.provider.name, **self.cache.stats()}
+
+
+_serp_service: Optional[SerpService] = None
+
+
+def get_serp_service() -> SerpService:
+    """
+    設定されたプロバイダーの SerpService を取得。
+    プロバイダーが未設定・不明、または必要なキーがない場合は SerpNotConfigured を送出する。
+    """
+    global _serp_service
+    if _serp_service is None:
+        if not settings.SERP_PROVIDER:
+            raise SerpNotConfigured(
+                f"SERP_PROVIDER is not set (choose one of: {', '.join(PROVIDERS)})"
+            )
+        provider_class = PROVIDERS.get(settings.SERP_PROVIDER)
+        if provider_class is None:
+            raise SerpNotConfigured(f"Unknown SERP provider: {settings.SERP_PROVIDER}")
+        if provider_class is FixtureSerpProvider:
+            provider = FixtureSerpProvider(settings.SERP_FIXTURE_PATH)
+        else:
+            provider = provider_class()
+        _serp_service = SerpService(
+            provider,
+            AsyncTTLCache(maxsize=settings.SERP_CACHE_MAX_ENTRIES, ttl=settings.SERP_CACHE_TTL),
+        )
+    return _serp_service
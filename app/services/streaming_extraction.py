@@ -0,0 +1,280 @@
+"""
+HTMLを1回の走査で解析するストリーミング抽出エンジン。
+
+BeautifulSoup でツリーを構築してから find_all を繰り返す代わりに、
+html.parser.HTMLParser のイベントを受け取りながらタイトル・メタ情報・
+見出し・本文・画像を同時に収集する。
+
+出力は extraction.extract_page_soup と一致するよう、BeautifulSoup
+（html.parser バックエンド）のツリー構築規則を再現している。
+- 終了タグは同名の直近の開始タグまでスタックを巻き戻す（対応がなければ無視）
+- 空要素（img, br, meta など）は開始タグの時点で閉じる
+- 空白のみのテキストは pre/textarea の外では改行または空白1つに畳む
+- script/style/template/rt/rp 内の文字列やコメントは本文テキストに含めない
+- script/style/nav/header/footer 配下は本文・画像の対象外
+"""
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+from bs4.dammit import EntitySubstitution
+
+EMPTY_ELEMENT_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+    'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+])
+PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+REMOVED_TAGS = frozenset(['script', 'style', 'nav', 'header', 'footer'])
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+CONTENT_TAGS = ('main', 'article', 'body')
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+# 文字列ノードの種類（本文テキストとして扱うのは TEXT と CDATA のみ）
+TEXT = 'text'
+CDATA = 'cdata'
+COMMENT = 'comment'
+DOCTYPE = 'doctype'
+DECLARATION = 'declaration'
+PROCESSING_INSTRUCTION = 'pi'
+
+
+class _Element:
+    """解析中のスタック上の要素"""
+    __slots__ = ('name', 'heading', 'content_tag', 'title_node')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.heading: Optional[List[str]] = None
+        self.content_tag: Optional[str] = None
+        self.title_node: Optional[list] = None
+
+
+class StreamingExtractor(HTMLParser):
+    """HTMLParser のイベントから抽出結果を直接組み立てるパーサー"""
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=False)
+        self.base_url = base_url
+
+        self._stack: List[_Element] = []
+        self._open_counts: Dict[str, int] = {}
+        self._already_closed_empty_elements: List[str] = []
+        self._current_data: List[str] = []
+        self._removed_depth = 0
+        self._preserve_depth = 0
+        self._container_stack: List[str] = []
+
+        self._title_root: Optional[list] = None
+        self._meta_description: Optional[str] = None
+        self._headings: Dict[str, List[List[str]]] = {tag: [] for tag in HEADING_TAGS}
+        self._open_headings: List[List[str]] = []
+        self._content_parts: Dict[str, Optional[List[str]]] = {tag: None for tag in CONTENT_TAGS}
+        self._open_content_tags: List[str] = []
+        self._images: List[Dict[str, str]] = []
+
+    # --- HTMLParser のイベント ---
+
+    def handle_starttag(self, name, attrs, handle_empty_element=True):
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = '' if value is None else value
+
+        self._end_data()
+        element = self._push(name, attr_dict)
+        if name in EMPTY_ELEMENT_TAGS and handle_empty_element:
+            self._pop_to(name)
+            self._already_closed_empty_elements.append(name)
+        return element
+
+    def handle_startendtag(self, name, attrs):
+        self.handle_starttag(name, attrs, handle_empty_element=False)
+        self.handle_endtag(name)
+
+    def handle_endtag(self, name):
+        if name in self._already_closed_empty_elements:
+            self._already_closed_empty_elements.remove(name)
+        else:
+            self._end_data()
+            self._pop_to(name)
+
+    def handle_data(self, data):
+        self._current_data.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith('x'):
+            real_name = int(name.lstrip('x'), 16)
+        elif name.startswith('X'):
+            real_name = int(name.lstrip('X'), 16)
+        else:
+            real_name = int(name)
+
+        data = None
+        if real_name < 256:
+            try:
+                data = bytearray([real_name]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(real_name)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else "&%s" % name)
+
+    def handle_comment(self, data):
+        self._special_string(data, COMMENT)
+
+    def handle_decl(self, data):
+        self._special_string(data[len("DOCTYPE "):], DOCTYPE)
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self._special_string(data[len('CDATA['):], CDATA)
+        else:
+            self._special_string(data, DECLARATION)
+
+    def handle_pi(self, data):
+        self._special_string(data, PROCESSING_INSTRUCTION)
+
+    def close(self):
+        super().close()
+        self._end_data()
+        while self._stack:
+            self._pop()
+
+    # --- ツリー構築の再現 ---
+
+    def _push(self, name: str, attrs: Dict[str, str]) -> _Element:
+        element = _Element(name)
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None and parent.title_node is not None:
+            element.title_node = [name, []]
+            parent.title_node[1].append(element.title_node)
+        elif name == 'title' and self._title_root is None:
+            element.title_node = self._title_root = [name, []]
+
+        if name in HEADING_TAGS:
+            element.heading = []
+            self._headings[name].append(element.heading)
+            self._open_headings.append(element.heading)
+        if name in CONTENT_TAGS and self._removed_depth == 0 and self._content_parts[name] is None:
+            element.content_tag = name
+            self._content_parts[name] = []
+            self._open_content_tags.append(name)
+        if name == 'meta' and self._meta_description is None and attrs.get('name') == 'description':
+            self._meta_description = attrs.get('content', '')
+        if name == 'img' and self._removed_depth == 0:
+            src = attrs.get('src', '')
+            if src:
+                self._images.append({
+                    "src": urljoin(self.base_url, src),
+                    "alt": attrs.get('alt', '')
+                })
+
+        self._stack.append(element)
+        self._open_counts[name] = self._open_counts.get(name, 0) + 1
+        if name in REMOVED_TAGS:
+            self._removed_depth += 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+        if name in STRING_CONTAINER_TAGS:
+            self._container_stack.append(name)
+        return element
+
+    def _pop(self) -> None:
+        element = self._stack.pop()
+        name = element.name
+        self._open_counts[name] -= 1
+        if name in REMOVED_TAGS:
+            self._removed_depth -= 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth -= 1
+        if name in STRING_CONTAINER_TAGS:
+            self._container_stack.pop()
+        if element.heading is not None:
+            self._open_headings.remove(element.heading)
+        if element.content_tag is not None:
+            self._open_content_tags.remove(element.content_tag)
+
+    def _pop_to(self, name: str) -> None:
+        """同名の直近の要素まで（その要素を含めて）スタックを巻き戻す"""
+        while self._stack and self._open_counts.get(name):
+            top = self._stack[-1].name
+            self._pop()
+            if top == name:
+                break
+
+    def _special_string(self, data: str, kind: str) -> None:
+        self._end_data()
+        self.handle_data(data)
+        self._end_data(kind)
+
+    def _end_data(self, kind: Optional[str] = None) -> None:
+        """溜まったテキストを1つの文字列ノードとして確定させる"""
+        if not self._current_data:
+            return
+        data = ''.join(self._current_data)
+        self._current_data = []
+
+        if not self._preserve_depth and all(c in ASCII_SPACES for c in data):
+            data = '\n' if '\n' in data else ' '
+
+        if kind is None:
+            kind = 'container' if self._container_stack else TEXT
+
+        if self._stack and self._stack[-1].title_node is not None:
+            self._stack[-1].title_node[1].append(data)
+
+        if kind not in (TEXT, CDATA):
+            return
+        for heading in self._open_headings:
+            heading.append(data)
+        if self._removed_depth == 0:
+            for tag in self._open_content_tags:
+                self._content_parts[tag].append(data)
+
+    # --- 結果 ---
+
+    def _title(self) -> str:
+        node = self._title_root
+        while node is not None:
+            children = node[1]
+            if len(children) != 1:
+                return ""
+            child = children[0]
+            if isinstance(child, str):
+                return child.strip()
+            node = child
+        return ""
+
+    def _content(self) -> str:
+        for tag in CONTENT_TAGS:
+            parts = self._content_parts[tag]
+            if parts is not None:
+                return " ".join(s for s in (part.strip() for part in parts) if s)
+        return ""
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "title": self._title(),
+            "meta_description": (self._meta_description or "").strip(),
+            "headings": {
+                tag: [''.join(parts).strip() for parts in self._headings[tag]]
+                for tag in HEADING_TAGS
+            },
+            "content": self._content(),
+            "images": self._images,
+        }
+
+
+def extract_page_streaming(html: str, url: str) -> Dict[str, Any]:
+    """HTMLを1回走査してページ情報を抽出する（extract_page_soup と同じ形式）"""
+    parser = StreamingExtractor(url)
+    parser.feed(html)
+    parser.close()
+    return parser.result()
@@ -0,0 +1,54 @@
+"""
+バックグラウンドジョブのワーカープロセス。
+
+JOB_WORKER_MODE=external の場合、APIサーバーとは別に起動する:
+    python -m app.worker
+"""
+import asyncio
+import logging
+import signal
+from app.core.config import get_settings
+from app.services.http_client import start_http_client, close_http_client
+from app.services.generation_cache import get_generation_cache
+from app.services.jobs import worker_pool
+from app.services.page_cache import get_page_cache
+from app.services.dedup import get_dedup_index
+from app.services.parse_pool import shutdown_parse_pool
+from app.services.serp import get_serp_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+async def main() -> None:
+    logger.info(f"Starting job worker (concurrency={settings.JOB_WORKER_CONCURRENCY})")
+    # ジョブは検索結果の取得から始まるため、プロバイダーが未設定・不明の場合は起動を止める
+    get_serp_service()
+    await start_http_client()
+    await worker_pool.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logger.info("Shutting down job worker...")
+    await worker_pool.stop()
+    await close_http_client()
+    page_cache = get_page_cache()
+    if page_cache:
+        page_cache.close()
+    generation_cache = get_generation_cache()
+    if generation_cache:
+        generation_cache.close()
+    dedup_index = get_dedup_index()
+    if dedup_index:
+        dedup_index.close()
+    shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
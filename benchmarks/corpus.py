@@ -0,0 +1,406 @@
+"""
+スクレイピング対象ページの記録と再生。
+
+record: URLの一覧（1行1URL、または検索結果フィクスチャのJSON）を実際に取得し、
+        ホストごとの robots.txt とともにステータス・ヘッダー・本文・応答時間をアーカイブに保存する。
+        リダイレクトは辿らずに 3xx をそのまま記録し、リダイレクト先も取得して記録する。
+synthesize: ネットワークなしで試せるよう、benchmarks.fake_origin のページで架空のホストのアーカイブを作る。
+serve: アーカイブをローカルの aiohttp サーバーで再生する。Host ヘッダーとパスで記録を引き、
+       記録時の応答時間（--latency-scale 倍）だけ待ってから、ホストごとの帯域（記録時の実測値、
+       または --bandwidth）に合わせて本文を少しずつ送る。記録にないパスは 404 を返す。
+
+アーカイブは1つの SQLite ファイルで、本文は zlib で圧縮して保存する。
+再生時はスクレイパーの接続先を StaticResolver で 127.0.0.1 に向け、
+URLを replay_url で http://{ホスト}:{ポート}{パス} に書き換える。
+
+    python -m benchmarks.corpus record --urls urls.txt --archive corpus.sqlite3
+    python -m benchmarks.corpus synthesize --pages 2000 --hosts 50 --archive corpus.sqlite3
+    python -m benchmarks.corpus serve --archive corpus.sqlite3 --port 8903
+    python -m benchmarks.corpus info --archive corpus.sqlite3
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sqlite3
+import statistics
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+import aiohttp
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+
+# 再生に必要なヘッダーだけを保存する（本文は展開済みのため Content-Encoding などは除く）
+RECORDED_HEADERS = ("content-type", "etag", "last-modified", "location", "retry-after", "cache-control")
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+SEND_CHUNK = 16 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    ttfb REAL NOT NULL,
+    transfer REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_responses_host_path ON responses (host, path);
+"""
+
+
+@dataclass
+class RecordedResponse:
+    url: str
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    ttfb: float  # 最初のバイトまでの秒数
+    transfer: float  # 本文の転送にかかった秒数
+
+    @property
+    def host(self) -> str:
+        return (urlparse(self.url).hostname or "").lower()
+
+
+def _path(url: str) -> str:
+    parsed = urlparse(url)
+    return (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+
+
+class CorpusArchive:
+    def __init__(self, path: str):
+        self.path = path
+        # 再生サーバーは別スレッドのイベントループから参照する
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def put(self, response: RecordedResponse) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(url, host, path, status, headers, body, size, ttfb, transfer, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                response.url,
+                response.host,
+                _path(response.url),
+                response.status,
+                json.dumps(response.headers),
+                zlib.compress(response.body, 6),
+                len(response.body),
+                response.ttfb,
+                response.transfer,
+                time.time(),
+            ),
+        )
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def _row(self, row) -> RecordedResponse:
+        url, status, headers, body, ttfb, transfer = row
+        return RecordedResponse(url, status, [tuple(h) for h in json.loads(headers)], zlib.decompress(body), ttfb, transfer)
+
+    def lookup(self, host: str, path: str) -> Optional[RecordedResponse]:
+        row = self._conn.execute(
+            "SELECT url, status, headers, body, ttfb, transfer FROM responses WHERE host = ? AND path = ?",
+            (host.lower(), path),
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def responses(self, limit: Optional[int] = None, pages_only: bool = False) -> Iterable[RecordedResponse]:
+        """記録した応答（pages_only の場合は robots.txt を除く 200 の HTML のみ）"""
+        query = "SELECT url, status, headers, body, ttfb, transfer FROM responses"
+        if pages_only:
+            query += " WHERE status = 200 AND path != '/robots.txt' AND headers LIKE '%text/html%'"
+        query += " ORDER BY rowid"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        for row in self._conn.execute(query):
+            yield self._row(row)
+
+    def page_urls(self, limit: Optional[int] = None) -> List[str]:
+        """記録したページ（robots.txt を除く 200 の HTML）のURL"""
+        query = (
+            "SELECT url FROM responses WHERE status = 200 AND path != '/robots.txt' "
+            "AND headers LIKE '%text/html%' ORDER BY rowid"
+        )
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [row[0] for row in self._conn.execute(query)]
+
+    def host_bandwidth(self) -> Dict[str, float]:
+        """ホストごとの記録時の転送速度（バイト/秒。計測できない場合は含めない）"""
+        return {
+            host: size / transfer
+            for host, size, transfer in self._conn.execute(
+                "SELECT host, SUM(size), SUM(transfer) FROM responses WHERE transfer > 0 GROUP BY host"
+            )
+            if transfer
+        }
+
+    def info(self) -> Dict[str, Any]:
+        count, hosts, size, stored = self._conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT host), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+        ).fetchone()
+        statuses = dict(self._conn.execute("SELECT status, COUNT(*) FROM responses GROUP BY status"))
+        ttfbs = [row[0] for row in self._conn.execute("SELECT ttfb FROM responses")]
+        return {
+            "responses": count,
+            "hosts": hosts,
+            "statuses": statuses,
+            "body_bytes": size,
+            "stored_bytes": stored,
+            "ttfb_p50_ms": round(statistics.median(ttfbs) * 1000, 1) if ttfbs else None,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class StaticResolver(AbstractResolver):
+    """すべてのホスト名を同じアドレス（再生サーバー）に解決する"""
+
+    def __init__(self, address: str = "127.0.0.1"):
+        self.address = address
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        return [{
+            "hostname": host,
+            "host": self.address,
+            "port": port,
+            "family": socket.AF_INET,
+            "proto": 0,
+            "flags": socket.AI_NUMERICHOST,
+        }]
+
+    async def close(self) -> None:
+        pass
+
+
+def replay_url(url: str, port: int) -> str:
+    """記録したURLを再生サーバー向けのURLに書き換える"""
+    parsed = urlparse(url)
+    return f"http://{parsed.hostname}:{port}{_path(url)}"
+
+
+# --- 記録 ---
+
+async def _fetch(session: aiohttp.ClientSession, url: str, timeout: float) -> RecordedResponse:
+    started = time.perf_counter()
+    async with session.get(url, allow_redirects=False, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        ttfb = time.perf_counter() - started
+        body = await response.read()
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() in RECORDED_HEADERS]
+        return RecordedResponse(url, response.status, headers, body, ttfb, time.perf_counter() - started - ttfb)
+
+
+async def record(archive: CorpusArchive, urls: List[str], concurrency: int, max_redirects: int, timeout: float) -> Dict[str, int]:
+    """URLとそのホストの robots.txt を取得して記録する（同じホストへは1件ずつ）"""
+    semaphore = asyncio.Semaphore(concurrency)
+    host_locks: Dict[str, asyncio.Lock] = {}
+    seen = set()
+    counts = {"recorded": 0, "failed": 0}
+
+    async def visit(session: aiohttp.ClientSession, url: str, redirects: int) -> None:
+        if url in seen:
+            return
+        seen.add(url)
+        host = urlparse(url).netloc.lower()
+        async with host_locks.setdefault(host, asyncio.Lock()), semaphore:
+            try:
+                response = await _fetch(session, url, timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"failed {url}: {type(e).__name__} {e}")
+                counts["failed"] += 1
+                return
+        archive.put(response)
+        counts["recorded"] += 1
+        location = dict((k.lower(), v) for k, v in response.headers).get("location")
+        if 300 <= response.status < 400 and location and redirects < max_redirects:
+            await visit(session, urljoin(url, location), redirects + 1)
+
+    async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
+        robots = {f"{urlparse(u).scheme}://{urlparse(u).netloc}/robots.txt" for u in urls}
+        await asyncio.gather(*(visit(session, url, 0) for url in sorted(robots) + urls))
+    archive.commit()
+    return counts
+
+
+def _read_urls(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            # 検索結果フィクスチャ（キーワード → URLリスト）
+            urls = [url for values in json.load(f).values() for url in values]
+        else:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(urls))
+
+
+def synthesize(archive: CorpusArchive, pages: int, hosts: int, page_chars: int, seed: int = 0) -> None:
+    """架空のホストに fake_origin のページを割り振ったアーカイブを作る（応答時間・帯域も乱数で決める）"""
+    from benchmarks.fake_origin import render_page
+
+    rng = random.Random(seed)
+    host_names = [f"site{i}.example" for i in range(hosts)]
+    profiles = {
+        host: (rng.lognormvariate(-2.5, 0.6), rng.choice((0.5, 1, 2, 5, 10)) * 1024 * 1024)
+        for host in host_names
+    }
+    for host in host_names:
+        ttfb, _ = profiles[host]
+        archive.put(RecordedResponse(
+            f"https://{host}/robots.txt", 200, [("Content-Type", "text/plain")],
+            b"User-agent: *\nDisallow: /private/\n", ttfb, 0.0,
+        ))
+    for number in range(1, pages + 1):
+        host = host_names[number % hosts]
+        ttfb, bandwidth = profiles[host]
+        body = render_page(number, page_chars).encode("utf-8")
+        archive.put(RecordedResponse(
+            f"https://{host}/articles/{number}", 200, [("Content-Type", "text/html; charset=utf-8")],
+            body, ttfb * rng.uniform(0.7, 1.5), len(body) / bandwidth,
+        ))
+    archive.commit()
+
+
+# --- 再生 ---
+
+class _HostLink:
+    """ホストごとの帯域（同じホストへの同時の応答で共有する）"""
+
+    def __init__(self, bandwidth: Optional[float]):
+        self.bandwidth = bandwidth
+        self._next_free = 0.0
+
+    async def send(self, response: web.StreamResponse, body: bytes) -> None:
+        for start in range(0, len(body), SEND_CHUNK):
+            chunk = body[start:start + SEND_CHUNK]
+            if self.bandwidth:
+                now = time.monotonic()
+                begin = max(now, self._next_free)
+                self._next_free = begin + len(chunk) / self.bandwidth
+                await asyncio.sleep(self._next_free - now)
+            await response.write(chunk)
+
+
+def create_replay_app(
+    archive: CorpusArchive,
+    port: int,
+    latency_scale: float = 1.0,
+    bandwidth: Optional[float] = None,
+    shaping: bool = True,
+) -> web.Application:
+    """
+    アーカイブを再生するアプリ。bandwidth を指定しない場合はホストごとの記録時の帯域を使う。
+    shaping=False の場合は待ち時間なしで返す（抽出処理の計測用）。
+    """
+    recorded_bandwidth = archive.host_bandwidth()
+    links: Dict[str, _HostLink] = {}
+    stats = {"requests": 0, "missing": 0, "bytes": 0}
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        host = (request.host or "").split(":")[0].lower()
+        stats["requests"] += 1
+        recorded = archive.lookup(host, request.path_qs)
+        if recorded is None:
+            stats["missing"] += 1
+            return web.Response(status=404, text="not recorded")
+
+        if shaping and latency_scale:
+            await asyncio.sleep(recorded.ttfb * latency_scale)
+        headers = {}
+        for name, value in recorded.headers:
+            if name.lower() == "location":
+                # 記録時のURL（https など）を再生サーバーに向け直す
+                value = replay_url(urljoin(recorded.url, value), port)
+            headers[name] = value
+        response = web.StreamResponse(status=recorded.status, headers=headers)
+        response.content_length = len(recorded.body)
+        await response.prepare(request)
+        link = links.get(host)
+        if link is None:
+            link = links[host] = _HostLink((bandwidth or recorded_bandwidth.get(host)) if shaping else None)
+        await link.send(response, recorded.body)
+        await response.write_eof()
+        stats["bytes"] += len(recorded.body)
+        return response
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_route("GET", "/{tail:.*}", handle)
+    return app
+
+
+async def start_replay_server(
+    archive: CorpusArchive,
+    host: str = "127.0.0.1",
+    port: int = 8903,
+    latency_scale: float = 1.0,
+    bandwidth: Optional[float] = None,
+    shaping: bool = True,
+) -> web.AppRunner:
+    """再生サーバーを起動（終了時は runner.cleanup() を呼ぶ。統計は runner.app["stats"]）"""
+    runner = web.AppRunner(create_replay_app(archive, port, latency_scale, bandwidth, shaping))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="URLを取得して記録")
+    record_parser.add_argument("--urls", required=True, help="1行1URLのファイル、または検索結果フィクスチャ（.json）")
+    record_parser.add_argument("--concurrency", type=int, default=8)
+    record_parser.add_argument("--max-redirects", type=int, default=5)
+    record_parser.add_argument("--timeout", type=float, default=30.0)
+
+    synthesize_parser = commands.add_parser("synthesize", help="架空のホストのアーカイブを作成")
+    synthesize_parser.add_argument("--pages", type=int, default=2000)
+    synthesize_parser.add_argument("--hosts", type=int, default=50)
+    synthesize_parser.add_argument("--page-chars", type=int, default=20000)
+    synthesize_parser.add_argument("--seed", type=int, default=0)
+
+    serve_parser = commands.add_parser("serve", help="アーカイブを再生")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8903)
+    serve_parser.add_argument("--latency-scale", type=float, default=1.0, help="記録時の応答時間に掛ける倍率")
+    serve_parser.add_argument("--bandwidth", type=float, help="ホストごとの帯域（バイト/秒。未指定は記録時の値）")
+    serve_parser.add_argument("--no-shaping", action="store_true", help="応答時間・帯域を再現しない")
+
+    commands.add_parser("info", help="アーカイブの概要を表示")
+    for sub in commands.choices.values():
+        sub.add_argument("--archive", default="corpus.sqlite3")
+    args = parser.parse_args()
+
+    archive = CorpusArchive(args.archive)
+    try:
+        if args.command == "record":
+            print(json.dumps(asyncio.run(record(
+                archive, _read_urls(args.urls), args.concurrency, args.max_redirects, args.timeout
+            ))))
+        elif args.command == "synthesize":
+            synthesize(archive, args.pages, args.hosts, args.page_chars, args.seed)
+        elif args.command == "serve":
+            web.run_app(
+                create_replay_app(archive, args.port, args.latency_scale, args.bandwidth, not args.no_shaping),
+                host=args.host,
+                port=args.port,
+            )
+        if args.command != "serve":
+            print(json.dumps(archive.info(), indent=2))
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
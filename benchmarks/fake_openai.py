@@ -0,0 +1,171 @@
+"""
+OpenAI Chat Completions API 互換のローカルモックサーバー。
+
+ネットワークや課金なしで記事生成の応答時間を計測するためのもの。
+最初のトークンまでの遅延とトークンごとの遅延を指定でき、
+stream=true の場合は本物のAPIと同じ形式の SSE で返す。
+--rpm-limit を指定すると、直近60秒のリクエスト数が上限を超えた場合に
+Retry-After 付きの 429 を返す（レート制限の再試行の確認用）。
+
+    python -m benchmarks.fake_openai --port 8900 --first-token-delay 1.5 --token-delay 0.02
+
+アプリ側は OPENAI_BASE_URL=http://127.0.0.1:8900/v1 を設定して起動する。
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import List
+from aiohttp import web
+
+ARTICLE = """# 比較分析結果
+## 1位・2位記事 vs 3〜5位記事の相違点
+- 上位記事は検索意図に沿った結論を冒頭に置いている
+- 見出し構成が具体的で、FAQ や表で情報を整理している
+
+# 上位表示のための施策とポイント
+## 必須コンテンツ要素
+- 検索意図を満たすための基本情報と手順
+- 筆者の経験や一次情報による E-E-A-T の補強
+- 構造化データと画像の alt 属性の最適化
+
+# 最適化された記事案
+## メタ情報
+- タイトル案（H1）: 初心者でもわかる完全ガイド
+- メタディスクリプション: 基本から実践までをわかりやすく解説します。
+
+## 記事構成
+### はじめに
+本記事では、基本的な考え方から具体的な手順までを順に解説します。
+### よくある質問
+Q. どのくらいで効果が出ますか？ A. 一般的には数か月程度かかります。
+### まとめ
+要点を押さえて、今日から実践してみましょう。
+"""
+
+
+def split_tokens(text: str, count: int) -> List[str]:
+    """本文を count 個程度の断片に分割（足りない場合は繰り返す）"""
+    size = max(1, len(text) // count)
+    tokens = [text[i:i + size] for i in range(0, len(text), size)]
+    while len(tokens) < count:
+        tokens.extend(tokens[:count - len(tokens)])
+    return tokens[:count]
+
+
+def create_app(first_token_delay: float, token_delay: float, tokens: int, rpm_limit: int = 0) -> web.Application:
+    article_tokens = split_tokens(ARTICLE, tokens)
+    recent_requests = deque()
+    stats = {"requests": 0, "rate_limited": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    def rate_limited() -> web.Response:
+        stats["rate_limited"] += 1
+        retry_after = max(1, math.ceil(recent_requests[0] + 60 - time.monotonic()))
+        return web.json_response(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status=429,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        stats["requests"] += 1
+        if rpm_limit:
+            now = time.monotonic()
+            while recent_requests and recent_requests[0] <= now - 60:
+                recent_requests.popleft()
+            if len(recent_requests) >= rpm_limit:
+                return rate_limited()
+            recent_requests.append(now)
+
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            return await respond(request, body)
+        finally:
+            stats["in_flight"] -= 1
+
+    async def respond(request: web.Request, body) -> web.StreamResponse:
+        model = body.get("model", "fake-model")
+        created = int(time.time())
+        await asyncio.sleep(first_token_delay)
+
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * len(article_tokens))
+            return web.json_response({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "".join(article_tokens)},
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(article_tokens), "total_tokens": len(article_tokens)},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        def chunk(delta, finish_reason=None) -> bytes:
+            data = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        await response.write(chunk({"role": "assistant", "content": ""}))
+        for i, token in enumerate(article_tokens):
+            if i:
+                await asyncio.sleep(token_delay)
+            await response.write(chunk({"content": token}))
+        await response.write(chunk({}, finish_reason="stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def start_fake_openai(
+    host: str = "127.0.0.1",
+    port: int = 8900,
+    first_token_delay: float = 1.0,
+    token_delay: float = 0.02,
+    tokens: int = 200,
+    rpm_limit: int = 0,
+) -> web.AppRunner:
+    """モックサーバーを起動（終了時は runner.cleanup() を呼ぶ。統計は runner.app["stats"]）"""
+    runner = web.AppRunner(create_app(first_token_delay, token_delay, tokens, rpm_limit))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--first-token-delay", type=float, default=1.0, help="最初のトークンまでの遅延（秒）")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="トークンごとの遅延（秒）")
+    parser.add_argument("--tokens", type=int, default=200, help="返すトークン数")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="1分あたりのリクエスト数の上限（0は無制限）")
+    args = parser.parse_args()
+    web.run_app(
+        create_app(args.first_token_delay, args.token_delay, args.tokens, args.rpm_limit),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+スクレイピング対象サイトのローカルモックサーバー。
+
+/page/{n} で内容の異なる記事ページ（見出し・本文・画像・共通のナビゲーションとフッター）を返し、
+/robots.txt はすべて許可する。応答の遅延とページのサイズを指定できる。
+検索結果のフィクスチャ（SERP_FIXTURE_PATH）を write_serp_fixture で作成すれば、
+外部サイトにアクセスせずに /scraping/search を計測できる。
+
+    python -m benchmarks.fake_origin --port 8902 --delay 0.05 --page-chars 20000
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import List
+from aiohttp import web
+
+VOCABULARY = (
+    "SEO 検索 順位 記事 コンテンツ キーワード 見出し 構成 ユーザー 意図 比較 方法 手順 ポイント "
+    "初心者 解説 おすすめ 注意点 メリット デメリット 費用 期間 効果 事例 データ 分析 改善 対策 "
+    "サイト ページ 内部 リンク 画像 速度 モバイル 評価 信頼 経験 専門 権威 情報 最新 基本 実践"
+).split()
+
+NAVIGATION = "<nav><a href='/'>ホーム</a> <a href='/about'>運営者情報</a> <a href='/contact'>お問い合わせ</a></nav>"
+FOOTER = "<footer><p>Copyright 2024 Benchmark Media. 無断転載を禁じます。</p></footer>"
+
+
+def _sentence(rng: random.Random) -> str:
+    return "".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))) + "。"
+
+
+def render_page(number: int, chars: int) -> str:
+    """ページ番号から決まった内容の記事HTMLを生成"""
+    rng = random.Random(number)
+    title = f"{rng.choice(VOCABULARY)}の{rng.choice(VOCABULARY)}を徹底解説【第{number}回】"
+    sections: List[str] = []
+    length = 0
+    section = 0
+    while length < chars:
+        section += 1
+        paragraphs = ["<p>" + "".join(_sentence(rng) for _ in range(rng.randint(3, 6))) + "</p>" for _ in range(3)]
+        length += sum(len(p) for p in paragraphs)
+        sections.append(
+            f"<h2>{section}. {rng.choice(VOCABULARY)}の{rng.choice(VOCABULARY)}</h2>"
+            f"<h3>{rng.choice(VOCABULARY)}について</h3>"
+            + "".join(paragraphs)
+            + f"<img src='/images/{number}-{section}.png' alt='{rng.choice(VOCABULARY)}の図'>"
+        )
+    return (
+        "<!DOCTYPE html><html lang='ja'><head><meta charset='utf-8'>"
+        f"<title>{title}</title>"
+        f"<meta name='description' content='{_sentence(rng)}'>"
+        f"</head><body>{NAVIGATION}<main><article><h1>{title}</h1>{''.join(sections)}</article></main>{FOOTER}"
+        "</body></html>"
+    )
+
+
+def create_app(delay: float, page_chars: int) -> web.Application:
+    pages = {}
+
+    async def page(request: web.Request) -> web.Response:
+        number = int(request.match_info["number"])
+        if delay:
+            await asyncio.sleep(delay)
+        if number not in pages:
+            pages[number] = render_page(number, page_chars)
+        return web.Response(text=pages[number], content_type="text/html", charset="utf-8")
+
+    async def robots(request: web.Request) -> web.Response:
+        return web.Response(text="User-agent: *\nAllow: /\n")
+
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots)
+    app.router.add_get("/page/{number:\\d+}", page)
+    return app
+
+
+def write_serp_fixture(path: str, keyword: str, base_url: str, pages: int) -> None:
+    """キーワードの検索結果をモックサーバーのページにしたフィクスチャを作成"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({keyword: [f"{base_url}/page/{n}" for n in range(1, pages + 1)]}, f, ensure_ascii=False)
+
+
+async def start_fake_origin(
+    host: str = "127.0.0.1",
+    port: int = 8902,
+    delay: float = 0.0,
+    page_chars: int = 20000,
+) -> web.AppRunner:
+    """モックサーバーを起動（終了時は runner.cleanup() を呼ぶ）"""
+    runner = web.AppRunner(create_app(delay, page_chars))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8902)
+    parser.add_argument("--delay", type=float, default=0.0, help="応答までの遅延（秒）")
+    parser.add_argument("--page-chars", type=int, default=20000, help="1ページの本文のおおよその文字数")
+    args = parser.parse_args()
+    web.run_app(create_app(args.delay, args.page_chars), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+記事生成の応答時間（TTFB）ベンチマーク。
+
+ローカルのモックLLM（benchmarks.fake_openai）と SQLite を使ってアプリを起動し、
+/content/generate と /content/generate/stream について
+最初の本文バイトが届くまでの時間と完了までの時間を計測する。
+
+    python -m benchmarks.generation_ttfb --runs 5 --first-token-delay 1.5 --token-delay 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+
+def _configure_env(args: argparse.Namespace, db_path: str) -> None:
+    # app の設定はインポート時に読み込まれるため、インポート前に環境変数を設定する
+    os.environ.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{db_path}",
+        OPENAI_API_KEY="fake",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.llm_port}/v1",
+        SECRET_KEY="benchmark-secret",
+        JOB_WORKER_MODE="external",
+    )
+
+
+async def _prepare_database() -> str:
+    """テーブルとベンチマーク用ユーザーを作成し、アクセストークンを返す"""
+    import app.models  # noqa: F401  モデルをメタデータに登録
+    from app.core.security import create_access_token
+    from app.db.base import Base
+    from app.db.session import AsyncSessionLocal, engine
+    from app.models.user import User
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(User(email="bench@example.com", hashed_password="-", is_active=True))
+        await db.commit()
+    return create_access_token("bench@example.com")
+
+
+async def _measure(session, url: str, token: str, stream: bool) -> Dict[str, float]:
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"analysis_results": {"scraping_results": []}}
+    started = time.perf_counter()
+    ttfb = None
+    async with session.post(url, params={"keyword": "ベンチマーク"}, json=body, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.content:
+            # ストリーミングでは最初の token イベント、通常のレスポンスでは最初の本文バイト
+            if ttfb is None and (not stream or line.startswith(b"event: token")):
+                ttfb = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return {"ttfb": ttfb if ttfb is not None else total, "total": total}
+
+
+def _summary(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    return {
+        f"{metric}_{stat}": round(func([s[metric] for s in samples]) * 1000, 1)
+        for metric in ("ttfb", "total")
+        for stat, func in (("p50", statistics.median), ("max", max))
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    import aiohttp
+    import uvicorn
+    from benchmarks.fake_openai import start_fake_openai
+
+    llm = await start_fake_openai(
+        port=args.llm_port,
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        tokens=args.tokens,
+    )
+    token = await _prepare_database()
+
+    from app.main import app
+    # 計測に必要なのはリクエスト処理だけなので、起動時処理（DB接続確認・ジョブワーカー）は行わない
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=args.app_port, log_level="warning", lifespan="off"
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            await llm.cleanup()
+            raise RuntimeError("アプリケーションの起動に失敗しました")
+        await asyncio.sleep(0.05)
+
+    base = f"http://127.0.0.1:{args.app_port}/api/v1/content"
+    results = {}
+    try:
+        async with aiohttp.ClientSession() as session:
+            for name, path, stream in (("generate", "/generate", False), ("generate_stream", "/generate/stream", True)):
+                samples = [await _measure(session, base + path, token, stream) for _ in range(args.runs)]
+                results[name] = _summary(samples)
+    finally:
+        server.should_exit = True
+        await server_task
+        await llm.cleanup()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=1.0, help="モックLLMの最初のトークンまでの遅延（秒）")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="モックLLMのトークンごとの遅延（秒）")
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--llm-port", type=int, default=8900)
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure_env(args, os.path.join(tmp, "benchmark.db"))
+        results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'endpoint':<18}{'ttfb p50':>10}{'ttfb max':>10}{'total p50':>11}{'total max':>11}  (ms)")
+    for name, r in results.items():
+        print(f"{name:<18}{r['ttfb_p50']:>10}{r['ttfb_max']:>10}{r['total_p50']:>11}{r['total_max']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+同時ログイン時のスループットとイベントループの遅延の計測。
+
+ログイン処理（ユーザー検索 + bcrypt の照合）を同時に多数実行し、
+- inline: bcrypt をイベントループ上で同期的に実行（従来の実装）
+- pool: PasswordHasher のスレッドプールで実行（crud.user.authenticate）
+を比較する。ログインと並行して 10 ms ごとに起きるタスクを動かし、
+予定より遅れた時間をイベントループの遅延（他のリクエストの待ち時間）として記録する。
+
+    python -m benchmarks.login_load --concurrency 16 --requests 4
+    python -m benchmarks.login_load --workers 4 --max-queue 8 --rounds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+PROBE_INTERVAL = 0.01
+EMAIL = "bench@example.com"
+PASSWORD = "benchmark-password"
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _prepare() -> None:
+    """テーブルとベンチマーク用ユーザーを作成"""
+    import app.models  # noqa: F401  モデルをメタデータに登録
+    from app.core.security import get_password_hash
+    from app.db.base import Base
+    from app.db.session import AsyncSessionLocal, engine
+    from app.models.user import User
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(User(email=EMAIL, hashed_password=get_password_hash(PASSWORD), is_active=True))
+        await db.commit()
+
+
+async def _authenticate_inline(db, email: str, password: str):
+    from app.core.security import verify_password
+    from app.crud import user as user_crud
+
+    user = await user_crud.get_by_email(db, email)
+    if not user or not verify_password(password, user.hashed_password):
+        return None
+    return user
+
+
+async def _probe_loop_lag(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        scheduled = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - scheduled))
+
+
+async def _run_mode(mode: str, concurrency: int, requests: int) -> Dict[str, Any]:
+    from app.core.security import PasswordHasherBusy, password_hasher
+    from app.crud import user as user_crud
+    from app.db.session import AsyncSessionLocal
+
+    authenticate = user_crud.authenticate if mode == "pool" else _authenticate_inline
+    latencies: List[float] = []
+    lags: List[float] = []
+    rejected = 0
+
+    async def worker() -> None:
+        nonlocal rejected
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    user = await authenticate(db, EMAIL, PASSWORD)
+                assert user is not None
+                latencies.append(time.perf_counter() - started)
+            except PasswordHasherBusy:
+                rejected += 1
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return {
+        "mode": mode,
+        "logins": len(latencies),
+        "rejected": rejected,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "login_p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "login_p99_ms": round(_percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "loop_lag_p99_ms": round(_percentile(lags, 99) * 1000, 1) if lags else 0.0,
+        "loop_lag_max_ms": round(max(lags) * 1000, 1) if lags else 0.0,
+        "workers": password_hasher.workers if mode == "pool" else None,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    await _prepare()
+    results = []
+    for mode in args.modes.split(","):
+        results.append(await _run_mode(mode, args.concurrency, args.requests))
+    from app.core.security import password_hasher
+    password_hasher.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="inline,pool", help="比較する方式（カンマ区切り）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=4, help="並行ワーカーごとのログイン回数")
+    parser.add_argument("--workers", type=int, help="PASSWORD_HASH_WORKERS")
+    parser.add_argument("--max-queue", type=int, help="PASSWORD_HASH_MAX_QUEUE")
+    parser.add_argument("--rounds", type=int, help="BCRYPT_ROUNDS")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # app の設定はインポート時に読み込まれるため、インポート前に環境変数を設定する
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tmp, 'benchmark.db')}"
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        os.environ["DEBUG"] = "false"
+        for name, value in (
+            ("PASSWORD_HASH_WORKERS", args.workers),
+            ("PASSWORD_HASH_MAX_QUEUE", args.max_queue),
+            ("BCRYPT_ROUNDS", args.rounds),
+        ):
+            if value is not None:
+                os.environ[name] = str(value)
+        results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{'mode':<8}{'logins':>7}{'rejected':>9}{'login/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'lag p99 ms':>12}{'lag max ms':>12}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<8}{r['logins']:>7}{r['rejected']:>9}{r['throughput_rps']:>9}"
+            f"{str(r['login_p50_ms']):>9}{str(r['login_p99_ms']):>9}"
+            f"{r['loop_lag_p99_ms']:>12}{r['loop_lag_max_ms']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
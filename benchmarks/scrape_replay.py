@@ -0,0 +1,236 @@
+"""
+記録したページ（benchmarks.corpus のアーカイブ）を使ったスクレイピング・抽出のベンチマーク。
+
+scrape: アーカイブを再生サーバーで返し、ScrapingService.scrape_pages（robots.txt の確認・
+        同時実行数とホストごとのレート制限・本文の読み込み・抽出）を全ページに対して実行する。
+        ページ/秒・バイト/秒・エラーの内訳・メインプロセスの CPU 時間を記録する
+        （プロセスプールで解析したページの CPU 時間は含まない）。
+extract: ネットワークを通さずにアーカイブの本文を各抽出エンジン（extraction.EXTRACTORS）に渡し、
+         ページあたりの CPU 時間を計測する。soup エンジンは解析と抽出関数ごとの内訳も記録する。
+
+    python -m benchmarks.corpus synthesize --pages 2000 --archive corpus.sqlite3
+    python -m benchmarks.scrape_replay --archive corpus.sqlite3 --concurrency 20 --per-host 2
+    python -m benchmarks.scrape_replay --archive corpus.sqlite3 --phases extract --limit 500 --json
+    python -m benchmarks.scrape_replay --archive corpus.sqlite3 --no-shaping --env PARSE_POOL_SIZE=0
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+PHASES = ("scrape", "extract")
+_CHARSET_RE = re.compile(r"charset=([\w\-:.]+)", re.I)
+
+
+def _configure_env(args: argparse.Namespace, tmp: str) -> None:
+    # app の設定はインポート時に読み込まれるため、インポート前に環境変数を設定する
+    os.environ.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{os.path.join(tmp, 'benchmark.db')}",
+        OPENAI_API_KEY="fake",
+        SECRET_KEY="benchmark-secret",
+        DEBUG="false",
+        PAGE_CACHE_ENABLED="false",
+        SCRAPE_DELAY="0",
+        SCRAPE_CONCURRENCY=str(args.concurrency),
+        SCRAPE_PER_HOST_CONCURRENCY=str(args.per_host),
+    )
+    for item in args.env:
+        name, _, value = item.partition("=")
+        os.environ[name] = value
+
+
+def _decode(headers: List[Tuple[str, str]], body: bytes) -> str:
+    """Content-Type の charset、meta タグ、UTF-8 の順に文字コードを決めて本文をデコード"""
+    from app.services.fetch import sniff_charset
+
+    content_type = next((value for name, value in headers if name.lower() == "content-type"), "")
+    match = _CHARSET_RE.search(content_type)
+    for charset in (match.group(1) if match else None, sniff_charset(body[:4096]), "utf-8"):
+        if charset:
+            try:
+                return body.decode(charset, errors="replace")
+            except LookupError:
+                continue
+    return body.decode("utf-8", errors="replace")
+
+
+async def run_scrape(args: argparse.Namespace, archive) -> Dict[str, Any]:
+    from benchmarks.api_load import LoopThread
+    from benchmarks.corpus import StaticResolver, replay_url, start_replay_server
+    from app.services.http_client import create_http_client
+    from app.services.parse_pool import shutdown_parse_pool
+    from app.services.scraping import ScrapingService
+
+    urls = [replay_url(url, args.port) for url in archive.page_urls(args.limit)]
+    replay = LoopThread("corpus-replay")
+    runner = await replay.submit(start_replay_server(
+        archive,
+        port=args.port,
+        latency_scale=args.latency_scale,
+        bandwidth=args.bandwidth,
+        shaping=not args.no_shaping,
+    ))
+    # すべてのホスト名を再生サーバーに解決する
+    session = create_http_client(resolver=StaticResolver())
+    try:
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        async with ScrapingService(session=session) as service:
+            pages = await service.scrape_pages(urls)
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+    finally:
+        await session.close()
+        shutdown_parse_pool()
+        await replay.submit(runner.cleanup())
+        replay.stop()
+
+    scraped = [page for page in pages if not page.get("blocked")]
+    errors = Counter(page.get("error") for page in pages if page.get("blocked"))
+    total_bytes = sum(page.get("fetch_stats", {}).get("bytes_read", 0) for page in scraped)
+    server_stats = runner.app["stats"]
+    return {
+        "pages": len(urls),
+        "scraped": len(scraped),
+        "failed": len(pages) - len(scraped),
+        "errors": dict(errors.most_common(5)),
+        "elapsed_s": round(elapsed, 2),
+        "pages_per_s": round(len(scraped) / elapsed, 1),
+        "bytes_per_s": round(total_bytes / elapsed),
+        "cpu_s": round(cpu, 2),
+        "cpu_ms_per_page": round(cpu / len(scraped) * 1000, 2) if scraped else None,
+        "replay_requests": server_stats["requests"],
+        "replay_missing": server_stats["missing"],
+    }
+
+
+def _timed(samples: Dict[str, List[float]], name: str, func: Callable, *args: Any) -> Any:
+    started = time.process_time()
+    result = func(*args)
+    samples.setdefault(name, []).append(time.process_time() - started)
+    return result
+
+
+def _summary(samples: List[float], total_bytes: int) -> Dict[str, Any]:
+    total = sum(samples)
+    ordered = sorted(samples)
+    return {
+        "cpu_s": round(total, 3),
+        "cpu_ms_per_page_p50": round(statistics.median(ordered) * 1000, 2),
+        "cpu_ms_per_page_p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "pages_per_cpu_s": round(len(samples) / total, 1) if total else None,
+        "bytes_per_cpu_s": round(total_bytes / total) if total else None,
+    }
+
+
+def run_extract(args: argparse.Namespace, archive) -> Dict[str, Any]:
+    from bs4 import BeautifulSoup
+    from app.services import extraction
+
+    documents = [(r.url, _decode(r.headers, r.body)) for r in archive.responses(args.limit, pages_only=True)]
+    total_bytes = sum(len(html.encode("utf-8")) for _, html in documents)
+    results: Dict[str, Any] = {"pages": len(documents), "bytes": total_bytes, "engines": {}, "soup_breakdown": {}}
+    if not documents:
+        return results
+
+    for engine, extract in extraction.EXTRACTORS.items():
+        samples: Dict[str, List[float]] = {}
+        for url, html in documents:
+            _timed(samples, engine, extract, html, url)
+        results["engines"][engine] = _summary(samples[engine], total_bytes)
+
+    # extract_page_soup と同じ順序で実行する（extract_content がツリーを変更するため）
+    breakdown: Dict[str, List[float]] = {}
+    for url, html in documents:
+        soup = _timed(breakdown, "parse", BeautifulSoup, html, "html.parser")
+        _timed(breakdown, "title", extraction.extract_title, soup)
+        _timed(breakdown, "meta_description", extraction.extract_meta_description, soup)
+        _timed(breakdown, "headings", extraction.extract_headings, soup)
+        _timed(breakdown, "content", extraction.extract_content, soup)
+        _timed(breakdown, "images", extraction.extract_images, soup, url)
+    results["soup_breakdown"] = {
+        name: {"cpu_s": round(sum(values), 3), "cpu_ms_per_page": round(sum(values) / len(values) * 1000, 3)}
+        for name, values in breakdown.items()
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", default="corpus.sqlite3")
+    parser.add_argument("--phases", default=",".join(PHASES), help="実行する計測（カンマ区切り）")
+    parser.add_argument("--limit", type=int, help="使用するページ数の上限")
+    parser.add_argument("--concurrency", type=int, default=20, help="SCRAPE_CONCURRENCY")
+    parser.add_argument("--per-host", type=int, default=2, help="SCRAPE_PER_HOST_CONCURRENCY")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="記録時の応答時間に掛ける倍率")
+    parser.add_argument("--bandwidth", type=float, help="ホストごとの帯域（バイト/秒。未指定は記録時の値）")
+    parser.add_argument("--no-shaping", action="store_true", help="応答時間・帯域を再現しない")
+    parser.add_argument("--port", type=int, default=8903, help="再生サーバーのポート")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="アプリの設定を上書き")
+    parser.add_argument("--output", help="結果を保存する JSON ファイル")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    parser.add_argument("--verbose", action="store_true", help="スクレイピングのログを出力")
+    args = parser.parse_args()
+    phases = args.phases.split(",")
+    if set(phases) - set(PHASES):
+        parser.error(f"unknown phases: {', '.join(sorted(set(phases) - set(PHASES)))}")
+    if not os.path.exists(args.archive):
+        parser.error(f"archive not found: {args.archive}")
+
+    from benchmarks.corpus import CorpusArchive
+
+    archive = CorpusArchive(args.archive)
+    results: Dict[str, Any] = {"archive": archive.info()}
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure_env(args, tmp)
+        logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+        # アプリのデバッグ出力（print）は結果と混ざらないよう標準エラー出力に出す
+        with contextlib.redirect_stdout(sys.stderr):
+            if "scrape" in phases:
+                results["scrape"] = asyncio.run(run_scrape(args, archive))
+            if "extract" in phases:
+                results["extract"] = run_extract(args, archive)
+    archive.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    if "scrape" in results:
+        r = results["scrape"]
+        print(
+            f"scrape: {r['scraped']}/{r['pages']} pages in {r['elapsed_s']}s  "
+            f"{r['pages_per_s']} pages/s  {r['bytes_per_s'] / 1024 / 1024:.2f} MB/s  "
+            f"cpu {r['cpu_s']}s ({r['cpu_ms_per_page']} ms/page)"
+        )
+        for error, count in r["errors"].items():
+            print(f"  {count:>6}  {error}")
+    if "extract" in results:
+        r = results["extract"]
+        print(f"\nextract: {r['pages']} pages, {r['bytes'] / 1024 / 1024:.1f} MB")
+        print(f"{'engine':<12}{'cpu s':>9}{'p50 ms':>9}{'p95 ms':>9}{'pages/s':>9}{'MB/s':>8}")
+        for engine, e in r["engines"].items():
+            mb_per_s = (e["bytes_per_cpu_s"] or 0) / 1024 / 1024
+            print(
+                f"{engine:<12}{e['cpu_s']:>9}{e['cpu_ms_per_page_p50']:>9}{e['cpu_ms_per_page_p95']:>9}"
+                f"{str(e['pages_per_cpu_s']):>9}{mb_per_s:>8.2f}"
+            )
+        print(f"\n{'soup step':<18}{'cpu s':>9}{'ms/page':>9}")
+        for name, step in r["soup_breakdown"].items():
+            print(f"{name:<18}{step['cpu_s']:>9}{step['cpu_ms_per_page']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { contentApi } from '../services/api';
 import { GeneratedContent, GenerationRequest } from '../types/api';
 
@@ -55,12 +55,25 @@ export const useContentGeneration = () => {
     },
   });
 
-  // コンテンツ一覧取得
-  const { data: contents, isLoading: isLoadingContents } = useQuery({
+  // コンテンツ一覧取得（カーソルで次のページを読み込む）
+  const {
+    data,
+    isLoading: isLoadingContents,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
     queryKey: ['contents'],
-    queryFn: () => contentApi.getContents(),
-    enabled: true,
+    queryFn: ({ pageParam }) => contentApi.getContents(pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
   });
+  const contents = data?.pages.flatMap((page) => page.items);
+
+  // 一覧には本文が含まれないため、選択したコンテンツは1件ずつ取得する
+  const selectContent = async (id: number) => {
+    setSelectedContent(await contentApi.getContent(id));
+  };
 
   // コンテンツ削除
   const deleteMutation = useMutation({
@@ -73,8 +86,12 @@ export const useContentGeneration = () => {
   return {
     contents,
     isLoadingContents,
+    loadMoreContents: fetchNextPage,
+    hasMoreContents: hasNextPage,
+    isLoadingMoreContents: isFetchingNextPage,
     selectedContent,
     setSelectedContent,
+    selectContent,
     generateContent: generateMutation.mutate,
     isGenerating: generateMutation.isPending,
     deleteContent: deleteMutation.mutate,
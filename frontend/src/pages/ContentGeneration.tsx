@@ -39,8 +39,12 @@ const ContentGeneration = () => {
   const {
     contents,
     isLoadingContents,
+    loadMoreContents,
+    hasMoreContents,
+    isLoadingMoreContents,
     selectedContent,
     setSelectedContent,
+    selectContent,
     generateContent,
     isGenerating,
     deleteContent,
@@ -172,7 +176,7 @@ const ContentGeneration = () => {
                     キーワード: {content.keyword}
                   </Typography>
                   <Typography variant="body2" color="text.secondary">
-                    作成日: {new Date(content.created_at).toLocaleDateString()}
+                    作成日: {content.created_at ? new Date(content.created_at).toLocaleDateString() : '-'}
                   </Typography>
                   <Typography variant="body2" color="text.secondary">
                     ステータス: {content.status}
@@ -180,7 +184,7 @@ const ContentGeneration = () => {
                 </CardContent>
                 <CardActions>
                   <IconButton
-                    onClick={() => setSelectedContent(content)}
+                    onClick={() => selectContent(content.id)}
                     aria-label="edit"
                   >
                     <EditIcon />
@@ -196,6 +200,17 @@ const ContentGeneration = () => {
               </Card>
             </Grid>
           ))}
+          {hasMoreContents && (
+            <Grid item xs={12} sx={{ textAlign: 'center' }}>
+              <Button
+                variant="outlined"
+                onClick={() => loadMoreContents()}
+                disabled={isLoadingMoreContents}
+              >
+                {isLoadingMoreContents ? <CircularProgress size={24} /> : 'さらに読み込む'}
+              </Button>
+            </Grid>
+          )}
         </Grid>
       ) : (
         <Box sx={{ textAlign: 'center', py: 4 }}>
@@ -5,6 +5,7 @@ import {
   RegisterRequest,
   GenerationRequest,
   GeneratedContent,
+  ContentPage,
   WordPressConfig,
   User,
 } from '../types/api';
@@ -136,8 +137,11 @@ export const contentApi = {
     return response.data;
   },
 
-  getContents: async (): Promise<GeneratedContent[]> => {
-    const response = await api.get<GeneratedContent[]>('/api/v1/content');
+  // 新しい順に1ページ分を取得（次のページは next_cursor を cursor に指定する）
+  getContents: async (cursor?: string, limit = 20): Promise<ContentPage> => {
+    const response = await api.get<ContentPage>('/api/v1/content/', {
+      params: { cursor, limit },
+    });
     return response.data;
   },
 
@@ -49,6 +49,23 @@ export interface GeneratedContent {
   wordpress_post_id?: number;
 }
 
+// 一覧（GET /api/v1/content）の1件。本文は含まれない
+export interface ContentSummary {
+  id: number;
+  keyword: string;
+  title: string | null;
+  meta_description: string | null;
+  status: string | null;
+  wordpress_post_id: number | null;
+  created_at: string | null;
+  updated_at: string | null;
+}
+
+export interface ContentPage {
+  items: ContentSummary[];
+  next_cursor: string | null; // 次のページを取得するときに cursor に指定する
+}
+
 // WordPress関連の型定義
 export interface WordPressConfig {
   id: number;
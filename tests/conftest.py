@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+# app の設定はインポート時に読み込まれるため、テスト用の値を先に設定する
+_tmp = tempfile.mkdtemp(prefix="seo-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_tmp, 'test.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("JOB_WORKER_MODE", "external")
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("GENERATION_CACHE_BACKEND", "none")
+os.environ.setdefault("DEDUP_ENABLED", "false")
+# テストごとにイベントループが変わるため、接続をプールしない
+os.environ.setdefault("DB_POOL_MODE", "null")
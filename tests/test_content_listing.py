@@ -0,0 +1,85 @@
+"""コンテンツ一覧（カーソルによるページング）と1件取得の確認"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.auth import create_access_token
+from app.db.base import Base
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+from app.models.content import Content
+from app.models.user import User
+
+
+async def _setup() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        session.add_all([
+            User(id=1, email="owner@example.com", hashed_password="x", is_active=True),
+            User(id=2, email="other@example.com", hashed_password="x", is_active=True),
+        ])
+        # SQLite の CURRENT_TIMESTAMP は書式が異なるため、作成日時を明示する（2件は同時刻）
+        base = datetime(2024, 1, 1)
+        session.add_all([
+            Content(user_id=1, keyword=f"kw{i}", title=f"title {i}", content=f"body {i}", status="draft",
+                    created_at=base + timedelta(minutes=min(i, 3)))
+            for i in range(5)
+        ])
+        session.add(Content(user_id=2, keyword="other", title="other", content="other", status="draft"))
+        await session.commit()
+
+
+@pytest.fixture(scope="module")
+def client():
+    asyncio.run(_setup())
+    return TestClient(app)
+
+
+def _headers(email: str):
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def test_pages_follow_cursor(client):
+    headers = _headers("owner@example.com")
+    first = client.get("/api/v1/content/", params={"limit": 3}, headers=headers).json()
+    assert len(first["items"]) == 3
+    assert "content" not in first["items"][0]
+    second = client.get("/api/v1/content/", params={"limit": 3, "cursor": first["next_cursor"]}, headers=headers).json()
+    assert len(second["items"]) == 2
+    assert second["next_cursor"] is None
+    ids = [item["id"] for item in first["items"] + second["items"]]
+    assert len(set(ids)) == 5
+
+
+def test_invalid_cursor(client):
+    response = client.get("/api/v1/content/", params={"cursor": "not-a-cursor"}, headers=_headers("owner@example.com"))
+    assert response.status_code == 400
+
+
+def test_get_content_includes_body(client):
+    headers = _headers("owner@example.com")
+    item = client.get("/api/v1/content/", params={"limit": 1}, headers=headers).json()["items"][0]
+    response = client.get(f"/api/v1/content/{item['id']}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["content"].startswith("body")
+    assert client.get(f"/api/v1/content/{item['id']}", headers=_headers("other@example.com")).status_code == 404
+
+
+def test_llm_stats_route_is_not_shadowed(client):
+    assert client.get("/api/v1/content/llm-stats").status_code == 200
+
+
+def test_one_per_page_crosses_equal_timestamps(client):
+    headers = _headers("owner@example.com")
+    ids, cursor = [], None
+    while True:
+        page = client.get("/api/v1/content/", params={"limit": 1, "cursor": cursor}, headers=headers).json()
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == [5, 4, 3, 2, 1]
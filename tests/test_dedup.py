@@ -0,0 +1,33 @@
+"""重複としてまとめたページの similarity が残したページ（duplicate_of）との類似度であることの確認"""
+import asyncio
+import random
+
+from app.services import dedup
+from app.services.dedup import DedupIndex, MinHasher, _signatures, collapse_duplicates, similarity
+
+
+def _text(seed, length):
+    rng = random.Random(seed)
+    return "".join(rng.choice("あいうえおかきくけこさしすせそたちつてと") for _ in range(length))
+
+
+def test_collapsed_similarity_is_against_kept_page(monkeypatch, tmp_path):
+    monkeypatch.setattr(dedup.settings, "DEDUP_ENABLED", True)
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), MinHasher(128, 16), threshold=0.8, max_entries=1000)
+    monkeypatch.setattr(dedup, "_dedup_index", index)
+
+    base = _text(1, 2000)
+    earlier = {"url": "https://origin.example/a", "content": base}
+    # 上位のページは転載元に少し追記したもの、下位のページは転載元と同じ本文
+    kept = {"url": "https://copy1.example/a", "content": base + _text(2, 150)}
+    collapsed = {"url": "https://copy2.example/a", "content": base}
+
+    asyncio.run(collapse_duplicates([earlier]))
+    results = asyncio.run(collapse_duplicates([kept, collapsed]))
+
+    assert results[0]["near_duplicate_of"] == earlier["url"]
+    assert results[1]["duplicate_of"] == kept["url"]
+    kept_signature, collapsed_signature = _signatures(index.hasher, [kept["content"], collapsed["content"]])
+    assert results[1]["similarity"] == round(similarity(collapsed_signature, kept_signature), 3)
+    assert results[1]["similarity"] < 1.0
+    index.close()
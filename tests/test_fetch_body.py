@@ -0,0 +1,53 @@
+"""read_limited_body の打ち切り・文字コード判定の確認"""
+import asyncio
+
+from app.services.fetch import read_limited_body
+
+
+class _FakeContent:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    async def iter_chunked(self, size):
+        while self._chunks:
+            yield self._chunks.pop(0)
+
+    def at_eof(self):
+        return not self._chunks
+
+
+class _FakeResponse:
+    def __init__(self, chunks, charset=None):
+        self.charset = charset
+        self.content = _FakeContent(chunks)
+
+
+def _read(chunks, max_bytes=1024, charset=None):
+    return asyncio.run(read_limited_body(_FakeResponse(chunks, charset), max_bytes=max_bytes))
+
+
+def test_stops_after_html_end_split_across_chunks():
+    body = _read([b"<html><body>a</bo", b"dy></ht", b"ml>", b"tracking" * 100])
+    assert body.text == "<html><body>a</body></html>"
+    assert body.stopped_at_html_end
+    assert not body.truncated
+
+
+def test_reads_until_eof_without_html_end():
+    body = _read([b"<p>a", b"b</p>"])
+    assert body.text == "<p>ab</p>"
+    assert not body.stopped_at_html_end
+
+
+def test_truncates_at_max_bytes():
+    body = _read([b"x" * 600, b"y" * 600], max_bytes=1000)
+    assert body.truncated
+    assert body.bytes_read == 1000
+    assert body.peak_bytes_estimate >= body.bytes_read
+
+
+def test_charset_from_meta_tag():
+    html = '<html><head><meta charset="shift_jis"></head><body>日本語</body></html>'
+    body = _read([html.encode("shift_jis")])
+    assert body.charset == "shift_jis"
+    assert "日本語" in body.text
@@ -0,0 +1,71 @@
+"""生成キャッシュのキーが取得ごとに変わる値（fetch_stats など）やキーの順序に左右されないことの確認"""
+import asyncio
+import copy
+
+from app.services import content_generation
+from app.services.content_generation import generation_cache_key
+
+PAGE = {
+    "url": "https://example.com/seo",
+    "title": "SEO対策の基本",
+    "meta_description": "SEO対策の基本を解説します。",
+    "headings": {"h1": ["SEO対策の基本"], "h2": ["キーワード選定", "内部リンク"]},
+    "content": "SEO対策ではキーワード選定が重要です。内部リンクも整理しましょう。",
+    "images": [{"src": "https://example.com/a.png", "alt": "図"}],
+}
+
+
+def _key(pages):
+    return generation_cache_key("SEO対策", {"scraping_results": pages})
+
+
+def test_transport_and_diagnostic_fields_do_not_change_key():
+    first = copy.deepcopy(PAGE)
+    first["fetch_stats"] = {"bytes_read": 1000, "peak_bytes_estimate": 4000, "truncated": False}
+    second = copy.deepcopy(PAGE)
+    second["fetch_stats"] = {"not_modified": True}
+    second["similarity"] = 0.42
+    second["near_duplicate_of"] = "https://example.com/other"
+    assert _key([first]) == _key([second])
+
+
+def test_key_order_does_not_change_key():
+    first = {"summary": {"a": 1, "b": 2}, "scraping_results": [PAGE]}
+    second = {"scraping_results": [dict(reversed(list(PAGE.items())))], "summary": {"b": 2, "a": 1}}
+    assert generation_cache_key("SEO対策", first) == generation_cache_key("SEO対策", second)
+
+
+def test_content_changes_key():
+    changed = copy.deepcopy(PAGE)
+    changed["content"] += "追加の段落です。"
+    assert _key([PAGE]) != _key([changed])
+
+
+def test_keyword_is_normalized():
+    analysis_results = {"scraping_results": [PAGE]}
+    assert generation_cache_key("ＳＥＯ対策 ", analysis_results) == generation_cache_key("SEO対策", analysis_results)
+
+
+class _FakeCache:
+    def __init__(self, entries):
+        self.entries = entries
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+
+def test_cache_hit_skips_analysis(monkeypatch):
+    analysis_results = {"scraping_results": [PAGE]}
+    cache = _FakeCache({_key([PAGE]): "# cached"})
+    monkeypatch.setattr(content_generation, "get_generation_cache", lambda: cache)
+
+    def fail(*args):
+        raise AssertionError("prompt_analysis should not run on a cache hit")
+
+    monkeypatch.setattr(content_generation, "prompt_analysis", fail)
+
+    async def stream():
+        return [part async for part in content_generation.stream_article("SEO対策", analysis_results)]
+
+    assert asyncio.run(content_generation.generate_article("SEO対策", analysis_results)) == "# cached"
+    assert asyncio.run(stream()) == ["# cached"]
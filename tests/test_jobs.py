@@ -0,0 +1,144 @@
+"""ジョブの期限（リース）による再取得とキャンセルの確認"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.db.base import Base
+from app.db.session import AsyncSessionLocal, engine
+from app.models.job import Job
+from app.models.user import User
+from app.services import jobs
+from app.services.jobs import CANCELLED, FAILED, QUEUED, RUNNING, JobWorkerPool, cancel_job
+
+
+async def _reset() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        session.add(User(id=1, email="owner@example.com", hashed_password="x", is_active=True))
+        await session.commit()
+
+
+async def _add_job(**values) -> int:
+    async with AsyncSessionLocal() as session:
+        job = Job(user_id=1, job_type="generate", params={"keyword": "seo"}, **values)
+        session.add(job)
+        await session.commit()
+        return job.id
+
+
+async def _get_job(job_id: int) -> Job:
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(select(Job).where(Job.id == job_id))).scalar_one()
+
+
+def _past() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=5)
+
+
+def _future() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=5)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def database():
+    run(_reset())
+
+
+def test_claim_sets_lease_and_owner():
+    async def scenario():
+        job_id = await _add_job(status=QUEUED)
+        pool = JobWorkerPool(concurrency=1, poll_interval=0.01)
+        job = await pool._claim_next()
+        assert job.id == job_id
+        stored = await _get_job(job_id)
+        assert stored.status == RUNNING
+        assert stored.locked_by == pool.worker_id
+        assert stored.lease_expires_at is not None
+        assert stored.attempts == 1
+    run(scenario())
+
+
+def test_expired_running_job_is_reclaimed():
+    async def scenario():
+        job_id = await _add_job(status=RUNNING, locked_by="crashed", lease_expires_at=_past(), attempts=1)
+        live_id = await _add_job(status=RUNNING, locked_by="alive", lease_expires_at=_future(), attempts=1)
+        pool = JobWorkerPool(concurrency=2, poll_interval=0.01)
+        job = await pool._claim_next()
+        assert job.id == job_id
+        stored = await _get_job(job_id)
+        assert stored.locked_by == pool.worker_id
+        assert stored.attempts == 2
+        assert (await _get_job(live_id)).locked_by == "alive"
+        assert await pool._claim_next() is None
+    run(scenario())
+
+
+def test_expired_job_fails_after_max_attempts():
+    async def scenario():
+        job_id = await _add_job(
+            status=RUNNING, locked_by="crashed", lease_expires_at=_past(), attempts=jobs.settings.JOB_MAX_ATTEMPTS
+        )
+        pool = JobWorkerPool(concurrency=1, poll_interval=0.01)
+        assert await pool._claim_next() is None
+        stored = await _get_job(job_id)
+        assert stored.status == FAILED
+        assert stored.finished_at is not None
+    run(scenario())
+
+
+def test_lost_lease_abandons_without_writing_result(monkeypatch):
+    async def slow_handler(user_id, params):
+        await asyncio.sleep(10)
+        return {"ok": True}
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "generate", slow_handler)
+
+    async def scenario():
+        job_id = await _add_job(status=QUEUED)
+        pool = JobWorkerPool(concurrency=1, poll_interval=0.01)
+        job = await pool._claim_next()
+        runner = asyncio.create_task(pool._run(job))
+        await asyncio.sleep(0.05)
+        # 別のワーカーが期限切れのジョブを再取得した状態にする
+        async with AsyncSessionLocal() as session:
+            stored = await session.get(Job, job_id)
+            stored.locked_by = "other"
+            await session.commit()
+        await asyncio.wait_for(runner, timeout=2)
+        stored = await _get_job(job_id)
+        assert stored.status == RUNNING
+        assert stored.locked_by == "other"
+        assert stored.result is None
+    run(scenario())
+
+
+def test_cancel_uses_current_status_not_stale_object():
+    async def scenario():
+        job_id = await _add_job(status=QUEUED)
+        async with AsyncSessionLocal() as session:
+            stale = await session.get(Job, job_id)
+            # 読み取った後にワーカーが取得する
+            pool = JobWorkerPool(concurrency=1, poll_interval=0.01)
+            await pool._claim_next()
+            job = await cancel_job(session, stale)
+            assert job.status == RUNNING
+            assert job.cancel_requested is True
+    run(scenario())
+
+
+def test_cancel_queued_job():
+    async def scenario():
+        job_id = await _add_job(status=QUEUED)
+        async with AsyncSessionLocal() as session:
+            job = await cancel_job(session, await session.get(Job, job_id))
+            assert job.status == CANCELLED
+            assert job.finished_at is not None
+    run(scenario())
@@ -0,0 +1,47 @@
+"""少ない語句・見出しのないページなどでキーワード分析が失敗しないことの確認"""
+from fastapi.testclient import TestClient
+
+from app.services.keyword_analysis import analyze_pages
+
+
+def test_single_term_page():
+    result = analyze_pages("SEO", [{"url": "a", "title": "SEO", "content": "SEO"}])
+    assert result["page_count"] == 1
+    assert [term["term"] for term in result["terms"]] == ["seo"]
+    assert result["cooccurrence"] == []
+
+
+def test_page_without_headings():
+    pages = [
+        {"url": "a", "title": "SEO guide", "content": "Keyword research matters. Keyword research takes time."},
+        {"url": "b", "title": "SEO basics", "content": "Keyword research first. Then write content."},
+    ]
+    result = analyze_pages("keyword research", pages)
+    assert result["page_count"] == 2
+    assert all(term["in_headings"] == 0 for term in result["terms"])
+    assert {"keyword", "research"} <= {term["term"] for term in result["terms"]}
+    assert any(pair["terms"] for pair in result["cooccurrence"])
+
+
+def test_all_stopword_page():
+    result = analyze_pages("the", [{"url": "a", "title": "The", "content": "and the of it is to"}])
+    assert result["page_count"] == 1
+    assert result["terms"] == []
+    assert result["cooccurrence"] == []
+
+
+def test_blocked_pages_only():
+    result = analyze_pages("seo", [{"url": "a", "blocked": True}])
+    assert result["page_count"] == 0
+
+
+def test_keywords_endpoint_single_term():
+    from app.main import app
+
+    client = TestClient(app)
+    response = client.post(
+        "/api/v1/analysis/keywords",
+        json={"keyword": "SEO", "pages": [{"url": "a", "title": "SEO", "content": "SEO"}]},
+    )
+    assert response.status_code == 200
+    assert response.json()["cooccurrence"] == []
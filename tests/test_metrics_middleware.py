@@ -0,0 +1,53 @@
+"""MetricsMiddleware がパスのテンプレートとステータスでリクエストを記録することの確認"""
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.metrics import MetricsMiddleware
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/metrics-test/stream")
+    async def stream():
+        async def body():
+            yield b"a"
+            yield b"b"
+        return StreamingResponse(body())
+
+    return app
+
+
+def _count(method, route, status):
+    value = metrics.http_requests._series.get((method, route, status))
+    return value.value if value is not None else 0
+
+
+def test_records_route_template_and_status():
+    client = TestClient(_app())
+    before = _count("GET", "/metrics-test/items/{item_id}", "200")
+    client.get("/metrics-test/items/1")
+    client.get("/metrics-test/items/2")
+    assert _count("GET", "/metrics-test/items/{item_id}", "200") == before + 2
+
+    before = _count("GET", "/metrics-test/items/{item_id}", "422")
+    client.get("/metrics-test/items/abc")
+    assert _count("GET", "/metrics-test/items/{item_id}", "422") == before + 1
+
+
+def test_records_unmatched_and_streaming():
+    client = TestClient(_app())
+    before = _count("GET", "unmatched", "404")
+    client.get("/metrics-test/missing")
+    assert _count("GET", "unmatched", "404") == before + 1
+
+    before = _count("GET", "/metrics-test/stream", "200")
+    assert client.get("/metrics-test/stream").content == b"ab"
+    assert _count("GET", "/metrics-test/stream", "200") == before + 1
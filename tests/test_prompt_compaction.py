@@ -0,0 +1,26 @@
+"""定型文の判定が別サイト間で共有される内容を残すことの確認"""
+from app.services.prompt_compaction import find_boilerplate
+
+DEFINITION = "SEOとは検索エンジン最適化のことです。"
+FOOTER = "Copyright 2024 All rights reserved"
+
+
+def test_segment_shared_by_two_sites_is_kept():
+    pages = [[DEFINITION, "a"], [DEFINITION, "b"], ["c"], ["d"], ["e"]]
+    assert find_boilerplate(pages, ["a.com", "b.com", "c.com", "d.com", "e.com"]) == set()
+
+
+def test_segment_on_majority_of_pages_is_removed():
+    pages = [[FOOTER, "a"], [FOOTER, "b"], [FOOTER, "c"], ["d"], ["e"]]
+    assert find_boilerplate(pages, ["a.com", "b.com", "c.com", "d.com", "e.com"]) == {FOOTER}
+
+
+def test_needs_at_least_three_pages():
+    pages = [[FOOTER], [FOOTER]]
+    assert find_boilerplate(pages, ["a.com", "b.com"]) == set()
+
+
+def test_segment_repeated_on_same_host_is_removed():
+    pages = [["menu", "a"], ["menu", "b"], ["menu", "c"], ["x"], ["y"], ["z"], ["w"], ["v"]]
+    hosts = ["a.com", "a.com", "b.com", "c.com", "d.com", "e.com", "f.com", "g.com"]
+    assert find_boilerplate(pages, hosts) == {"menu"}
@@ -0,0 +1,62 @@
+"""同時実行数の制限が ScrapingService のインスタンス（検索・ジョブ）をまたいで適用されることの確認"""
+import asyncio
+import itertools
+
+from app.services.host_resilience import AdaptiveRateLimiter, host_registry
+from app.services.scraping import ScrapingService
+
+_hosts = itertools.count()
+
+
+def _tracking_services(monkeypatch, count):
+    """scrape_page の同時実行数を記録する ScrapingService を count 個作る"""
+    in_flight = {"now": 0, "peak": 0}
+
+    async def fake_scrape_page(url, deadline=None):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return {"url": url, "blocked": False}
+
+    services = [ScrapingService() for _ in range(count)]
+    for service in services:
+        monkeypatch.setattr(service, "scrape_page", fake_scrape_page)
+    return services, in_flight
+
+
+def _host(per_host):
+    host = f"concurrency-{next(_hosts)}.example"
+    state = host_registry.get(host)
+    state.limiter = AdaptiveRateLimiter(interval=0.0, burst=1, max_interval=0.0)
+    state.slots = asyncio.Semaphore(per_host)
+    return host
+
+
+def test_per_host_limit_is_shared_between_services(monkeypatch):
+    services, in_flight = _tracking_services(monkeypatch, 3)
+    host = _host(per_host=1)
+
+    async def run():
+        await asyncio.gather(*(
+            service.scrape_pages([f"http://{host}/{i}" for i in range(3)]) for service in services
+        ))
+
+    asyncio.run(run())
+    assert in_flight["peak"] == 1
+
+
+def test_global_limit_is_shared_between_services(monkeypatch):
+    services, in_flight = _tracking_services(monkeypatch, 4)
+    hosts = [_host(per_host=4) for _ in range(4)]
+
+    async def run():
+        # 既定の SCRAPE_CONCURRENCY より小さい上限で確認する
+        monkeypatch.setattr("app.services.scraping.scrape_slots", asyncio.Semaphore(2))
+        await asyncio.gather(*(
+            service.scrape_pages([f"http://{host}/{i}" for i in range(2)])
+            for service, host in zip(services, hosts)
+        ))
+
+    asyncio.run(run())
+    assert in_flight["peak"] == 2
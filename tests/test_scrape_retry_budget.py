@@ -0,0 +1,77 @@
+"""再試行が1URLあたりの期限（SCRAPE_TIMEOUT）に収まる範囲でだけ行われることの確認"""
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from app.services.host_resilience import AdaptiveRateLimiter, host_registry
+from app.services.scraping import MIN_ATTEMPT_TIMEOUT, FetchResult, ScrapingService
+
+_hosts = itertools.count()
+
+
+def _setup(monkeypatch, outcomes, interval):
+    """outcomes を順に返す（例外なら送出する）_fetch_hedged と、間隔 interval のホストを用意する"""
+    host = f"budget-{next(_hosts)}.example"
+    state = host_registry.get(host)
+    state.limiter = AdaptiveRateLimiter(interval=interval, burst=1, max_interval=interval)
+    timeouts = []
+    service = ScrapingService()
+
+    async def fake_fetch(url, headers, host_state, timeout):
+        timeouts.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(service, "_fetch_hedged", fake_fetch)
+    monkeypatch.setattr("app.services.scraping.retry_delay", lambda attempt: 0.0)
+    return service, f"http://{host}/page", state, timeouts
+
+
+def test_gives_up_with_original_error_when_limiter_wait_exceeds_deadline(monkeypatch):
+    service, url, state, timeouts = _setup(
+        monkeypatch, [asyncio.TimeoutError(), asyncio.TimeoutError()], interval=30.0
+    )
+
+    async def run():
+        # 最初のリクエスト分のトークンを予約済みの状態にする
+        await state.limiter.acquire()
+        return await service._fetch_with_resilience(url, {}, deadline=time.monotonic() + 5.0)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert time.monotonic() - started < 1.0
+    assert len(timeouts) == 1
+    assert state.retries == 1
+
+
+def test_retries_with_attempt_timeout_limited_by_remaining_time(monkeypatch):
+    ok = FetchResult(status=200, final_url="http://example.com/")
+    service, url, state, timeouts = _setup(
+        monkeypatch, [asyncio.TimeoutError(), asyncio.TimeoutError(), ok], interval=0.0
+    )
+    monkeypatch.setattr("app.services.scraping.settings.SCRAPE_ATTEMPT_TIMEOUT", 10.0)
+    monkeypatch.setattr("app.services.scraping.settings.SCRAPE_MAX_RETRIES", 2)
+
+    result = asyncio.run(service._fetch_with_resilience(url, {}, deadline=time.monotonic() + 3.0))
+
+    assert result is ok
+    assert len(timeouts) == 3
+    assert all(MIN_ATTEMPT_TIMEOUT <= t <= 3.0 for t in timeouts)
+    assert timeouts == sorted(timeouts, reverse=True)
+
+
+def test_returns_last_response_when_no_time_left_for_retry(monkeypatch):
+    unavailable = FetchResult(status=502, final_url="http://example.com/")
+    service, url, state, timeouts = _setup(monkeypatch, [unavailable], interval=0.0)
+
+    result = asyncio.run(
+        service._fetch_with_resilience(url, {}, deadline=time.monotonic() + MIN_ATTEMPT_TIMEOUT / 2)
+    )
+
+    assert result is unavailable
+    assert len(timeouts) == 1
@@ -0,0 +1,51 @@
+"""SERP_PROVIDER・キーが不足している場合に検索だけが分かりやすいエラーになることの確認"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import serp
+
+
+@pytest.fixture(autouse=True)
+def reset_serp_service(monkeypatch):
+    monkeypatch.setattr(serp, "_serp_service", None)
+
+
+def test_unset_provider_fails(monkeypatch):
+    monkeypatch.setattr(serp.settings, "SERP_PROVIDER", None)
+    with pytest.raises(serp.SerpNotConfigured, match="SERP_PROVIDER is not set"):
+        serp.get_serp_service()
+
+
+def test_unknown_provider_fails(monkeypatch):
+    monkeypatch.setattr(serp.settings, "SERP_PROVIDER", "bing")
+    with pytest.raises(serp.SerpNotConfigured, match="Unknown SERP provider"):
+        serp.get_serp_service()
+
+
+@pytest.mark.parametrize(
+    "provider, api_key, cse_id, missing",
+    [
+        ("serpapi", None, None, "SERP_API_KEY"),
+        ("google_cse", "key", None, "GOOGLE_CSE_ID"),
+        ("google_cse", None, "cx", "SERP_API_KEY"),
+    ],
+)
+def test_provider_requires_keys(monkeypatch, provider, api_key, cse_id, missing):
+    monkeypatch.setattr(serp.settings, "SERP_PROVIDER", provider)
+    monkeypatch.setattr(serp.settings, "SERP_API_KEY", api_key)
+    monkeypatch.setattr(serp.settings, "GOOGLE_CSE_ID", cse_id)
+    with pytest.raises(serp.SerpNotConfigured, match=missing):
+        serp.get_serp_service()
+
+
+def test_fixture_provider_is_explicit(monkeypatch):
+    monkeypatch.setattr(serp.settings, "SERP_PROVIDER", "fixture")
+    assert serp.get_serp_service().provider.name == "fixture"
+
+
+def test_app_serves_without_provider_and_search_returns_503(monkeypatch):
+    monkeypatch.setattr(serp.settings, "SERP_PROVIDER", None)
+    with TestClient(app) as client:
+        assert client.get("/api/v1/health").status_code == 200
+        assert client.get("/api/v1/scraping/serp-stats").status_code == 503
@@ -0,0 +1,68 @@
+"""ストリーミング抽出エンジンが BeautifulSoup による抽出と同じ結果を返すことの確認"""
+from pathlib import Path
+
+import pytest
+
+from app.services.extraction import extract_page, extract_page_soup
+from app.services.streaming_extraction import extract_page_streaming
+
+FIXTURES = Path(__file__).parent / "fixtures" / "pages"
+PAGES = sorted(FIXTURES.glob("*.html"))
+BASE_URL = "http://example.com/dir/page.html"
+
+# 短い断片で境界条件を確認する
+SNIPPETS = [
+    "",
+    "<title></title><h1>a</h1>",
+    "<title>a<b>x</b></title>",
+    "<title><!----></title>",
+    "<br><br/><h2>x<p>y</h2>z</p>",
+    "<h1>a<h2>b</h2>c</h1>",
+    "<main><nav>n</nav>m<script>s</script></main><article>a</article>",
+    "<header><main>in header</main></header><main>real</main>",
+    "<body>x &foo; &amp &#150; &#x41; <![CDATA[cd]]> <pre>  </pre> \n\n </body>",
+    "<img src='a.png'><img src><img src='b' alt></img></img><nav><img src='c'></nav>",
+    "<meta name=description content=' d '><meta name=description content=x>",
+    "<h3> a \n <span> </span> b<rt>r</rt><template>t</template></h3>",
+    "<div/><h4/>x",
+    "<body><h5>unclosed",
+    "<<>>&",
+    "<body><textarea>\n</textarea>x</body>",
+]
+
+
+def test_fixtures_exist():
+    assert len(PAGES) >= 5
+
+
+@pytest.mark.parametrize("path", PAGES, ids=[path.name for path in PAGES])
+def test_saved_pages_match_soup(path):
+    html = path.read_text(encoding="utf-8")
+    assert extract_page_streaming(html, BASE_URL) == extract_page_soup(html, BASE_URL)
+
+
+@pytest.mark.parametrize("html", SNIPPETS)
+def test_snippets_match_soup(html):
+    assert extract_page_streaming(html, BASE_URL) == extract_page_soup(html, BASE_URL)
+
+
+def test_relative_image_urls_are_resolved():
+    html = (FIXTURES / "relative_images.html").read_text(encoding="utf-8")
+    srcs = [image["src"] for image in extract_page_streaming(html, BASE_URL)["images"]]
+    assert "http://example.com/dir/plain.png" in srcs
+    assert "http://example.com/up.png" in srcs
+    assert "http://example.com/root.png" in srcs
+    assert "http://example.com/dir/footer.png" not in srcs
+
+
+def test_missing_title_and_meta():
+    html = (FIXTURES / "no_title_no_meta.html").read_text(encoding="utf-8")
+    result = extract_page_streaming(html, BASE_URL)
+    assert result["title"] == ""
+    assert result["meta_description"] == ""
+    assert result["headings"]["h4"] == ["Only a fourth level heading"]
+
+
+def test_extract_page_selects_engine():
+    html = (FIXTURES / "article.html").read_text(encoding="utf-8")
+    assert extract_page(html, BASE_URL, "soup") == extract_page(html, BASE_URL, "streaming")